@@ -0,0 +1,185 @@
+"""Throughput benchmarks for the ingestion and analytics paths.
+
+Usage::
+
+    python -m benchmarks.run --rows 1000 100000
+    python -m benchmarks.run --rows 100000 --save-baseline
+    python -m benchmarks.run --rows 100000 --baseline benchmarks/baseline.json
+
+Each stage is timed on synthetic data from :mod:`benchmarks.synthetic` and
+reported as rows/sec and peak traced memory.  With ``--baseline`` the run is
+compared against stored results and exits non-zero when a stage is slower
+than the baseline by more than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.synthetic import generate_records, raw_export
+from src.analytics import apply_flags, compute_overall_score, compute_trends
+from src.data_loader import normalize_dataframe
+from src.db import init_db, insert_dataframe, load_records
+from src.schema import load_schema
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+STAGES = ("normalize", "insert", "load", "score", "trends", "flags")
+
+
+def measure(fn: Callable[[], object], trace_memory: bool = True) -> tuple[object, float, float]:
+    """Run ``fn`` and return its result, wall time and peak traced MiB.
+
+    Timing comes from an untraced run because tracemalloc slows Python-level
+    code considerably; peak memory comes from a second, traced run, so ``fn``
+    must be safe to call twice.
+    """
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def run_benchmarks(
+    n_rows: int,
+    stages: tuple[str, ...] = STAGES,
+    n_semesters: int = 2,
+    missing_ratio: float = 0.05,
+    seed: int = 0,
+    trace_memory: bool = True,
+) -> dict[str, dict[str, float]]:
+    """Time every selected stage on ``n_rows`` synthetic records."""
+    schema = load_schema()
+    weights = schema["weights_default"]
+    thresholds = schema["thresholds_default"]
+    records = generate_records(n_rows, n_semesters=n_semesters, missing_ratio=missing_ratio, seed=seed)
+    results: dict[str, dict[str, float]] = {}
+
+    def timed(stage: str, fn: Callable[[], object], repeatable: bool = True) -> object:
+        if stage not in stages:
+            return fn()
+        # fn runs once more for the peak-memory trace, which stages with side
+        # effects (``repeatable=False``) skip; their peak is left out
+        trace = trace_memory and repeatable
+        result, elapsed, peak_mb = measure(fn, trace)
+        results[stage] = {
+            "seconds": round(elapsed, 6),
+            "rows_per_sec": round(n_rows / elapsed, 1) if elapsed > 0 else float("inf"),
+        }
+        if trace:
+            results[stage]["peak_mb"] = round(peak_mb, 2)
+        return result
+
+    if "normalize" in stages:
+        raw, mappings = raw_export(records)
+        timed("normalize", lambda: normalize_dataframe(raw, mappings))
+        del raw
+
+    if "insert" in stages or "load" in stages:
+        with tempfile.TemporaryDirectory() as tmp:
+
+            def insert_fresh():
+                conn = init_db(Path(tmp) / "bench.db")
+                insert_dataframe(records, conn)
+                return conn
+
+            conn = timed("insert", insert_fresh, repeatable=False)
+            if "load" in stages:
+                timed("load", lambda: load_records(conn))
+            conn.close()
+
+    if not {"score", "trends", "flags"} & set(stages):
+        return results
+    scored = timed("score", lambda: compute_overall_score(records.copy(), weights))
+    scored, trend_fields = timed("trends", lambda: compute_trends(scored, list(weights)))
+    if "flags" in stages:
+        timed(
+            "flags",
+            lambda: apply_flags(
+                scored, thresholds["low_percentile"], thresholds["significant_drop_points"], trend_fields
+            ),
+        )
+    return results
+
+
+def compare(
+    current: dict[str, dict[str, dict[str, float]]],
+    baseline: dict[str, dict[str, dict[str, float]]],
+    tolerance: float,
+) -> list[str]:
+    """Return human-readable regressions of ``current`` against ``baseline``."""
+    regressions = []
+    for rows, stages in current.items():
+        for stage, stats in stages.items():
+            base = baseline.get(rows, {}).get(stage)
+            if not base:
+                continue
+            if stats["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+                regressions.append(
+                    f"{stage} @ {rows} rows: {stats['rows_per_sec']:,.0f} rows/s "
+                    f"vs baseline {base['rows_per_sec']:,.0f} rows/s"
+                )
+    return regressions
+
+
+def format_table(results: dict[str, dict[str, dict[str, float]]]) -> str:
+    lines = [f"{'rows':>10}  {'stage':<10} {'seconds':>10} {'rows/s':>14} {'peak MiB':>10}"]
+    for rows, stages in results.items():
+        for stage, stats in stages.items():
+            lines.append(
+                f"{rows:>10}  {stage:<10} {stats['seconds']:>10.4f} "
+                f"{stats['rows_per_sec']:>14,.0f} "
+                + (f"{stats['peak_mb']:>10.1f}" if "peak_mb" in stats else f"{'-':>10}")
+            )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--semesters", type=int, default=2)
+    parser.add_argument("--missing-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory runs")
+    parser.add_argument("--baseline", type=Path, default=None, help="compare against this baseline file")
+    parser.add_argument("--save-baseline", nargs="?", type=Path, const=BASELINE_PATH, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = {
+        str(n): run_benchmarks(
+            n, tuple(args.stages), args.semesters, args.missing_ratio, args.seed, not args.no_memory
+        )
+        for n in args.rows
+    }
+    print(format_table(results))
+
+    if args.save_baseline is not None:
+        args.save_baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
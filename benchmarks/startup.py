@@ -0,0 +1,129 @@
+"""Cold-start and rerun latency of the Streamlit app.
+
+Usage::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeats 10 --json startup.json
+
+``cold_import`` starts a fresh interpreter per repeat and times importing the
+modules the app loads at startup, which is what every new server process
+pays.  ``rerun`` drives ``streamlit_app.py`` with Streamlit's ``AppTest``
+harness: the first run includes the cached resources being built, later runs
+are the per-interaction rerun latency.  It needs ``streamlit`` installed and
+is skipped otherwise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "streamlit_app.py"
+
+# Imported by streamlit_app.py before the first widget is drawn
+STARTUP_MODULES = (
+    "pandas",
+    "src.schema",
+    "src.data_loader",
+    "src.analytics",
+    "src.flags",
+    "src.pipeline",
+    "src.storage",
+    "src.views",
+    "src.db",
+    "src.profiling",
+)
+
+# Imported only when an upload or the comments view needs them
+LAZY_MODULES = ("src.ingest", "src.mapping", "src.comments", "src.reports")
+
+
+def cold_import(modules: tuple[str, ...] = STARTUP_MODULES, repeats: int = 5) -> dict[str, float]:
+    """Median and best wall time of importing ``modules`` in fresh interpreters."""
+    code = (
+        "import time, importlib; t = time.perf_counter()\n"
+        f"for m in {list(modules)!r}: importlib.import_module(m)\n"
+        "print(time.perf_counter() - t)"
+    )
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return {"median_s": round(statistics.median(times), 4), "min_s": round(min(times), 4)}
+
+
+def rerun(repeats: int = 5, role: str = "teacher") -> dict[str, float] | None:
+    """First-run and median rerun latency of the app, or ``None`` without Streamlit.
+
+    The app reads the default database, so the timings reflect whatever it
+    holds (an empty database stops after the upload section).
+
+    Raises
+    ------
+    RuntimeError
+        If a run of the app raised, so a broken app is not reported as fast.
+    """
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+    # ``streamlit run`` puts the script's directory on sys.path; AppTest does not
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    app = AppTest.from_file(str(APP), default_timeout=120)
+    users = {"teacher": {"password": "teach", "role": "מורה"}, "coordinator": {"password": "coord", "role": "רכז"}}
+    app.session_state["user"] = {"username": role, **users[role]}
+
+    def run() -> float:
+        start = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(f"streamlit_app.py raised: {app.exception[0].value}")
+        return elapsed
+
+    first = run()
+    times = [run() for _ in range(repeats)]
+    return {"first_s": round(first, 4), "rerun_median_s": round(statistics.median(times), 4)}
+
+
+def run_startup_benchmarks(repeats: int = 5) -> dict[str, dict[str, float] | None]:
+    return {
+        "cold_import": cold_import(STARTUP_MODULES, repeats),
+        "cold_import_with_lazy": cold_import(STARTUP_MODULES + LAZY_MODULES, repeats),
+        "app_rerun": rerun(repeats),
+    }
+
+
+def format_table(results: dict[str, dict[str, float] | None]) -> str:
+    lines = [f"{'measurement':<24} result"]
+    for name, values in results.items():
+        text = "skipped (streamlit not installed)" if values is None else ", ".join(
+            f"{k}={v:.3f}" for k, v in values.items()
+        )
+        lines.append(f"{name:<24} {text}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args(argv)
+    results = run_startup_benchmarks(args.repeats)
+    print(format_table(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.data_loader import numeric_keys
+from src.schema import load_schema
+
+HEBREW_LETTERS = "אבגדהוזחטיכלמנסעפצקרשת"
+COMMENTS = ["ממשיך בקו חיובי.", "שיפור מתמשך.", "יציב מאוד.", "נדרש חיזוק בהגשת שיעורי בית."]
+
+
+def generate_records(
+    n_rows: int,
+    n_students: int | None = None,
+    n_semesters: int = 2,
+    n_classes: int | None = None,
+    missing_ratio: float = 0.05,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Generate schema-conformant canonical records.
+
+    Parameters
+    ----------
+    n_rows:
+        Number of records to produce.
+    n_students:
+        Distinct students; defaults to one per two semesters' worth of rows.
+    n_semesters:
+        Number of semesters, labelled with consecutive Hebrew letters.
+    n_classes:
+        Distinct classes; defaults to one per 30 students.
+    missing_ratio:
+        Fraction of numeric and comment cells replaced with missing values.
+    seed:
+        Seed for the random generator so runs are reproducible.
+
+    Every ``(student, date)`` pair is unique, so the rows survive the natural
+    key upsert in :func:`src.db.insert_dataframe` unchanged.
+    """
+
+    if n_rows < 0:
+        raise ValueError("n_rows must not be negative")
+    if not 1 <= n_semesters <= len(HEBREW_LETTERS):
+        raise ValueError(f"n_semesters must be between 1 and {len(HEBREW_LETTERS)}")
+    if not 0 <= missing_ratio < 1:
+        raise ValueError("missing_ratio must be in [0, 1)")
+    rng = np.random.default_rng(seed)
+    n_students = n_students or max(1, n_rows // n_semesters)
+    n_classes = n_classes or max(1, n_students // 30)
+
+    idx = np.arange(n_rows)
+    student = idx % n_students
+    event = idx // n_students
+    semester = event % n_semesters
+    names = np.array([f"תלמיד {i:07d}" for i in range(n_students)], dtype=object)
+    classes = np.array([f"כיתה {i + 1}" for i in range(n_classes)], dtype=object)
+    semesters = np.array(list(HEBREW_LETTERS[:n_semesters]), dtype=object)
+
+    columns: dict[str, object] = {}
+    for field in load_schema().get("canonical_fields", []):
+        key = field["key"]
+        if key == "student_name":
+            columns[key] = names[student]
+        elif key == "class_name":
+            columns[key] = classes[student % n_classes]
+        elif key == "semester":
+            columns[key] = semesters[semester]
+        elif key == "date":
+            # one date per event index, formatted once and broadcast to the rows
+            weeks = np.arange(event.max() + 1 if n_rows else 0)
+            dates = np.datetime64("2020-09-01") + (weeks * 7).astype("timedelta64[D]")
+            columns[key] = np.datetime_as_string(dates, unit="D").astype(object)[event]
+        elif key in numeric_keys:
+            values = np.clip(rng.normal(75, 12, n_rows), 0, 100).round(1)
+            values[rng.random(n_rows) < missing_ratio] = np.nan
+            columns[key] = values
+        else:
+            comments = np.array(COMMENTS, dtype=object)[rng.integers(0, len(COMMENTS), n_rows)]
+            comments[rng.random(n_rows) < missing_ratio] = None
+            columns[key] = comments
+    return pd.DataFrame(columns)
+
+
+def raw_export(df: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, str]]:
+    """Rename canonical columns to the Hebrew headers teachers export.
+
+    Returns the renamed frame and the mapping that
+    :func:`src.data_loader.normalize_dataframe` needs to undo it.
+    """
+
+    mappings = {}
+    for field in load_schema().get("canonical_fields", []):
+        if field["key"] in df.columns:
+            mappings[field["key"]] = field["label_he"]
+    return df.rename(columns=mappings), mappings
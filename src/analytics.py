@@ -2,6 +2,12 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from .flags import REASONS_COLUMN, evaluate_rules, student_reasons
+from .profiling import instrument
+from .ranking import COHORT_KEYS, cohort_ranks
+from .schema import load_schema
+from .trends import period_codes, student_keys, trend_summary
+
 
 def normalize_weights(weights: dict[str, float]) -> dict[str, float]:
     """Normalize weight values so they sum to 1.0.
@@ -36,6 +42,64 @@ def normalize_weights(weights: dict[str, float]) -> dict[str, float]:
     return {k: v / total for k, v in weights.items()}
 
 
+def score_matrix(df: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, list[str]]:
+    """Return a dense ``float64`` matrix of the scoring columns of ``df``.
+
+    Only the ``keys`` present in ``df`` are included; the second element of the
+    returned tuple lists them in column order.  Non-numeric and missing cells
+    are coerced to ``0.0`` so they do not contribute to a weighted sum.
+    """
+
+    present = [k for k in keys if k in df.columns]
+    matrix = np.zeros((len(df), len(present)), dtype=np.float64)
+    for j, key in enumerate(present):
+        col = pd.to_numeric(df[key], errors="coerce")
+        values = col.to_numpy(dtype=np.float64, na_value=np.nan)
+        # only missing cells become 0; infinities propagate as in the row-wise sum
+        matrix[:, j] = np.where(np.isnan(values), 0.0, values)
+    return matrix, present
+
+
+@instrument()
+def compute_overall_scores_batch(
+    df: pd.DataFrame, weight_sets: list[dict[str, float]]
+) -> np.ndarray:
+    """Score every row of ``df`` against several weight vectors at once.
+
+    Parameters
+    ----------
+    df:
+        Records to score.
+    weight_sets:
+        Weight mappings to evaluate.  Keys missing from ``df`` are ignored,
+        exactly as in :func:`compute_overall_score`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape ``(len(df), len(weight_sets))`` where column ``j`` holds
+        the overall scores for ``weight_sets[j]``.  The whole sweep is a single
+        matrix multiply.
+    """
+
+    keys = list(dict.fromkeys(k for w in weight_sets for k in w))
+    matrix, present = score_matrix(df, keys)
+    weight_matrix = np.array(
+        [[float(w.get(k, 0.0)) for w in weight_sets] for k in present], dtype=np.float64
+    ).reshape(len(present), len(weight_sets))
+    with np.errstate(invalid="ignore"):
+        scores = matrix @ weight_matrix
+    rows = ~np.isfinite(matrix).all(axis=1)
+    if rows.any():
+        # an infinity in a field a weight set leaves out would give 0 * inf = NaN
+        # there, so rows holding one are scored over each set's own fields
+        for j, w in enumerate(weight_sets):
+            own = np.array([k in w for k in present], dtype=bool)
+            scores[rows, j] = matrix[np.ix_(rows, own)] @ weight_matrix[own, j]
+    return scores
+
+
+@instrument()
 def compute_overall_score(df: pd.DataFrame, weights: dict[str, float]) -> pd.DataFrame:
     """Compute a weighted overall score for each row if applicable.
 
@@ -47,47 +111,211 @@ def compute_overall_score(df: pd.DataFrame, weights: dict[str, float]) -> pd.Dat
     if df.empty or not weights:
         return df
 
-    def overall(row: pd.Series) -> float:
-        total = 0.0
-        for key, w in weights.items():
-            if key in df.columns:
-                try:
-                    val = float(row.get(key, np.nan))
-                except (TypeError, ValueError):
-                    val = np.nan
-                if not np.isnan(val):
-                    total += w * val
-        return total
-
-    df["overall_score"] = df.apply(overall, axis=1)
+    df["overall_score"] = compute_overall_scores_batch(df, [weights])[:, 0]
     return df
 
 
-def compute_trends(df: pd.DataFrame, weight_keys: list[str]) -> tuple[pd.DataFrame, list[str]]:
-    """Compute semester-to-semester deltas for weighted fields."""
+def compute_trend_deltas(
+    df: pd.DataFrame,
+    weight_keys: list[str],
+    semester_order: list[str] | None = None,
+    partition_by: str | list[str] | None = None,
+) -> tuple[pd.DataFrame, list[str]]:
+    """Return one row per student with the latest semester-to-semester deltas.
+
+    ``delta_<field>`` is the student's mean in their latest semester minus the
+    mean in the semester before it (``ב`` minus ``א`` for the usual two
+    semesters).  Delta columns with no data at all are omitted.  See
+    :func:`src.trends.trend_summary` for slopes and largest drops.
+    """
     trend_fields = [k for k in weight_keys if k in df.columns]
-    if "semester" in df.columns and "student_name" in df.columns and trend_fields:
-        pivot = df.pivot_table(index="student_name", columns="semester", values=trend_fields, aggfunc="mean")
-        pivot.columns = [f"{k}_{sem}" for (k, sem) in pivot.columns.to_flat_index()]
-        pivot = pivot.reset_index()
-        for k in trend_fields:
-            col_a = f"{k}_א"
-            col_b = f"{k}_ב"
-            if col_a in pivot.columns and col_b in pivot.columns:
-                pivot[f"delta_{k}"] = pivot[col_b] - pivot[col_a]
-        merge_cols = ["student_name"] + [c for c in pivot.columns if c.startswith("delta_")]
-        df = df.merge(pivot[merge_cols], on="student_name", how="left")
+    keys = student_keys(partition_by)
+    if not ("semester" in df.columns and "student_name" in df.columns and trend_fields):
+        return pd.DataFrame(columns=keys), trend_fields
+    summary = trend_summary(df, trend_fields, semester_order=semester_order, partition_by=partition_by)
+    deltas = summary[keys + [f"delta_{k}" for k in trend_fields]]
+    return deltas.dropna(axis=1, how="all"), trend_fields
+
+
+@instrument()
+def trend_deltas_from_means(
+    means: pd.DataFrame, trend_fields: list[str], semester_order: list[str] | None = None
+) -> pd.DataFrame:
+    """Turn per-student, per-semester means into a per-student delta table.
+
+    ``means`` holds one row per ``(student_name, semester)`` pair, as produced
+    by :func:`src.db.semester_means`; the result matches
+    :func:`compute_trend_deltas` on the underlying records.
+    """
+    return compute_trend_deltas(means, trend_fields, semester_order)[0]
+
+
+@instrument()
+def compute_trends(
+    df: pd.DataFrame,
+    weight_keys: list[str],
+    semester_order: list[str] | None = None,
+    partition_by: str | list[str] | None = None,
+) -> tuple[pd.DataFrame, list[str]]:
+    """Compute semester-to-semester deltas for weighted fields.
+
+    The per-student deltas are broadcast back onto ``df`` in place through the
+    student codes, without merging a second copy of the frame.
+    """
+    trend_fields = [k for k in weight_keys if k in df.columns]
+    if not ("semester" in df.columns and "student_name" in df.columns and trend_fields):
+        return df, trend_fields
+    summary, codes = trend_summary(
+        df, trend_fields, semester_order=semester_order, partition_by=partition_by, return_codes=True
+    )
+    for k in trend_fields:
+        values = summary[f"delta_{k}"].to_numpy(dtype=np.float64)
+        if np.isnan(values).all():
+            continue
+        df[f"delta_{k}"] = np.where(codes >= 0, values[np.maximum(codes, 0)], np.nan)
     return df, trend_fields
 
 
-def apply_flags(df: pd.DataFrame, low_percentile_thr: int, drop_thr: int, trend_fields: list[str]) -> pd.DataFrame:
-    """Apply criteria flags based on percentile and score drops."""
-    flags = pd.Series([False] * len(df))
-    if "national_percentile" in df.columns:
-        flags = flags | (df["national_percentile"] < low_percentile_thr)
+@instrument()
+def compute_cohort_ranks(
+    df: pd.DataFrame,
+    metrics: list[str] | None = None,
+    by: tuple[str, ...] | list[str] = COHORT_KEYS,
+) -> pd.DataFrame:
+    """Add ``rank_<metric>`` and ``pct_<metric>`` columns ranking rows within cohorts.
+
+    Cohorts default to class and semester and ``metrics`` to
+    ``overall_score`` plus the numeric fields; all are ranked in one sort.
+    See :func:`src.ranking.cohort_ranks`.
+    """
+    ranks = cohort_ranks(df, metrics, by)
+    for col in ranks.columns:
+        df[col] = ranks[col].to_numpy()
+    return df
+
+
+@instrument()
+def apply_flags(
+    df: pd.DataFrame,
+    low_percentile_thr: int,
+    drop_thr: int,
+    trend_fields: list[str],
+    thresholds: dict[str, float] | None = None,
+) -> pd.DataFrame:
+    """Evaluate the ``flag_rules`` of ``schema.json`` on every row of ``df``.
+
+    Adds ``flag_reasons``, the bitmask of rules that fired (see
+    :mod:`src.flags`), and ``flagged``, whether any rule fired.
+    ``low_percentile_thr`` and ``drop_thr`` set the ``low_percentile`` and
+    ``significant_drop_points`` thresholds; other thresholds come from
+    ``thresholds`` or ``thresholds_default``.  ``delta_*`` conditions look at
+    the deltas of ``trend_fields`` only.
+    """
+    reasons = evaluate_rules(df, merge_thresholds(low_percentile_thr, drop_thr, thresholds), trend_fields)
+    df[REASONS_COLUMN] = reasons
+    df["flagged"] = reasons != 0
+    return df
+
+
+def merge_thresholds(
+    low_percentile_thr: int, drop_thr: int, thresholds: dict[str, float] | None = None
+) -> dict[str, float]:
+    """Schema default thresholds overridden by ``thresholds`` and the two sliders."""
+    return {
+        **load_schema().get("thresholds_default", {}),
+        **(thresholds or {}),
+        "low_percentile": low_percentile_thr,
+        "significant_drop_points": drop_thr,
+    }
+
+
+def run_analytics(
+    df: pd.DataFrame,
+    weights: dict[str, float],
+    low_percentile_thr: int,
+    drop_thr: int,
+    partition_by: str | list[str] | None = None,
+    semester_order: list[str] | None = None,
+    thresholds: dict[str, float] | None = None,
+) -> tuple[pd.DataFrame, list[str]]:
+    """Score, trend, rank and flag ``df`` in one call (the serial reference path)."""
+    df = compute_overall_score(df, weights)
+    df, trend_fields = compute_trends(df, list(weights.keys()), semester_order, partition_by)
+    df = compute_cohort_ranks(df)
+    df = apply_flags(df, low_percentile_thr, drop_thr, trend_fields, thresholds)
+    return df, trend_fields
+
+
+@instrument()
+def profile_from_summary(
+    summary: pd.DataFrame,
+    weights: dict[str, float],
+    flagged_rows: pd.DataFrame | None = None,
+    semester_order: list[str] | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Derive student views from :func:`src.db.load_student_summary` rows.
+
+    Returns ``(semesters, students)``.  ``semesters`` has one row per student
+    and semester with the metric means, ``n_records`` and the mean
+    ``overall_score``; ``students`` has one row per student with the latest
+    semester's overall score and the trend deltas.  Both agree with running
+    the row-level analytics on the raw records, but only touch the small
+    pre-aggregated rows.
+
+    ``flagged_rows`` is the analyzed frame the dashboard shows (see
+    :func:`apply_flags`); a student's ``flag_reasons`` are the rules that
+    fired for any of their rows (:func:`src.flags.student_reasons`), so the
+    panel flags exactly the students the row-level view does.  Without it
+    the flag columns are left out.
+    """
+    metrics = [c[len("sum_"):] for c in summary.columns if c.startswith("sum_")]
+    if summary.empty:
+        return pd.DataFrame(columns=["student_name", "semester", "n_records", *metrics, "overall_score"]), pd.DataFrame(
+            columns=["student_name", "n_records", "latest_semester", "latest_overall_score", REASONS_COLUMN, "flagged"]
+        )
+    agg = {"n_records": "sum", "last_date": "max"}
+    for k in metrics:
+        agg.update({f"sum_{k}": "sum", f"count_{k}": "sum", f"min_{k}": "min"})
+    # the max of a text column falls back to a Python loop per group, so the
+    # stored ISO dates are reduced through their sorted codes instead
+    date_codes, dates = pd.factorize(summary["last_date"], sort=True)
+    grouped = (
+        summary.assign(last_date=date_codes)
+        .groupby(["student_name", "semester"], dropna=False, sort=False)
+        .agg(agg)
+        .reset_index()
+    )
+    # code -1 (no date) picks the trailing None
+    grouped["last_date"] = np.append(np.asarray(dates, dtype=object), None)[grouped["last_date"].to_numpy()]
+
+    semesters = grouped[["student_name", "semester", "n_records", "last_date"]].copy()
+    overall = np.zeros(len(grouped))
+    for k in metrics:
+        counts = grouped[f"count_{k}"].to_numpy(dtype=np.float64)
+        sums = grouped[f"sum_{k}"].to_numpy(dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            semesters[k] = np.where(counts > 0, sums / counts, np.nan)
+        if k in weights:
+            overall += weights[k] * np.where(np.isnan(sums), 0.0, sums)
+    semesters["overall_score"] = overall / grouped["n_records"].to_numpy(dtype=np.float64)
+    periods, _ = period_codes(semesters["semester"], "semester", semester_order)
+    semesters = semesters.assign(_period=periods).sort_values(["student_name", "_period"], kind="stable")
+
+    latest = semesters.groupby("student_name", sort=False).tail(1).set_index("student_name")
+    students = semesters.groupby("student_name", sort=False).agg(n_records=("n_records", "sum")).reset_index()
+    students["latest_semester"] = latest["semester"].reindex(students["student_name"]).to_numpy()
+    students["latest_overall_score"] = latest["overall_score"].reindex(students["student_name"]).to_numpy()
+
+    deltas, trend_fields = compute_trend_deltas(semesters, list(weights.keys()), semester_order)
+    indexed = deltas.set_index("student_name")
     for k in trend_fields:
         dcol = f"delta_{k}"
-        if dcol in df.columns:
-            flags = flags | (df[dcol] <= -abs(drop_thr))
-    df["flagged"] = flags
-    return df
+        if dcol in indexed.columns:
+            students[dcol] = indexed[dcol].reindex(students["student_name"]).to_numpy()
+
+    if flagged_rows is not None:
+        per_student = student_reasons(flagged_rows).set_index("student_name")[REASONS_COLUMN]
+        reasons = per_student.reindex(students["student_name"]).fillna(0).to_numpy(dtype=np.int64)
+        students[REASONS_COLUMN] = reasons
+        students["flagged"] = reasons != 0
+    return semesters.drop(columns="_period").reset_index(drop=True), students
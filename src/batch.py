@@ -0,0 +1,327 @@
+"""Score and flag whole directories of workbooks without the UI.
+
+Usage::
+
+    python -m src.batch "exports/*.xlsx" --profile profile.json --out results/
+    python -m src.batch exports/ --profile profile.json --format parquet --workers 8
+    python -m src.batch exports/ --profile profile.json --db data/students.db
+
+The optional profile is a JSON file with the column ``mappings`` chosen in
+the app (canonical key → source header), ``weights``, ``thresholds``
+(``low_percentile``/``significant_drop_points``) and ``partition_by``;
+missing weights and thresholds fall back to ``schema.json``.  Without
+``mappings`` each file's header is mapped by
+:func:`src.mapping.resolve_mappings`, reusing mappings confirmed in the app
+when ``--db`` points at its database.  Every file is
+read, normalized, scored, trended and flagged on its own in a process pool
+and written to ``<out>/<name>.csv`` (or ``.parquet``).  A per-file timing
+summary is printed at the end.
+
+This module only imports the standard library at load time; pandas and the
+analytics modules are imported by the workers, and streamlit never is.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+SUPPORTED_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".csv")
+FORMATS = ("csv", "parquet")
+
+
+@dataclass
+class BatchProfile:
+    """Saved mapping, weights and thresholds applied to every file."""
+
+    mappings: dict[str, str] = field(default_factory=dict)
+    weights: dict[str, float] = field(default_factory=dict)
+    low_percentile: int = 0
+    significant_drop_points: int = 0
+    partition_by: str | None = None
+    thresholds: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class FileResult:
+    """Outcome and stage timings of one processed file."""
+
+    path: str
+    output: str | None = None
+    rows: int = 0
+    flagged: int = 0
+    read_s: float = 0.0
+    analytics_s: float = 0.0
+    write_s: float = 0.0
+    total_s: float = 0.0
+    mapping: str | None = None
+    error: str | None = None
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.total_s if self.total_s > 0 else 0.0
+
+
+def load_profile(path: Path | str | None = None) -> BatchProfile:
+    """Read a profile JSON file, filling gaps from the schema defaults.
+
+    With ``path=None`` the schema defaults and automatic mapping are used.
+
+    Raises
+    ------
+    ValueError
+        If ``mappings`` is present but not an object.
+    """
+    from .schema import load_schema
+
+    raw = {}
+    if path is not None:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    mappings = raw.get("mappings", {})
+    if not isinstance(mappings, dict):
+        raise ValueError(f"'mappings' in profile {path} must be an object")
+    schema = load_schema()
+    thresholds = {**schema.get("thresholds_default", {}), **raw.get("thresholds", {})}
+    return BatchProfile(
+        mappings={str(k): str(v) for k, v in mappings.items()},
+        weights={k: float(v) for k, v in raw.get("weights", schema.get("weights_default", {})).items()},
+        low_percentile=int(thresholds.get("low_percentile", 0)),
+        significant_drop_points=int(thresholds.get("significant_drop_points", 0)),
+        partition_by=raw.get("partition_by"),
+        thresholds=thresholds,
+    )
+
+
+def find_inputs(patterns: list[str]) -> list[Path]:
+    """Expand directories and glob patterns into a sorted list of input files."""
+    found: dict[Path, None] = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = sorted(path.iterdir())
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in SUPPORTED_SUFFIXES:
+                # lock files left behind by Excel
+                if not candidate.name.startswith("~$"):
+                    found.setdefault(candidate, None)
+    return list(found)
+
+
+def output_paths(inputs: list[Path], out_dir: Path, fmt: str) -> list[Path]:
+    """Name one output per input, disambiguating files with the same stem."""
+    used: dict[str, int] = {}
+    paths = []
+    for path in inputs:
+        n = used.get(path.stem, 0)
+        used[path.stem] = n + 1
+        name = path.stem if n == 0 else f"{path.stem}-{n + 1}"
+        paths.append(out_dir / f"{name}.{fmt}")
+    return paths
+
+
+def process_file(task: dict) -> tuple[FileResult, object]:
+    """Worker entry point: read, analyse and write a single file.
+
+    Returns the :class:`FileResult` and, when ``task["return_records"]`` is
+    set, the normalized records so the parent process can store them.
+    Without profile mappings the header is resolved against the saved
+    mappings in ``task["saved_mappings"]``, then the schema hints.
+    Failures are reported in ``FileResult.error`` instead of raising, so one
+    bad workbook does not abort the run.
+    """
+    result = FileResult(path=str(task["path"]))
+    started = time.perf_counter()
+    records = None
+    try:
+        import pandas as pd
+
+        from .analytics import normalize_weights, run_analytics
+        from .flags import REASONS_COLUMN, reason_labels
+        from .data_loader import iter_batches, normalize_dataframe
+        from .mapping import resolve_mappings
+
+        profile = BatchProfile(**task["profile"])
+        mappings = profile.mappings or None
+        result.mapping = "profile" if mappings else None
+        t = time.perf_counter()
+        batches = []
+        for raw in iter_batches(task["path"], task["batch_size"]):
+            if mappings is None:
+                mappings, result.mapping = resolve_mappings(raw.columns, task["saved_mappings"].get)
+            batches.append(normalize_dataframe(raw, mappings))
+        df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=list(mappings or {}))
+        if "student_name" not in df.columns:
+            raise ValueError("the mapped file has no student_name column")
+        result.read_s = time.perf_counter() - t
+        if task["return_records"]:
+            records = df.copy()
+
+        t = time.perf_counter()
+        weights = normalize_weights(profile.weights) if profile.weights else {}
+        partition_by = profile.partition_by if profile.partition_by in df.columns else None
+        df, _ = run_analytics(
+            df,
+            weights,
+            profile.low_percentile,
+            profile.significant_drop_points,
+            partition_by,
+            thresholds=profile.thresholds,
+        )
+        df["flag_reason_labels"] = reason_labels(df[REASONS_COLUMN])
+        result.analytics_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        output = Path(task["output"])
+        if task["format"] == "parquet":
+            df.to_parquet(output, index=False)
+        else:
+            # BOM so Excel opens the Hebrew headers correctly, like the app's export
+            df.to_csv(output, index=False, encoding="utf-8-sig")
+        result.write_s = time.perf_counter() - t
+        result.output = str(output)
+        result.rows = len(df)
+        result.flagged = int(df["flagged"].sum())
+    except Exception as e:  # reported per file
+        result.error = f"{type(e).__name__}: {e}"
+    result.total_s = time.perf_counter() - started
+    return result, records
+
+
+def run_batch(
+    inputs: list[Path],
+    profile: BatchProfile,
+    out_dir: Path | str,
+    fmt: str = "csv",
+    workers: int | None = None,
+    batch_size: int = 50_000,
+    db_path: Path | str | None = None,
+    mp_context: str = "spawn",
+) -> list[FileResult]:
+    """Process ``inputs`` in a process pool and return one result per file.
+
+    With ``db_path`` the normalized records of every successful file are also
+    upserted into that SQLite database from the parent process (one writer),
+    and files whose content was already ingested are left untouched there;
+    the column mappings confirmed in that database are used for files the
+    profile has no mappings for.
+    ``workers`` defaults to the number of CPUs; with one worker or one file
+    everything runs in-process.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown output format {fmt!r}; expected one of {FORMATS}")
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    conn = None
+    saved = {}
+    if db_path is not None:
+        from . import db
+        from .data_loader import file_sha256
+
+        conn = db.init_db(db_path)
+        if not profile.mappings:
+            saved = db.saved_mappings(conn)
+    tasks = [
+        {
+            "path": str(path),
+            "output": str(output),
+            "format": fmt,
+            "profile": asdict(profile),
+            "batch_size": batch_size,
+            "return_records": db_path is not None,
+            "saved_mappings": saved,
+        }
+        for path, output in zip(inputs, output_paths(inputs, out_dir, fmt))
+    ]
+
+    pool = None
+    if workers > 1 and len(tasks) > 1:
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=mp.get_context(mp_context))
+    results: list[FileResult] = []
+    try:
+        for result, records in (pool.map if pool else map)(process_file, tasks):
+            if conn is not None and records is not None and result.error is None:
+                db.insert_dataframe(records, conn, content_hash=file_sha256(result.path))
+            results.append(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if conn is not None:
+            conn.close()
+    return results
+
+
+def format_summary(results: list[FileResult]) -> str:
+    """Render per-file timings and totals as a plain-text table."""
+    lines = [
+        f"{'file':<40} {'rows':>9} {'flagged':>8} {'read s':>8} {'analyse s':>10} "
+        f"{'write s':>8} {'total s':>8} {'rows/s':>11}"
+    ]
+    for r in results:
+        name = Path(r.path).name
+        if r.error:
+            lines.append(f"{name:<40} FAILED: {r.error}")
+            continue
+        lines.append(
+            f"{name:<40} {r.rows:>9,} {r.flagged:>8,} {r.read_s:>8.3f} {r.analytics_s:>10.3f} "
+            f"{r.write_s:>8.3f} {r.total_s:>8.3f} {r.rows_per_sec:>11,.0f}"
+        )
+    ok = [r for r in results if not r.error]
+    lines.append(
+        f"{len(ok)}/{len(results)} files, {sum(r.rows for r in ok):,} rows, "
+        f"{sum(r.flagged for r in ok):,} flagged"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="directories or glob patterns of CSV/Excel files")
+    parser.add_argument("--profile", type=Path, default=None, help="JSON with mappings, weights and thresholds")
+    parser.add_argument("--out", type=Path, default=Path("batch_output"), help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows read per chunk")
+    parser.add_argument("--db", type=Path, default=None, help="also upsert the records into this SQLite file")
+    parser.add_argument("--summary", type=Path, default=None, help="write the per-file results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet":
+        import importlib.util
+
+        if importlib.util.find_spec("pyarrow") is None:
+            parser.error("--format parquet requires pyarrow (pip install pyarrow)")
+    try:
+        profile = load_profile(args.profile)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        parser.error("no CSV/Excel files matched")
+
+    started = time.perf_counter()
+    results = run_batch(inputs, profile, args.out, args.format, args.workers, args.batch_size, args.db)
+    print(format_summary(results))
+    print(f"wall time {time.perf_counter() - started:.2f}s")
+    if args.summary is not None:
+        payload = [{**asdict(r), "rows_per_sec": r.rows_per_sec} for r in results]
+        args.summary.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
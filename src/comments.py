@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+import pandas as pd
+
+# Free-text record fields copied into the comments table, with their kind
+RECORD_COMMENT_FIELDS = {"teacher_comment": "teacher", "coordinator_comment": "coordinator"}
+
+# Author of comments imported from uploaded files
+IMPORT_AUTHOR = "import"
+
+_COLUMNS = ("id", "student_name", "author", "kind", "body", "created_at", "record_id")
+
+
+@dataclass
+class Comment:
+    """A note about a student written in the app or imported from a file."""
+
+    student_name: str
+    author: str
+    body: str
+    kind: str = "teacher"
+    created_at: str | None = None
+
+
+class CommentsVersion(NamedTuple):
+    """Watermark of one student's comments, used as a read-cache key."""
+
+    count: int
+    max_id: int
+
+
+def fts_available(conn: sqlite3.Connection) -> bool:
+    """Return whether the full-text index exists in this database."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'comments_fts'").fetchone()
+    return row is not None
+
+
+def ensure_comments(conn: sqlite3.Connection) -> None:
+    """Create the comments table, its indexes and the FTS5 index once.
+
+    The first time the table is created the comment fields of existing
+    records are imported.  The FTS5 index uses the trigram tokenizer
+    (SQLite 3.34+), which matches substrings; without it,
+    :func:`search_comments` falls back to ``LIKE`` matching.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'comments'").fetchone()
+    if exists:
+        return
+    conn.execute(
+        "CREATE TABLE comments (id INTEGER PRIMARY KEY AUTOINCREMENT, student_name TEXT NOT NULL, "
+        "author TEXT NOT NULL, kind TEXT NOT NULL, body TEXT NOT NULL, created_at TEXT NOT NULL, "
+        "record_id INTEGER);"
+    )
+    conn.execute("CREATE INDEX idx_comments_student ON comments (student_name, created_at, id);")
+    conn.execute("CREATE INDEX idx_comments_author ON comments (author);")
+    # one imported comment per record and kind, so re-uploads update instead of duplicating
+    conn.execute(
+        "CREATE UNIQUE INDEX ux_comments_record ON comments (record_id, kind) WHERE record_id IS NOT NULL;"
+    )
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE comments_fts USING fts5(body, student_name, author, "
+            "content='comments', content_rowid='id', tokenize='trigram');"
+        )
+    except sqlite3.OperationalError:
+        pass
+    else:
+        # keep the external-content index in step with the table
+        conn.execute(
+            "CREATE TRIGGER comments_ai AFTER INSERT ON comments BEGIN "
+            "INSERT INTO comments_fts (rowid, body, student_name, author) "
+            "VALUES (new.id, new.body, new.student_name, new.author); END;"
+        )
+        conn.execute(
+            "CREATE TRIGGER comments_ad AFTER DELETE ON comments BEGIN "
+            "INSERT INTO comments_fts (comments_fts, rowid, body, student_name, author) "
+            "VALUES ('delete', old.id, old.body, old.student_name, old.author); END;"
+        )
+        conn.execute(
+            "CREATE TRIGGER comments_au AFTER UPDATE ON comments BEGIN "
+            "INSERT INTO comments_fts (comments_fts, rowid, body, student_name, author) "
+            "VALUES ('delete', old.id, old.body, old.student_name, old.author); "
+            "INSERT INTO comments_fts (rowid, body, student_name, author) "
+            "VALUES (new.id, new.body, new.student_name, new.author); END;"
+        )
+    import_record_comments(conn)
+
+
+def import_record_comments(conn: sqlite3.Connection, where: str = "") -> None:
+    """Copy the comment fields of records into the comments table.
+
+    ``where`` is an SQL condition on ``records`` restricting the rows to
+    import, such as the groups touched by an upload.  A record's comment is
+    updated in place when its text changed and skipped when it did not.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+    now = datetime.now().isoformat(sep=" ", timespec="seconds")
+    for field, kind in RECORD_COMMENT_FIELDS.items():
+        if field not in existing:
+            continue
+        created = "COALESCE(date, ?)" if "date" in existing else "?"
+        conn.execute(
+            f"INSERT INTO comments (student_name, author, kind, body, created_at, record_id) "
+            f"SELECT student_name, ?, ?, TRIM({field}), {created}, id FROM records "
+            f"WHERE student_name IS NOT NULL AND TRIM(IFNULL({field}, '')) != ''"
+            f"{' AND ' + where if where else ''} "
+            "ON CONFLICT (record_id, kind) WHERE record_id IS NOT NULL "
+            "DO UPDATE SET body = excluded.body WHERE body IS NOT excluded.body",
+            (IMPORT_AUTHOR, kind, now),
+        )
+
+
+def add_comments(conn: sqlite3.Connection, comments: Iterable[Comment]) -> int:
+    """Insert ``comments`` with one ``executemany`` in a single transaction.
+
+    Empty bodies are dropped; a missing ``created_at`` is set to now.
+    Returns the number of comments written.
+
+    Raises
+    ------
+    ValueError
+        If a comment has no student or author.
+    """
+    now = datetime.now().isoformat(sep=" ", timespec="seconds")
+    rows = []
+    for c in comments:
+        if not c.student_name or not c.author:
+            raise ValueError("comments need a student_name and an author")
+        body = c.body.strip()
+        if body:
+            rows.append((c.student_name, c.author, c.kind, body, c.created_at or now))
+    if rows:
+        with conn:
+            conn.executemany(
+                "INSERT INTO comments (student_name, author, kind, body, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+    return len(rows)
+
+
+def comments_version(conn: sqlite3.Connection, student_name: str) -> CommentsVersion:
+    """Count and newest id of a student's comments, read from the index."""
+    count, max_id = conn.execute(
+        "SELECT COUNT(*), IFNULL(MAX(id), 0) FROM comments WHERE student_name = ?", (student_name,)
+    ).fetchone()
+    return CommentsVersion(int(count), int(max_id))
+
+
+def comments_page(
+    conn: sqlite3.Connection,
+    student_name: str,
+    number: int = 0,
+    size: int = 20,
+    kind: str | None = None,
+) -> pd.DataFrame:
+    """Page ``number`` (0-based) of a student's comments, newest first.
+
+    Only ``size`` rows are read, through the ``(student_name, created_at)``
+    index.  ``kind`` restricts the page to e.g. coordinator comments.
+    """
+    if size < 1:
+        raise ValueError("page size must be at least 1")
+    query = f"SELECT {', '.join(_COLUMNS)} FROM comments WHERE student_name = ?"
+    params: list = [student_name]
+    if kind is not None:
+        query += " AND kind = ?"
+        params.append(kind)
+    query += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+    params += [int(size), max(int(number), 0) * int(size)]
+    return pd.read_sql_query(query, conn, params=tuple(params))
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query requiring every word as a substring.
+
+    Words are quoted, so FTS5 operators and punctuation typed by the user
+    are searched for literally instead of raising syntax errors.  Words
+    shorter than three characters cannot use the trigram index and are left
+    out; :func:`search_comments` matches them with ``LIKE``.
+    """
+    return " ".join(f'"{w}"' for w in re.findall(r"\w+", text) if len(w) >= 3)
+
+
+def search_comments(
+    conn: sqlite3.Connection,
+    text: str,
+    student_name: str | None = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> pd.DataFrame:
+    """Comments containing every word of ``text``, best matches first.
+
+    Words match anywhere inside a word, so a search finds Hebrew words with
+    attached prefixes (``מתמטיקה`` in ``במתמטיקה``).  The FTS5 trigram index
+    ranks results by ``bm25`` and a ``snippet`` column marks the matches with
+    ``**``; without FTS5, or for words under three characters, ``LIKE``
+    matching is used and results are ordered by recency.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return pd.DataFrame(columns=[*_COLUMNS, "snippet"])
+    columns = ", ".join(f"c.{c}" for c in _COLUMNS)
+    match = fts_query(text) if fts_available(conn) else ""
+    clauses: list[str] = []
+    params: list = []
+    if match:
+        query = (
+            f"SELECT {columns}, snippet(comments_fts, 0, '**', '**', '…', 12) AS snippet "
+            "FROM comments_fts JOIN comments AS c ON c.id = comments_fts.rowid"
+        )
+        clauses.append("comments_fts MATCH ?")
+        params.append(match)
+        order = "bm25(comments_fts), c.id DESC"
+    else:
+        query = f"SELECT {columns}, c.body AS snippet FROM comments AS c"
+        order = "c.created_at DESC, c.id DESC"
+    for w in words:
+        if not match or len(w) < 3:
+            clauses.append("c.body LIKE ? ESCAPE '\\'")
+            # words are \w+ runs, so only "_" needs escaping
+            params.append("%" + w.replace("_", "\\_") + "%")
+    if student_name is not None:
+        clauses.append("c.student_name = ?")
+        params.append(student_name)
+    query += f" WHERE {' AND '.join(clauses)} ORDER BY {order} LIMIT ? OFFSET ?"
+    params += [int(limit), int(offset)]
+    return pd.read_sql_query(query, conn, params=tuple(params))
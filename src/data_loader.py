@@ -1,21 +1,116 @@
 from __future__ import annotations
+import hashlib
+from pathlib import Path
+from typing import Iterator
 import pandas as pd
 
-numeric_keys = [
-    "quiz_avg",
-    "quarter_exam",
-    "midterm_mock",
-    "half_semester_final",
-    "national_percentile",
-    "homework_rate",
-]
+from .profiling import instrument
+from .schema import compile_schema
 
+# Canonical fields holding numeric scores and rates, in schema order
+numeric_keys = list(compile_schema().numeric_keys)
 
+
+@instrument()
 def load_excel(file) -> pd.DataFrame:
     """Read an uploaded Excel file into a DataFrame."""
     return pd.read_excel(file)
 
 
+def _file_suffix(file) -> str:
+    """Best-effort file extension for paths and uploaded file objects."""
+    name = file if isinstance(file, (str, Path)) else getattr(file, "name", "")
+    return Path(str(name)).suffix.lower()
+
+
+def file_sha256(file) -> str:
+    """Return the SHA-256 hex digest of a path or binary file object.
+
+    File objects are read in chunks and rewound afterwards so they can still
+    be parsed.
+    """
+    digest = hashlib.sha256()
+    if isinstance(file, (str, Path)):
+        with open(file, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def _header_names(values: tuple) -> list[str]:
+    """Mirror pandas' naming of blank and duplicate header cells."""
+    names: list[str] = []
+    seen: dict[str, int] = {}
+    for i, v in enumerate(values):
+        name = f"Unnamed: {i}" if v is None or str(v).strip() == "" else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_excel_batches(file, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield the first worksheet of an xlsx file as DataFrames of ``batch_size`` rows.
+
+    The workbook is opened in openpyxl's read-only mode so rows are streamed
+    from the archive instead of being materialised all at once.
+    """
+    from openpyxl import load_workbook
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _header_names(header)
+        batch: list[tuple] = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            batch.append(tuple(row[: len(columns)]) + (None,) * (len(columns) - len(row)))
+            if len(batch) >= batch_size:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        wb.close()
+
+
+def iter_csv_batches(file, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield a CSV file as DataFrames of ``batch_size`` rows."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    with pd.read_csv(file, chunksize=batch_size, encoding="utf-8-sig") as reader:
+        yield from reader
+
+
+@instrument()
+def iter_batches(file, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """Yield raw row batches from a CSV, xlsx or legacy xls upload."""
+    suffix = _file_suffix(file)
+    if suffix == ".csv":
+        yield from iter_csv_batches(file, batch_size)
+    elif suffix == ".xls":
+        # openpyxl cannot stream the legacy format; fall back to a full read
+        df = load_excel(file)
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start : start + batch_size]
+    else:
+        yield from iter_excel_batches(file, batch_size)
+
+
 def map_columns(df_raw: pd.DataFrame, mappings: dict[str, str]) -> pd.DataFrame:
     """Return DataFrame with columns renamed to canonical keys."""
     df = pd.DataFrame()
@@ -25,6 +120,7 @@ def map_columns(df_raw: pd.DataFrame, mappings: dict[str, str]) -> pd.DataFrame:
     return df
 
 
+@instrument()
 def normalize_dataframe(df_raw: pd.DataFrame, mappings: dict[str, str]) -> pd.DataFrame:
     """Return DataFrame with columns renamed to canonical keys and numeric fields coerced."""
     df = map_columns(df_raw, mappings)
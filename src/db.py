@@ -1,40 +1,691 @@
 from __future__ import annotations
 
+import json
+import logging
+import queue
 import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Sequence
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
-from .schema import load_schema
+from .comments import ensure_comments, import_record_comments
+from .schema import compile_schema, field_dtypes, lazy_fields, load_schema
 from .data_loader import numeric_keys
+from .profiling import instrument
 
 DB_PATH = Path(__file__).resolve().parent.parent / "student_data.db"
 
+logger = logging.getLogger(__name__)
+
+# Columns used by the student/class/semester views and per-student history
+INDEXED_COLUMNS = ("student_name", "class_name", "semester", "date")
+
+# A student has at most one record per class, semester and date
+NATURAL_KEY = ("student_name", "class_name", "semester", "date")
+_NATURAL_KEY_SQL = ", ".join(f"IFNULL({c}, '')" for c in NATURAL_KEY)
+
+# Granularity of the materialized student_summary table
+SUMMARY_KEY = ("student_name", "class_name", "semester")
+_SUMMARY_KEY_SQL = ", ".join(f"IFNULL({c}, '')" for c in SUMMARY_KEY)
+# Records of the groups in temp.touched_groups, looked up by student through
+# idx_records_student_name; see _refresh_student_summary
+_TOUCHED_SQL = (
+    "records.id IN (SELECT r.id FROM temp.touched_groups AS t JOIN records AS r "
+    "ON r.student_name IS t.student_name AND IFNULL(r.class_name, '') = t.class_name "
+    "AND IFNULL(r.semester, '') = t.semester)"
+)
+_TOUCHED_SUMMARY_SQL = (
+    "rowid IN (SELECT s.rowid FROM temp.touched_groups AS t JOIN student_summary AS s "
+    "ON IFNULL(s.student_name, '') = IFNULL(t.student_name, '') AND IFNULL(s.class_name, '') = t.class_name "
+    "AND IFNULL(s.semester, '') = t.semester)"
+)
+
+
+# Bump when the DDL in init_db changes; see _schema_version
+_DDL_REVISION = 2
+
+# How long a connection waits for another writer's lock before failing
+BUSY_TIMEOUT_MS = 5000
+
+# Applied to pooled read connections on top of the common settings
+_READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA cache_size = -32000",  # KiB, i.e. 32 MiB of page cache per reader
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class DataVersion(NamedTuple):
+    """Cheap watermark identifying the contents of the records table.
+
+    ``revision`` is bumped whenever existing rows are updated in place, which
+    row count and max id alone cannot detect.
+    """
+
+    row_count: int
+    max_id: int
+    revision: int = 0
+
+
+@dataclass
+class InsertResult:
+    """Row counts reported by :func:`insert_dataframe`."""
+
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    already_ingested: bool = False
+
+
+def _schema_version(schema: dict) -> int:
+    """``PRAGMA user_version`` value identifying the DDL and canonical fields."""
+    fields = [(f["key"], f["key"] in numeric_keys) for f in schema.get("canonical_fields", [])]
+    return zlib.crc32(json.dumps([_DDL_REVISION, fields]).encode("utf-8")) & 0x7FFFFFFF
+
+
+def connect(db_path: Path | str = DB_PATH, readonly: bool = False) -> sqlite3.Connection:
+    """Open a connection to an initialized database with the shared settings.
+
+    Every connection waits up to :data:`BUSY_TIMEOUT_MS` for locks and uses
+    ``synchronous=NORMAL``, which is durable enough in WAL mode.  Read-only
+    connections refuse writes and get a larger page cache and memory-mapped
+    I/O.  Connections may be handed between threads, but must be used by one
+    thread at a time; see :class:`ConnectionPool`.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    if readonly:
+        for pragma in _READ_PRAGMAS:
+            conn.execute(pragma)
+    return conn
+
 
 def init_db(db_path: Path = DB_PATH) -> sqlite3.Connection:
-    """Initialize database and ensure table exists according to schema."""
+    """Initialize database and ensure table exists according to schema.
+
+    The schema version is stored in ``PRAGMA user_version``; a database that
+    is already up to date is opened without issuing any DDL, so the table
+    creation and migrations below run once per database rather than on every
+    call.
+    """
     schema = load_schema()
-    conn = sqlite3.connect(db_path)
-    columns = []
-    for field in schema.get("canonical_fields", []):
-        key = field["key"]
-        sql_type = "REAL" if key in numeric_keys else "TEXT"
-        columns.append(f"{key} {sql_type}")
-    cols_sql = ", ".join(["id INTEGER PRIMARY KEY AUTOINCREMENT"] + columns)
-    conn.execute(f"CREATE TABLE IF NOT EXISTS records ({cols_sql});")
+    conn = connect(db_path)
+    version = _schema_version(schema)
+    if conn.execute("PRAGMA user_version").fetchone()[0] == version:
+        return conn
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute(compile_schema().records_ddl)
+    existing = set(record_columns(conn))
+    for col in INDEXED_COLUMNS:
+        if col in existing:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_records_{col} ON records ({col});")
+    _ensure_natural_key(conn)
+    conn.execute("CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ingested_files "
+        "(content_hash TEXT PRIMARY KEY, rows INTEGER NOT NULL, ingested_at TEXT NOT NULL);"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS column_mappings (fingerprint TEXT PRIMARY KEY, columns TEXT NOT NULL, "
+        "mappings TEXT NOT NULL, confirmed_at TEXT NOT NULL);"
+    )
+    _ensure_student_summary(conn)
+    ensure_comments(conn)
+    conn.execute(f"PRAGMA user_version = {version}")
     conn.commit()
     return conn
 
 
-def insert_dataframe(df: pd.DataFrame, conn: sqlite3.Connection) -> None:
-    """Append a normalized DataFrame into the records table."""
-    df.to_sql("records", conn, if_exists="append", index=False)
+class ConnectionPool:
+    """Process-wide pool of connections to one SQLite database.
+
+    The database is initialized (schema and migrations) once when the pool
+    is created.  :meth:`reader` lends one of up to ``max_readers`` read-only
+    connections, reused across threads and sessions, and runs the block in a
+    single read transaction so every query in it sees the same snapshot; in
+    WAL mode readers never wait for the writer.  :meth:`writer` lends the one
+    write connection, serializing writers within the process; other
+    processes are handled by SQLite's lock and the busy timeout.
+
+    Use :func:`get_pool` rather than creating pools directly.
+    """
+
+    def __init__(self, db_path: Path | str = DB_PATH, max_readers: int = 8):
+        if max_readers < 1:
+            raise ValueError("max_readers must be at least 1")
+        self.db_path = db_path
+        init_db(db_path).close()
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_readers)
+        self._write_lock = threading.Lock()
+        self._writer: sqlite3.Connection | None = None
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.db_path, readonly=True)
+            try:
+                conn.execute("BEGIN")
+                yield conn
+            finally:
+                conn.rollback()
+                self._idle.put(conn)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = connect(self.db_path)
+            yield self._writer
+
+    def close(self) -> None:
+        """Close the idle connections; the pool stays usable."""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_path: Path | str = DB_PATH) -> ConnectionPool:
+    """Return the process-wide :class:`ConnectionPool` for ``db_path``."""
+    key = str(Path(db_path).resolve())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = ConnectionPool(db_path)
+    return pool
+
+
+def _summary_metrics(conn: sqlite3.Connection) -> list[str]:
+    existing = set(record_columns(conn))
+    return [k for k in numeric_keys if k in existing]
+
+
+def _ensure_student_summary(conn: sqlite3.Connection) -> None:
+    """Create the per-student/per-semester aggregate table and fill it once."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_summary'"
+    ).fetchone()
+    if exists:
+        return
+    metrics = []
+    for k in _summary_metrics(conn):
+        metrics += [f"sum_{k} REAL", f"count_{k} INTEGER NOT NULL", f"min_{k} REAL"]
+    cols_sql = ", ".join(
+        ["student_name TEXT", "class_name TEXT", "semester TEXT", "n_records INTEGER NOT NULL",
+         "last_date TEXT", "last_id INTEGER"] + metrics
+    )
+    conn.execute(f"CREATE TABLE student_summary ({cols_sql});")
+    conn.execute(f"CREATE UNIQUE INDEX ux_student_summary ON student_summary ({_SUMMARY_KEY_SQL});")
+    conn.execute("CREATE INDEX idx_student_summary_class_name ON student_summary (class_name);")
+    _refresh_student_summary(conn, None)
+
+
+def _refresh_student_summary(conn: sqlite3.Connection, groups: list[tuple] | None) -> None:
+    """Recompute the summary rows of ``groups`` (all rows when ``None``) from records.
+
+    ``groups`` holds ``(student_name, class_name, semester)`` tuples as
+    returned by :func:`_summary_groups`: the class and semester with missing
+    parts given as ``''``, matching the IFNULL keys of both tables, and the
+    student as stored, so the lookup can use the student index.
+    """
+    aggs = []
+    for k in _summary_metrics(conn):
+        aggs += [f"SUM({k})", f"COUNT({k})", f"MIN({k})"]
+    select = (
+        f"SELECT student_name, class_name, semester, COUNT(*), MAX(date), MAX(id)"
+        f"{''.join(', ' + a for a in aggs)} FROM records"
+    )
+    if groups is None:
+        conn.execute("DELETE FROM student_summary")
+        conn.execute(f"INSERT INTO student_summary {select} GROUP BY {_SUMMARY_KEY_SQL}")
+        return
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS touched_groups (student_name TEXT, class_name TEXT, semester TEXT)"
+    )
+    conn.execute("DELETE FROM temp.touched_groups")
+    conn.executemany("INSERT INTO temp.touched_groups VALUES (?, ?, ?)", groups)
+    conn.execute(f"DELETE FROM student_summary WHERE {_TOUCHED_SUMMARY_SQL}")
+    conn.execute(f"INSERT INTO student_summary {select} WHERE {_TOUCHED_SQL} GROUP BY {_SUMMARY_KEY_SQL}")
+
+
+def _ensure_natural_key(conn: sqlite3.Connection) -> int:
+    """Create the unique natural-key index, setting older duplicate rows aside first.
+
+    Databases written before upserts existed may hold repeated uploads.  The
+    most recently inserted copy of each record stays in ``records``; the
+    other copies are moved to ``records_duplicates`` (with ``moved_at``)
+    rather than deleted, so rows that only collide because their key parts
+    are missing (e.g. no date) can be reviewed and restored.  Returns the
+    number of rows moved, which is also logged.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_records_natural_key'"
+    ).fetchone()
+    if exists:
+        return 0
+    duplicates = f"id NOT IN (SELECT MAX(id) FROM records GROUP BY {_NATURAL_KEY_SQL})"
+    moved = conn.execute(f"SELECT COUNT(*) FROM records WHERE {duplicates}").fetchone()[0]
+    if moved:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records_duplicates AS SELECT *, '' AS moved_at FROM records WHERE 0"
+        )
+        kept = {row[1] for row in conn.execute("PRAGMA table_info(records_duplicates)")}
+        columns = ", ".join(c for c in record_columns(conn) if c in kept)
+        conn.execute(
+            f"INSERT INTO records_duplicates ({columns}, moved_at) "
+            f"SELECT {columns}, ? FROM records WHERE {duplicates}",
+            (datetime.now().isoformat(timespec="seconds"),),
+        )
+        conn.execute(f"DELETE FROM records WHERE {duplicates}")
+        logger.warning(
+            "moved %d duplicate record(s) sharing (%s) to records_duplicates before adding the natural key",
+            moved,
+            ", ".join(NATURAL_KEY),
+        )
+    conn.execute(f"CREATE UNIQUE INDEX ux_records_natural_key ON records ({_NATURAL_KEY_SQL});")
+    return moved
+
+
+def _sql_values(series: pd.Series) -> list:
+    """Convert a column to Python values sqlite3 can bind (NaN/NaT → NULL)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return [None if pd.isna(v) else v.isoformat(sep=" ") for v in series]
+    values = series.astype(object).where(series.notna(), None).tolist()
+    return [v.isoformat(sep=" ") if isinstance(v, datetime) else v for v in values]
+
+
+def is_ingested(conn: sqlite3.Connection, content_hash: str) -> bool:
+    """Return whether a file with this content hash was already ingested."""
+    row = conn.execute("SELECT 1 FROM ingested_files WHERE content_hash = ?", (content_hash,)).fetchone()
+    return row is not None
+
+
+def mark_ingested(conn: sqlite3.Connection, content_hash: str, rows: int) -> None:
+    """Remember that a file with this content hash has been ingested."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ingested_files (content_hash, rows, ingested_at) VALUES (?, ?, ?)",
+            (content_hash, int(rows), datetime.now().isoformat(sep=" ", timespec="seconds")),
+        )
+
+
+def load_mapping(conn: sqlite3.Connection, fingerprint: str) -> dict[str, str] | None:
+    """Return the confirmed column mapping for a header fingerprint, if any.
+
+    See :func:`src.mapping.header_fingerprint`.
+    """
+    row = conn.execute("SELECT mappings FROM column_mappings WHERE fingerprint = ?", (fingerprint,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def saved_mappings(conn: sqlite3.Connection) -> dict[str, dict[str, str]]:
+    """Return every confirmed column mapping keyed by header fingerprint."""
+    return {fp: json.loads(m) for fp, m in conn.execute("SELECT fingerprint, mappings FROM column_mappings")}
+
+
+def save_mapping(
+    conn: sqlite3.Connection, fingerprint: str, columns: Sequence[str], mappings: dict[str, str]
+) -> None:
+    """Remember ``mappings`` as confirmed for the header layout ``columns``."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO column_mappings (fingerprint, columns, mappings, confirmed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                fingerprint,
+                json.dumps([str(c) for c in columns], ensure_ascii=False),
+                json.dumps(mappings, ensure_ascii=False),
+                datetime.now().isoformat(sep=" ", timespec="seconds"),
+            ),
+        )
+
+
+@instrument()
+def insert_dataframe(
+    df: pd.DataFrame, conn: sqlite3.Connection, content_hash: str | None = None
+) -> InsertResult:
+    """Upsert a normalized DataFrame into the records table.
+
+    Rows are matched on :data:`NATURAL_KEY`; new keys are inserted, existing
+    keys whose values changed are updated and identical rows are skipped.  All
+    rows are written with one ``executemany`` inside a single transaction,
+    which also refreshes the affected rows of the ``student_summary`` table
+    and copies new or changed comment fields into the ``comments`` table.
+
+    When ``content_hash`` is given and a file with that hash was already
+    ingested, nothing is written and every row is reported as skipped.
+    """
+    if content_hash is not None and is_ingested(conn, content_hash):
+        return InsertResult(skipped=len(df), already_ingested=True)
+    if df.empty:
+        return InsertResult()
+
+    columns = _checked_columns(conn, [c for c in df.columns if c != "id"])
+    rows = list(zip(*(_sql_values(df[c]) for c in columns)))
+    values = [c for c in columns if c not in NATURAL_KEY]
+    if values:
+        changed = " OR ".join(f"records.{c} IS NOT excluded.{c}" for c in values)
+        on_conflict = (
+            f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in values)} WHERE {changed}"
+        )
+    else:
+        on_conflict = "DO NOTHING"
+    query = (
+        f"INSERT INTO records ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT ({_NATURAL_KEY_SQL}) {on_conflict}"
+    )
+
+    with conn:
+        if not conn.in_transaction:
+            # take the write lock up front so the counts below are consistent
+            conn.execute("BEGIN IMMEDIATE")
+        (before,) = conn.execute("SELECT COUNT(*) FROM records").fetchone()
+        changes_before = conn.total_changes
+        conn.executemany(query, rows)
+        changes = conn.total_changes - changes_before
+        (after,) = conn.execute("SELECT COUNT(*) FROM records").fetchone()
+        result = InsertResult(inserted=after - before, updated=changes - (after - before))
+        result.skipped = len(rows) - changes
+        if changes:
+            _refresh_student_summary(conn, _summary_groups(df))
+            # the summary refresh left the touched groups in temp.touched_groups
+            import_record_comments(conn, _TOUCHED_SQL)
+        if result.updated:
+            conn.execute(
+                "INSERT INTO db_meta (key, value) VALUES ('revision', 1) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+        if content_hash is not None:
+            mark_ingested(conn, content_hash, len(rows))
+    return result
+
+
+def _summary_groups(df: pd.DataFrame) -> list[tuple]:
+    """Distinct summary keys of ``df`` as stored text, with ``''`` for missing.
+
+    A missing student is listed both as ``None`` and as ``''`` because records
+    store either, and both belong to the same summary row.
+    """
+    keys = pd.DataFrame(
+        {
+            c: (_sql_values(df[c]) if c in df.columns else [None] * len(df))
+            for c in SUMMARY_KEY
+        }
+    )
+    keys = keys.map(lambda v: "" if v is None else str(v)).drop_duplicates()
+    groups = list(keys.itertuples(index=False, name=None))
+    return groups + [(None, *rest) for student, *rest in groups if student == ""]
+
+
+def load_student_summary(
+    conn: sqlite3.Connection,
+    student_name: str | Sequence[str] | None = None,
+    class_name: str | Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Load materialized per-student, per-class, per-semester aggregates.
+
+    Every row carries ``n_records``, the latest ``date``/``id`` and, for each
+    numeric field ``k``, ``sum_k``/``count_k``/``min_k`` of the matching
+    records.  See :func:`src.analytics.profile_from_summary`.
+    """
+    where, params = _filter_sql({"student_name": student_name, "class_name": class_name})
+    return pd.read_sql_query(f"SELECT * FROM student_summary{where}", conn, params=tuple(params))
+
+
+def data_version(conn: sqlite3.Connection) -> DataVersion:
+    """Return the current row-count/max-id/revision watermark of the records table."""
+    count, max_id, revision = conn.execute(
+        "SELECT COUNT(*), IFNULL(MAX(id), 0), "
+        "(SELECT IFNULL(MAX(value), 0) FROM db_meta WHERE key = 'revision') FROM records"
+    ).fetchone()
+    return DataVersion(int(count), int(max_id), int(revision))
+
+
+def count_records_since(conn: sqlite3.Connection, after_id: int) -> int:
+    """Return the number of records with an id greater than ``after_id``."""
+    (count,) = conn.execute("SELECT COUNT(*) FROM records WHERE id > ?", (after_id,)).fetchone()
+    return int(count)
+
+
+def record_columns(conn: sqlite3.Connection) -> list[str]:
+    """Return the column names of the records table in table order."""
+    return [row[1] for row in conn.execute("PRAGMA table_info(records)")]
+
+
+def _checked_columns(conn: sqlite3.Connection, columns: Sequence[str]) -> list[str]:
+    """Validate column names before they are interpolated into SQL."""
+    known = set(record_columns(conn))
+    unknown = [c for c in columns if c not in known]
+    if unknown:
+        raise ValueError(f"unknown records columns: {', '.join(unknown)}")
+    return list(columns)
+
+
+def _filter_sql(filters: dict[str, str | Sequence[str] | None]) -> tuple[str, list]:
+    """Build a WHERE clause from equality/IN filters, skipping ``None`` values."""
+    clauses = []
+    params: list = []
+    for col, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            clauses.append(f"{col} = ?")
+            params.append(value)
+        else:
+            values = list(value)
+            if not values:
+                clauses.append("0")
+                continue
+            clauses.append(f"{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert columns in place to the compact dtypes declared in ``schema.json``.
+
+    Names, classes and semesters become categoricals and scores ``float32``.
+    """
+    for key, dtype in field_dtypes().items():
+        if key not in df.columns:
+            continue
+        if dtype == "category" and not isinstance(df[key].dtype, pd.CategoricalDtype):
+            df[key] = df[key].astype("category")
+        elif dtype == "float32" and df[key].dtype != np.float32:
+            df[key] = pd.to_numeric(df[key], errors="coerce").astype(np.float32)
+    return df
+
+
+def concat_records(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate record frames, keeping categorical columns categorical."""
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    out = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = union_categoricals([f[col] for f in frames], ignore_order=True)
+    return out
+
+
+def query_records(
+    conn: sqlite3.Connection,
+    columns: Sequence[str] | None = None,
+    student_name: str | Sequence[str] | None = None,
+    class_name: str | Sequence[str] | None = None,
+    semester: str | Sequence[str] | None = None,
+    after_id: int | None = None,
+    order_by: Sequence[str] = ("id",),
+    limit: int | None = None,
+    offset: int = 0,
+    compact: bool = False,
+    chunksize: int = 50_000,
+) -> pd.DataFrame:
+    """Load a projection of the records table filtered and paginated in SQL.
+
+    Parameters
+    ----------
+    columns:
+        Columns to return; ``None`` selects every column.
+    student_name, class_name, semester:
+        A single value or a sequence of accepted values.  The indexed columns
+        let SQLite touch only the matching rows.
+    after_id:
+        Only return rows inserted after this id.
+    order_by:
+        Columns to sort by; prefix a name with ``-`` for descending order.
+    limit, offset:
+        Page size and starting row for pagination.
+    compact:
+        Convert each fetched chunk of ``chunksize`` rows with
+        :func:`compact_frame`, so the wide object-dtype frame is never held
+        for the whole result.
+    """
+    query, params = _records_query(
+        conn, columns, student_name, class_name, semester, after_id, order_by, limit, offset
+    )
+    if not compact:
+        return pd.read_sql_query(query, conn, params=tuple(params))
+    chunks = list(_compact_chunks(query, params, conn, chunksize))
+    if not chunks:
+        return compact_frame(pd.read_sql_query(query, conn, params=tuple(params)))
+    return concat_records(chunks)
+
+
+def _records_query(
+    conn: sqlite3.Connection,
+    columns: Sequence[str] | None,
+    student_name,
+    class_name,
+    semester,
+    after_id: int | None,
+    order_by: Sequence[str],
+    limit: int | None,
+    offset: int,
+) -> tuple[str, list]:
+    """SQL and parameters of a :func:`query_records` call."""
+    select = "*" if columns is None else ", ".join(_checked_columns(conn, columns))
+    where, params = _filter_sql(
+        {"student_name": student_name, "class_name": class_name, "semester": semester}
+    )
+    if after_id is not None:
+        where += (" AND " if where else " WHERE ") + "id > ?"
+        params.append(after_id)
+    order = [(c[1:], "DESC") if c.startswith("-") else (c, "ASC") for c in order_by]
+    _checked_columns(conn, [c for c, _ in order])
+    query = f"SELECT {select} FROM records{where}"
+    if order:
+        query += " ORDER BY " + ", ".join(f"{c} {d}" for c, d in order)
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+    elif offset:
+        query += " LIMIT -1 OFFSET ?"
+        params.append(int(offset))
+    return query, params
+
+
+def _compact_chunks(query: str, params: list, conn: sqlite3.Connection, chunksize: int) -> Iterator[pd.DataFrame]:
+    for chunk in pd.read_sql_query(query, conn, params=tuple(params), chunksize=chunksize):
+        yield compact_frame(chunk)
+
+
+def iter_records(
+    conn: sqlite3.Connection,
+    columns: Sequence[str] | None = None,
+    student_name: str | Sequence[str] | None = None,
+    class_name: str | Sequence[str] | None = None,
+    order_by: Sequence[str] = ("id",),
+    chunksize: int = 50_000,
+) -> Iterator[pd.DataFrame]:
+    """Stream the rows :func:`load_records` would return as compact chunks.
+
+    Only one chunk of ``chunksize`` rows is held at a time, so exports can
+    walk the whole table with bounded memory.  Ordering by
+    ``("student_name", "id")`` follows the ``student_name`` index and keeps
+    every student's rows contiguous across chunk boundaries.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    query, params = _records_query(conn, columns, student_name, class_name, None, None, order_by, None, 0)
+    yield from _compact_chunks(query, params, conn, chunksize)
+
+
+@instrument()
+def load_records(
+    conn: sqlite3.Connection,
+    student_name: str | None = None,
+    after_id: int | None = None,
+    compact: bool = False,
+    include_comments: bool = True,
+) -> pd.DataFrame:
+    """Load records from the database, optionally filtered by student name.
+
+    When ``after_id`` is given only rows inserted after that id are returned,
+    which lets callers extend previously loaded frames incrementally.  With
+    ``compact`` the frame uses the categorical/``float32`` dtypes from
+    ``schema.json``; ``include_comments=False`` leaves out the free-text
+    fields, which :func:`load_comments` fetches on demand.
+    """
+    columns = None
+    if not include_comments:
+        lazy = set(lazy_fields())
+        columns = [c for c in record_columns(conn) if c not in lazy]
+    return query_records(
+        conn, columns=columns, student_name=student_name or None, after_id=after_id, compact=compact
+    )
+
+
+def load_comments(conn: sqlite3.Connection, student_name: str | Sequence[str] | None = None) -> pd.DataFrame:
+    """Load the free-text fields left out by ``load_records(include_comments=False)``.
+
+    Rows carry their record ``id`` so they can be joined back to the records.
+    """
+    lazy = [c for c in lazy_fields() if c in set(record_columns(conn))]
+    return query_records(conn, columns=["id", "student_name", *lazy], student_name=student_name or None)
+
 
+@instrument()
+def semester_means(
+    conn: sqlite3.Connection,
+    fields: Sequence[str],
+    student_name: str | Sequence[str] | None = None,
+    class_name: str | Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Return per-student, per-semester means of ``fields`` aggregated in SQL.
 
-def load_records(conn: sqlite3.Connection, student_name: str | None = None) -> pd.DataFrame:
-    """Load records from the database, optionally filtered by student name."""
-    query = "SELECT * FROM records"
-    params: tuple = ()
-    if student_name:
-        query += " WHERE student_name = ?"
-        params = (student_name,)
-    return pd.read_sql_query(query, conn, params=params)
+    The result has ``student_name`` and ``semester`` columns followed by one
+    column per field, ready for :func:`src.analytics.trend_deltas_from_means`.
+    """
+    fields = _checked_columns(conn, fields)
+    where, params = _filter_sql({"student_name": student_name, "class_name": class_name})
+    not_null = "student_name IS NOT NULL AND semester IS NOT NULL"
+    where = f"{where} AND {not_null}" if where else f" WHERE {not_null}"
+    aggs = ", ".join(f"AVG({f}) AS {f}" for f in fields)
+    query = (
+        f"SELECT student_name, semester{', ' + aggs if aggs else ''} FROM records{where} "
+        "GROUP BY student_name, semester ORDER BY student_name, semester"
+    )
+    return pd.read_sql_query(query, conn, params=tuple(params))
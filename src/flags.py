@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .schema import load_schema
+from .trends import _group_codes
+
+# Comparison operators allowed in ``flag_rules`` conditions
+OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Column holding the per-row bitmask of fired rules
+REASONS_COLUMN = "flag_reasons"
+
+_MAX_RULES = 63
+
+
+@dataclass(frozen=True)
+class Condition:
+    """One comparison of a column against a constant or a named threshold.
+
+    ``field`` may end in ``*`` (e.g. ``delta_*``) to match every trend delta
+    column; the condition then holds when any of them matches.  A
+    ``threshold`` name starting with ``-`` compares against the negated
+    absolute threshold, which is how drops are expressed.
+    """
+
+    field: str
+    op: str
+    value: float | None = None
+    threshold: str | None = None
+
+    def limit(self, thresholds: Mapping[str, float]) -> float:
+        if self.threshold is None:
+            return float(self.value)
+        name = self.threshold.lstrip("-")
+        if name not in thresholds:
+            raise ValueError(f"unknown threshold {name!r} in flag rule condition on {self.field!r}")
+        value = float(thresholds[name])
+        return -abs(value) if self.threshold.startswith("-") else value
+
+
+@dataclass(frozen=True)
+class FlagRule:
+    """A named flag criterion: conditions combined with ``all`` or ``any``."""
+
+    id: str
+    label_he: str
+    conditions: tuple[Condition, ...]
+    combine: str
+    bit: int
+
+    @property
+    def mask(self) -> int:
+        return 1 << self.bit
+
+
+def _condition(raw: dict) -> Condition:
+    op = raw.get("op")
+    if op not in OPS:
+        raise ValueError(f"unknown operator {op!r}; expected one of {', '.join(OPS)}")
+    if ("value" in raw) == ("threshold" in raw):
+        raise ValueError(f"condition on {raw.get('field')!r} needs exactly one of 'value' or 'threshold'")
+    return Condition(raw["field"], op, raw.get("value"), raw.get("threshold"))
+
+
+def compile_rules(schema: dict | None = None) -> tuple[FlagRule, ...]:
+    """Parse and validate the ``flag_rules`` of ``schema`` (default: ``schema.json``).
+
+    Rule ``i`` owns bit ``i`` of the :data:`REASONS_COLUMN` bitmask.  Rules
+    with ``"enabled": false`` are validated but left out, keeping their bit
+    unused, so switching a rule on or off does not renumber the others.
+
+    Raises
+    ------
+    ValueError
+        On unknown operators, conditions without exactly one of ``value`` or
+        ``threshold``, rules with both or neither of ``all``/``any``,
+        duplicate ids or more than 63 rules.
+    """
+    if schema is None:
+        return _default_rules()
+    raw_rules = schema.get("flag_rules", [])
+    if len(raw_rules) > _MAX_RULES:
+        raise ValueError(f"at most {_MAX_RULES} flag rules are supported")
+    rules = []
+    seen = set()
+    for bit, raw in enumerate(raw_rules):
+        rule_id = raw["id"]
+        if rule_id in seen:
+            raise ValueError(f"duplicate flag rule id {rule_id!r}")
+        seen.add(rule_id)
+        if ("all" in raw) == ("any" in raw):
+            raise ValueError(f"flag rule {rule_id!r} needs exactly one of 'all' or 'any'")
+        combine = "all" if "all" in raw else "any"
+        conditions = tuple(_condition(c) for c in raw[combine])
+        if raw.get("enabled", True):
+            rules.append(FlagRule(rule_id, raw.get("label_he", rule_id), conditions, combine, bit))
+    return tuple(rules)
+
+
+@lru_cache(maxsize=1)
+def _default_rules() -> tuple[FlagRule, ...]:
+    return compile_rules(load_schema())
+
+
+def _columns(df: pd.DataFrame, field: str, trend_fields: Sequence[str] | None) -> list[str]:
+    if not field.endswith("*"):
+        return [field] if field in df.columns else []
+    prefix = field[:-1]
+    if prefix == "delta_" and trend_fields is not None:
+        return [f"delta_{k}" for k in trend_fields if f"delta_{k}" in df.columns]
+    return [c for c in df.columns if c.startswith(prefix)]
+
+
+def evaluate_rules(
+    df: pd.DataFrame,
+    thresholds: Mapping[str, float],
+    trend_fields: Sequence[str] | None = None,
+    rules: Sequence[FlagRule] | None = None,
+) -> np.ndarray:
+    """Return the ``int64`` bitmask of fired rules for every row of ``df``.
+
+    Each referenced column is converted to a ``float64`` array once and every
+    condition is a single vectorized comparison; missing values and missing
+    columns never satisfy a condition.  ``trend_fields`` limits ``delta_*``
+    to the deltas of those fields.
+    """
+    rules = compile_rules() if rules is None else rules
+    n = len(df)
+    reasons = np.zeros(n, dtype=np.int64)
+    arrays: dict[str, np.ndarray] = {}
+
+    def values(col: str) -> np.ndarray:
+        if col not in arrays:
+            arrays[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        return arrays[col]
+
+    for rule in rules:
+        fired = np.ones(n, dtype=bool) if rule.combine == "all" else np.zeros(n, dtype=bool)
+        for cond in rule.conditions:
+            hit = np.zeros(n, dtype=bool)
+            limit = cond.limit(thresholds)
+            for col in _columns(df, cond.field, trend_fields):
+                # NaN compares False for every operator except !=
+                v = values(col)
+                hit |= OPS[cond.op](v, limit) & ~np.isnan(v)
+            fired = fired & hit if rule.combine == "all" else fired | hit
+        reasons[fired] |= rule.mask
+    return reasons
+
+
+def rules_mask(rule_ids: Sequence[str], rules: Sequence[FlagRule] | None = None) -> int:
+    """Combine the bits of ``rule_ids`` into one mask for filtering."""
+    by_id = {r.id: r for r in (compile_rules() if rules is None else rules)}
+    unknown = [i for i in rule_ids if i not in by_id]
+    if unknown:
+        raise ValueError(f"unknown flag rules: {', '.join(unknown)}")
+    mask = 0
+    for rule_id in rule_ids:
+        mask |= by_id[rule_id].mask
+    return mask
+
+
+def filter_by_reasons(df: pd.DataFrame, rule_ids: Sequence[str], rules: Sequence[FlagRule] | None = None) -> pd.DataFrame:
+    """Rows of ``df`` for which any of ``rule_ids`` fired, from the stored bitmask."""
+    mask = rules_mask(rule_ids, rules)
+    return df[(df[REASONS_COLUMN].to_numpy(dtype=np.int64) & mask) != 0]
+
+
+def reason_labels(reasons: Sequence[int] | np.ndarray, rules: Sequence[FlagRule] | None = None) -> np.ndarray:
+    """Render bitmasks as ``", "``-joined Hebrew rule labels (for display/export).
+
+    Labels are built once per distinct bitmask, not per row.
+    """
+    rules = compile_rules() if rules is None else rules
+    uniques, inverse = np.unique(np.asarray(reasons, dtype=np.int64), return_inverse=True)
+    labels = [", ".join(r.label_he for r in rules if value & r.mask) for value in uniques.tolist()]
+    return np.asarray(labels, dtype=object)[inverse] if len(uniques) else np.array([], dtype=object)
+
+
+def student_reasons(df: pd.DataFrame, keys: Sequence[str] = ("student_name",)) -> pd.DataFrame:
+    """OR the row bitmasks per student: one row per ``keys`` with ``flag_reasons``.
+
+    Rows with a missing key are left out.
+    """
+    codes, groups = _group_codes(df, list(keys))
+    reasons = df[REASONS_COLUMN].to_numpy(dtype=np.int64)
+    out = np.zeros(len(groups), dtype=np.int64)
+    valid = codes >= 0
+    np.bitwise_or.at(out, codes[valid], reasons[valid])
+    groups[REASONS_COLUMN] = out
+    return groups
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import io
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+
+from . import db
+from .data_loader import file_sha256, iter_batches, normalize_dataframe
+from .mapping import resolve_mappings
+
+
+@dataclass
+class IngestProgress:
+    """Running totals reported while a file is streamed into the database."""
+
+    rows: int = 0
+    batches: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    already_ingested: bool = False
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _writing(conn):
+    """Borrow the write connection of a pool, or use a connection as given."""
+    return conn.writer() if hasattr(conn, "writer") else nullcontext(conn)
+
+
+def ingest_file(
+    file,
+    mappings: dict[str, str] | None,
+    conn: sqlite3.Connection | db.ConnectionPool,
+    batch_size: int = 5000,
+    progress: Callable[[IngestProgress], None] | None = None,
+    backend: ModuleType = db,
+) -> IngestProgress:
+    """Stream a CSV/Excel file into the records table batch by batch.
+
+    Each batch is mapped and coerced with :func:`normalize_dataframe` and
+    upserted in its own transaction, so peak memory is bounded by
+    ``batch_size`` rather than the size of the file.  ``progress`` is called
+    after every committed batch.
+
+    Files whose content hash was already ingested are skipped without being
+    parsed.  The hash is recorded only once every batch has been written, so
+    an interrupted upload can simply be retried.
+
+    ``conn`` is whatever ``backend.init_db`` returned, or the pool from
+    ``backend.get_pool``; see :func:`src.storage.get_backend`.  A pool's
+    write connection is borrowed once per batch rather than for the whole
+    file, so other writers (mapping and comment saves) only wait for the
+    batch in progress.  With ``mappings=None`` the columns are
+    mapped without user input by :func:`src.mapping.resolve_mappings`: the
+    mapping last confirmed for the same header layout, else the schema hints.
+
+    Raises
+    ------
+    ValueError
+        If the mapped file has no ``student_name`` column; nothing is written.
+    """
+    stats = IngestProgress()
+    content_hash = file_sha256(file)
+    with _writing(conn) as writer:
+        if backend.is_ingested(writer, content_hash):
+            stats.already_ingested = True
+            return stats
+    for raw in iter_batches(file, batch_size):
+        with _writing(conn) as writer:
+            if mappings is None:
+                mappings, _ = resolve_mappings(raw.columns, lambda fp: backend.load_mapping(writer, fp))
+            batch = normalize_dataframe(raw, mappings)
+            if "student_name" not in batch.columns:
+                raise ValueError("the mapped file has no student_name column")
+            result = backend.insert_dataframe(batch, writer)
+        stats.inserted += result.inserted
+        stats.updated += result.updated
+        stats.skipped += result.skipped
+        stats.rows += len(batch)
+        stats.batches += 1
+        stats.elapsed = time.perf_counter() - stats.started
+        if progress is not None:
+            progress(stats)
+    with _writing(conn) as writer:
+        backend.mark_ingested(writer, content_hash, stats.rows)
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
+
+
+# Job states reported by IngestQueue
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+@dataclass
+class IngestJob:
+    """An upload waiting for or going through :class:`IngestQueue`.
+
+    ``progress`` is a snapshot that the worker replaces after every batch, so
+    it can be read from any thread while the job runs.  ``watchers`` counts
+    the submissions waiting for the job; see :meth:`IngestQueue.release`.
+    """
+
+    id: int
+    name: str
+    content_hash: str
+    mappings: dict[str, str] | None
+    status: str = QUEUED
+    progress: IngestProgress = field(default_factory=IngestProgress)
+    error: str | None = None
+    submitted: float = field(default_factory=time.time)
+    finished: float | None = None
+    data: bytes | None = field(default=None, repr=False)
+    watchers: int = 1
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+
+class IngestQueue:
+    """Stream uploads into storage on a background thread, one file at a time.
+
+    :meth:`submit` copies the upload into memory and returns immediately with
+    an :class:`IngestJob` the UI can poll; a single worker thread runs
+    :func:`ingest_file` for each job in submission order, so uploads from
+    different sessions never write to the records table concurrently.
+    Submitting a file whose content is already queued or running returns the
+    existing job instead of ingesting it twice.  Finished jobs stay
+    available to :meth:`get` until every submitter has called
+    :meth:`release`, so the job table does not grow with the server's
+    uptime.
+
+    The worker borrows the write connection of ``backend.get_pool(db_path)``
+    (``db_path=None`` uses the backend default) for each batch, so other
+    writers in the process get it between batches instead of waiting for
+    the whole file.  Call :meth:`close` to stop it.
+    """
+
+    def __init__(self, backend: ModuleType = db, db_path: Path | str | None = None, batch_size: int = 5000):
+        self.backend = backend
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._jobs: dict[int, IngestJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending: queue.Queue[IngestJob | None] = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="ingest-queue", daemon=True)
+        self._worker.start()
+
+    def submit(self, file, mappings: dict[str, str] | None, name: str | None = None) -> IngestJob:
+        """Queue a path or binary file object for ingestion and return its job."""
+        if isinstance(file, (str, Path)):
+            data = Path(file).read_bytes()
+            name = name or Path(file).name
+        else:
+            file.seek(0)
+            data = file.read()
+            file.seek(0)
+            name = name or getattr(file, "name", "upload")
+        content_hash = file_sha256(io.BytesIO(data))
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active and job.content_hash == content_hash:
+                    job.watchers += 1
+                    return job
+            job = IngestJob(next(self._ids), str(name), content_hash, mappings, data=data)
+            self._jobs[job.id] = job
+        self._pending.put(job)
+        return job
+
+    def get(self, job_id: int) -> IngestJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def release(self, job_id: int) -> bool:
+        """Drop a finished job once every submitter has released it.
+
+        Returns ``True`` when the job was removed.  Active jobs are kept.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.active:
+                return False
+            job.watchers -= 1
+            if job.watchers > 0:
+                return False
+            del self._jobs[job_id]
+            return True
+
+    def jobs(self) -> list[IngestJob]:
+        """All jobs, most recent first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.id, reverse=True)
+
+    def wait(self, job_id: int, timeout: float | None = None) -> IngestJob:
+        """Block until the job has finished (or ``timeout`` seconds passed)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise ValueError(f"unknown ingest job {job_id}")
+            if not job.active or (deadline is not None and time.monotonic() >= deadline):
+                return job
+            time.sleep(0.01)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Finish the queued jobs and stop the worker thread."""
+        self._pending.put(None)
+        self._worker.join(timeout)
+
+    def _run(self) -> None:
+        while (job := self._pending.get()) is not None:
+            try:
+                pool = self.backend.get_pool(*([self.db_path] if self.db_path is not None else []))
+                self._process(job, pool)
+            except Exception as e:  # surfaced through the job
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = FAILED
+            finally:
+                job.data = None
+                job.finished = time.time()
+
+    def _process(self, job: IngestJob, pool) -> None:
+        job.status = RUNNING
+        buffer = io.BytesIO(job.data)
+        buffer.name = job.name
+
+        def report(stats: IngestProgress) -> None:
+            job.progress = replace(stats)
+
+        job.progress = ingest_file(buffer, job.mappings, pool, self.batch_size, report, self.backend)
+        job.status = DONE
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Callable, Iterable
+
+from .schema import load_schema
+
+# Value used by the app's selectboxes for "no column"
+NO_COLUMN = "(ללא)"
+
+# Hebrew points and cantillation marks, which exports use inconsistently
+_NIQQUD = re.compile("[֑-ׇ]")
+_NON_WORD = re.compile(r"[\W_]+")
+_FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+
+
+def normalize_header(text: object) -> str:
+    """Fold a column header to a comparable form.
+
+    Applies NFKC, lower-cases, strips niqqud, maps Hebrew final letters to
+    their regular forms and collapses punctuation (including geresh and
+    gershayim) and underscores to single spaces, so ``"ממוצע_בחנים "``,
+    ``"ממוצע-בחנים"`` and ``"Quiz Avg"``/``"quiz_avg"`` compare equal within
+    their language.
+    """
+    folded = unicodedata.normalize("NFKC", str(text)).lower()
+    folded = _NIQQUD.sub("", folded).translate(_FINAL_LETTERS)
+    return " ".join(_NON_WORD.sub(" ", folded).split())
+
+
+@dataclass(frozen=True)
+class _Hint:
+    key: str
+    text: str
+    tokens: frozenset[str]
+
+
+@dataclass(frozen=True)
+class MappingMatcher:
+    """Precompiled ``schema.json`` hints for scoring column headers.
+
+    Built once per schema by :func:`compile_matcher`; every hint (field key,
+    Hebrew label and ``examples``) is normalized and tokenized up front and
+    exact hint texts are indexed for O(1) lookups.
+    """
+
+    hints: tuple[_Hint, ...]
+    exact: dict[str, tuple[str, ...]]
+    keys: tuple[str, ...]
+
+    def scores(self, column: object) -> dict[str, float]:
+        """Return the best score in ``[0, 1]`` per canonical key for one header.
+
+        ``1.0`` is an exact (normalized) match; a header containing all the
+        tokens of a hint scores ``0.6``–``0.9``, one containing the hint as a
+        substring (e.g. with a ``ה`` prefix) ``0.5``–``0.8`` and one made of
+        some of the tokens of a single field's hints ``0.55``–``0.85``, each
+        scaled by how much of the longer text the shorter one covers;
+        otherwise the :class:`difflib.SequenceMatcher` ratio scaled to
+        ``0.8``.
+        """
+        text = normalize_header(column)
+        best: dict[str, float] = {}
+        if not text:
+            return best
+        for key in self.exact.get(text, ()):
+            best[key] = 1.0
+        tokens = frozenset(text.split())
+        partial: dict[str, float] = {}
+        for hint in self.hints:
+            if best.get(hint.key) == 1.0:
+                continue
+            coverage = len(hint.text) / len(text)
+            if hint.tokens <= tokens:
+                score = 0.6 + 0.3 * coverage
+            elif hint.text in text:
+                score = 0.5 + 0.3 * coverage
+            elif tokens <= hint.tokens:
+                # abbreviated header, e.g. "בחנים" for "ממוצע בחנים"
+                partial[hint.key] = max(partial.get(hint.key, 0.0), 0.55 + 0.3 / coverage)
+                continue
+            else:
+                matcher = SequenceMatcher(None, hint.text, text)
+                # quick_ratio is a cheap upper bound on ratio
+                if 0.8 * matcher.quick_ratio() <= best.get(hint.key, 0.0):
+                    continue
+                score = 0.8 * matcher.ratio()
+            if score > best.get(hint.key, 0.0):
+                best[hint.key] = score
+        # an abbreviation only counts when it points at a single field
+        if len(partial) == 1:
+            (key, score), = partial.items()
+            best[key] = max(best.get(key, 0.0), score)
+        return best
+
+    def auto_map(self, columns: Iterable[object], threshold: float = 0.6) -> dict[str, str]:
+        """Assign headers to canonical keys, best-scoring pairs first.
+
+        Each key and each column is used at most once; ties go to the field
+        listed first in the schema.  Keys without a column scoring at least
+        ``threshold`` are left out.
+        """
+        order = {k: i for i, k in enumerate(self.keys)}
+        candidates = []
+        for pos, column in enumerate(columns):
+            for key, score in self.scores(column).items():
+                if score >= threshold:
+                    candidates.append((-score, order[key], pos, key, str(column)))
+        candidates.sort()
+        mapped: dict[str, str] = {}
+        used: set[int] = set()
+        for _, _, pos, key, column in candidates:
+            if key not in mapped and pos not in used:
+                mapped[key] = column
+                used.add(pos)
+        return {k: mapped[k] for k in self.keys if k in mapped}
+
+
+def compile_matcher(schema: dict | None = None) -> MappingMatcher:
+    """Compile the hints of ``schema`` (default: ``schema.json``) into a matcher."""
+    if schema is None:
+        return _default_matcher()
+    hints: list[_Hint] = []
+    exact: dict[str, list[str]] = {}
+    keys = []
+    for field in schema.get("canonical_fields", []):
+        key = field["key"]
+        keys.append(key)
+        texts = [key, field.get("label_he", ""), *field.get("examples", [])]
+        for raw in texts:
+            text = normalize_header(raw)
+            if not text:
+                continue
+            hints.append(_Hint(key, text, frozenset(text.split())))
+            if key not in exact.setdefault(text, []):
+                exact[text].append(key)
+    return MappingMatcher(tuple(hints), {t: tuple(k) for t, k in exact.items()}, tuple(keys))
+
+
+@lru_cache(maxsize=1)
+def _default_matcher() -> MappingMatcher:
+    return compile_matcher(load_schema())
+
+
+def auto_map(columns: Iterable[object], schema: dict | None = None, threshold: float = 0.6) -> dict[str, str]:
+    """Guess ``{canonical key: column}`` for a header row from the schema hints."""
+    return compile_matcher(schema).auto_map(columns, threshold)
+
+
+def header_fingerprint(columns: Iterable[object]) -> str:
+    """Stable identifier of a header row layout (names and order)."""
+    names = [str(c).strip() for c in columns]
+    return hashlib.sha256(json.dumps(names, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def resolve_mappings(
+    columns: Iterable[object], lookup: Callable[[str], dict[str, str] | None] | None = None
+) -> tuple[dict[str, str], str]:
+    """Return ``(mappings, source)`` for a header row without user input.
+
+    ``lookup`` maps a :func:`header_fingerprint` to a previously confirmed
+    mapping, e.g. ``lambda fp: backend.load_mapping(conn, fp)``.  A saved
+    mapping whose columns are all present is reused with that single keyed
+    lookup (``source == "saved"``); otherwise the schema hints are matched
+    (``source == "auto"``).
+    """
+    columns = list(columns)
+    if lookup is not None:
+        saved = lookup(header_fingerprint(columns))
+        names = {str(c) for c in columns}
+        if saved is not None and all(v == NO_COLUMN or v in names for v in saved.values()):
+            return saved, "saved"
+    return auto_map(columns), "auto"
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .analytics import apply_flags, compute_cohort_ranks, compute_overall_score, compute_trends, run_analytics
+from .trends import period_codes
+
+# Layout of the shared input matrix; metric columns follow these
+_KEY_COLUMNS = ("partition", "student_name", "semester")
+
+
+def _attach(name: str, shape: tuple[int, int]) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _codes_as_float(codes: np.ndarray) -> np.ndarray:
+    out = codes.astype(np.float64)
+    out[codes < 0] = np.nan
+    return out
+
+
+def _run_chunk(task: dict) -> None:
+    """Worker entry point: score and trend rows ``[start, stop)``."""
+    in_shm, inputs = _attach(task["input"], task["input_shape"])
+    out_shm, outputs = _attach(task["output"], task["output_shape"])
+    try:
+        start, stop = task["start"], task["stop"]
+        df = pd.DataFrame(inputs[start:stop], columns=task["columns"])
+        df = compute_overall_score(df, task["weights"])
+        df, _ = compute_trends(df, list(task["weights"]), partition_by="partition")
+        for j, col in enumerate(task["output_columns"]):
+            if col in df.columns:
+                outputs[start:stop, j] = df[col].to_numpy(dtype=np.float64)
+            else:
+                outputs[start:stop, j] = np.nan
+    finally:
+        del inputs, outputs
+        in_shm.close()
+        out_shm.close()
+
+
+def _chunks(bounds: np.ndarray, n_rows: int, n_tasks: int) -> list[tuple[int, int]]:
+    """Group contiguous partitions into roughly equal row ranges."""
+    target = max(1, -(-n_rows // n_tasks))
+    chunks = []
+    start = 0
+    for stop in bounds[1:]:
+        if stop - start >= target or stop == n_rows:
+            chunks.append((start, int(stop)))
+            start = int(stop)
+    return [c for c in chunks if c[1] > c[0]]
+
+
+def run_analytics_parallel(
+    df: pd.DataFrame,
+    weights: dict[str, float],
+    low_percentile_thr: int,
+    drop_thr: int,
+    partition_by: str = "class_name",
+    workers: int | None = None,
+    semester_order: list[str] | None = None,
+    mp_context: str = "spawn",
+    thresholds: dict[str, float] | None = None,
+) -> tuple[pd.DataFrame, list[str]]:
+    """Run score → trends → flags per ``partition_by`` group in a process pool.
+
+    The output is identical to
+    ``run_analytics(df, ..., partition_by=partition_by)``: students are
+    trended within their partition (class or school).  Instead of pickling
+    frames, names, classes and semesters are factorized into codes and copied
+    with the metric columns into one shared-memory ``float64`` matrix sorted
+    by partition; each worker reads a contiguous range of whole partitions
+    and writes scores and deltas into a shared output matrix.  Cohort ranks,
+    whose class/semester cohorts may span partitions, and the flags that use
+    them are then computed in this process with single vectorized passes.
+
+    ``workers`` defaults to the number of CPUs; with a single worker or a
+    single partition the serial path runs in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if partition_by not in df.columns or df.empty:
+        return run_analytics(df, weights, low_percentile_thr, drop_thr, None, semester_order, thresholds)
+
+    part_codes, _ = pd.factorize(df[partition_by], use_na_sentinel=True)
+    n_parts = int(part_codes.max()) + 1 + int((part_codes < 0).any())
+    if workers == 1 or n_parts <= 1 or not {"student_name", "semester"} <= set(df.columns):
+        return run_analytics(df, weights, low_percentile_thr, drop_thr, partition_by, semester_order, thresholds)
+
+    metrics = [c for c in weights if c in df.columns and c not in ("overall_score", *_KEY_COLUMNS)]
+    trend_fields = [k for k in weights if k in df.columns]
+    order = np.argsort(part_codes, kind="stable")
+    sorted_parts = part_codes[order]
+    bounds = np.flatnonzero(np.r_[True, sorted_parts[1:] != sorted_parts[:-1], True])
+
+    student_codes, _ = pd.factorize(df["student_name"], use_na_sentinel=True)
+    semester_codes, _ = period_codes(df["semester"], "semester", semester_order)
+    columns = list(_KEY_COLUMNS) + metrics
+    output_columns = (["overall_score"] if weights else []) + [f"delta_{k}" for k in trend_fields]
+
+    n = len(df)
+    in_shm = shared_memory.SharedMemory(create=True, size=max(1, n * len(columns) * 8))
+    out_shm = shared_memory.SharedMemory(create=True, size=max(1, n * len(output_columns) * 8))
+    try:
+        inputs = np.ndarray((n, len(columns)), dtype=np.float64, buffer=in_shm.buf)
+        outputs = np.ndarray((n, len(output_columns)), dtype=np.float64, buffer=out_shm.buf)
+        inputs[:, 0] = _codes_as_float(sorted_parts)
+        inputs[:, 1] = _codes_as_float(student_codes[order])
+        inputs[:, 2] = _codes_as_float(semester_codes[order])
+        for j, col in enumerate(metrics, start=len(_KEY_COLUMNS)):
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            inputs[:, j] = values[order]
+
+        base = {
+            "input": in_shm.name,
+            "input_shape": inputs.shape,
+            "output": out_shm.name,
+            "output_shape": outputs.shape,
+            "columns": columns,
+            "output_columns": output_columns,
+            "weights": dict(weights),
+        }
+        tasks = [{**base, "start": a, "stop": b} for a, b in _chunks(bounds, n, workers * 4)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=mp.get_context(mp_context)) as pool:
+            for _ in pool.map(_run_chunk, tasks):
+                pass
+
+        result = np.empty_like(outputs)
+        result[order] = outputs
+        del inputs, outputs
+    finally:
+        in_shm.close()
+        in_shm.unlink()
+        out_shm.close()
+        out_shm.unlink()
+
+    for j, col in enumerate(output_columns):
+        values = result[:, j]
+        if col.startswith("delta_") and np.isnan(values).all():
+            continue
+        df[col] = values
+    df = compute_cohort_ranks(df)
+    df = apply_flags(df, low_percentile_thr, drop_thr, trend_fields, thresholds)
+    return df, trend_fields
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import pandas as pd
+
+from .data_loader import numeric_keys
+from .db import InsertResult, compact_frame
+from .profiling import instrument
+from .schema import lazy_fields, load_schema
+
+PARQUET_PATH = Path(__file__).resolve().parent.parent / "student_data.parquet"
+
+PARTITION_COLUMNS = ("class_name", "semester")
+_LEDGER = "_ingested.json"
+_MAPPINGS = "_mappings.json"
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pafs
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError("the Parquet backend requires pyarrow (pip install pyarrow)") from e
+    return pa, ds, pafs
+
+
+@dataclass(frozen=True)
+class ParquetStore:
+    """Handle to a Parquet records dataset, the counterpart of a connection.
+
+    Records are kept as a hive-partitioned dataset
+    (``class_name=<...>/semester=<...>/part-*.parquet``) and read back through
+    memory-mapped Arrow scans, so class/semester filters prune whole
+    partitions and only the requested columns are decoded.  ``pyarrow`` is
+    imported only when this backend is used.
+    """
+
+    root: Path
+
+    @property
+    def ledger_path(self) -> Path:
+        return self.root / _LEDGER
+
+    @property
+    def mappings_path(self) -> Path:
+        return self.root / _MAPPINGS
+
+
+def _arrow_schema():
+    pa, _, _ = _pyarrow()
+    fields = []
+    for field in load_schema().get("canonical_fields", []):
+        key = field["key"]
+        fields.append(pa.field(key, pa.float64() if key in numeric_keys else pa.string()))
+    return pa.schema(fields)
+
+
+def _partitioning():
+    pa, ds, _ = _pyarrow()
+    return ds.partitioning(
+        pa.schema([(c, pa.string()) for c in PARTITION_COLUMNS]), flavor="hive"
+    )
+
+
+def _dataset(store: ParquetStore):
+    _, ds, pafs = _pyarrow()
+    return ds.dataset(
+        store.root,
+        schema=_arrow_schema(),
+        format="parquet",
+        partitioning=_partitioning(),
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def init_db(db_path: Path = PARQUET_PATH) -> ParquetStore:
+    """Create the dataset directory if needed and return a store handle."""
+    root = Path(db_path)
+    root.mkdir(parents=True, exist_ok=True)
+    return ParquetStore(root)
+
+
+class StorePool:
+    """Counterpart of :class:`src.db.ConnectionPool` for a Parquet store.
+
+    Readers share the immutable store handle; writers are serialized because
+    appends and the JSON ledgers are not safe to update concurrently.
+    """
+
+    def __init__(self, db_path: Path | str = PARQUET_PATH):
+        self.store = init_db(Path(db_path))
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def reader(self) -> Iterator[ParquetStore]:
+        yield self.store
+
+    @contextmanager
+    def writer(self) -> Iterator[ParquetStore]:
+        with self._write_lock:
+            yield self.store
+
+    def close(self) -> None:
+        pass
+
+
+_POOLS: dict[str, StorePool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_path: Path | str = PARQUET_PATH) -> StorePool:
+    """Return the process-wide :class:`StorePool` for ``db_path``."""
+    key = str(Path(db_path).resolve())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = StorePool(db_path)
+    return pool
+
+
+def _read_json(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+def is_ingested(store: ParquetStore, content_hash: str) -> bool:
+    """Return whether a file with this content hash was already ingested."""
+    return content_hash in _read_json(store.ledger_path)
+
+
+def mark_ingested(store: ParquetStore, content_hash: str, rows: int) -> None:
+    """Remember that a file with this content hash has been ingested."""
+    ledger = _read_json(store.ledger_path)
+    ledger[content_hash] = {"rows": int(rows), "ingested_at": datetime.now().isoformat(sep=" ", timespec="seconds")}
+    _write_json(store.ledger_path, ledger)
+
+
+def load_mapping(store: ParquetStore, fingerprint: str) -> dict[str, str] | None:
+    """Return the confirmed column mapping for a header fingerprint, if any."""
+    entry = _read_json(store.mappings_path).get(fingerprint)
+    return entry["mappings"] if entry else None
+
+
+def save_mapping(store: ParquetStore, fingerprint: str, columns: Sequence[str], mappings: dict[str, str]) -> None:
+    """Remember ``mappings`` as confirmed for the header layout ``columns``."""
+    saved = _read_json(store.mappings_path)
+    saved[fingerprint] = {
+        "columns": [str(c) for c in columns],
+        "mappings": mappings,
+        "confirmed_at": datetime.now().isoformat(sep=" ", timespec="seconds"),
+    }
+    _write_json(store.mappings_path, saved)
+
+
+@instrument()
+def insert_dataframe(
+    df: pd.DataFrame, store: ParquetStore, content_hash: str | None = None
+) -> InsertResult:
+    """Append a normalized DataFrame as new Parquet files, one per partition.
+
+    Parquet files are immutable snapshots, so unlike the SQLite backend rows
+    are always appended; re-uploads are still skipped through ``content_hash``.
+    """
+    if content_hash is not None and is_ingested(store, content_hash):
+        return InsertResult(skipped=len(df), already_ingested=True)
+    if df.empty:
+        return InsertResult()
+
+    pa, ds, _ = _pyarrow()
+    schema = _arrow_schema()
+    unknown = [c for c in df.columns if c not in schema.names and c != "id"]
+    if unknown:
+        raise ValueError(f"unknown records columns: {', '.join(unknown)}")
+    arrays = []
+    for field in schema:
+        if field.name in df.columns:
+            col = df[field.name]
+            if pa.types.is_string(field.type):
+                col = col.astype(object).where(col.notna(), None).map(lambda v: v if v is None else str(v))
+            else:
+                col = pd.to_numeric(col, errors="coerce")
+            arrays.append(pa.array(col, type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    ds.write_dataset(
+        table,
+        store.root,
+        format="parquet",
+        partitioning=_partitioning(),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    if content_hash is not None:
+        mark_ingested(store, content_hash, len(df))
+    return InsertResult(inserted=len(df))
+
+
+def _match(field, value):
+    _, ds, _ = _pyarrow()
+    if isinstance(value, str):
+        return ds.field(field) == value
+    return ds.field(field).isin(list(value))
+
+
+@instrument()
+def load_records(
+    store: ParquetStore,
+    student_name: str | None = None,
+    columns: Sequence[str] | None = None,
+    class_name: str | Sequence[str] | None = None,
+    semester: str | Sequence[str] | None = None,
+    compact: bool = False,
+    include_comments: bool = True,
+) -> pd.DataFrame:
+    """Load records, pruning partitions by class/semester and decoding only ``columns``.
+
+    ``compact`` and ``include_comments`` behave as in :func:`src.db.load_records`.
+    """
+    if columns is None and not include_comments:
+        lazy = set(lazy_fields())
+        columns = [c for c in _arrow_schema().names if c not in lazy]
+    if not any(store.root.glob("**/*.parquet")):
+        names = list(columns) if columns is not None else _arrow_schema().names
+        return pd.DataFrame(columns=names)
+    dataset = _dataset(store)
+    if columns is not None:
+        unknown = [c for c in columns if c not in dataset.schema.names]
+        if unknown:
+            raise ValueError(f"unknown records columns: {', '.join(unknown)}")
+    expr = None
+    for field, value in (("student_name", student_name or None), ("class_name", class_name), ("semester", semester)):
+        if value is None:
+            continue
+        cond = _match(field, value)
+        expr = cond if expr is None else expr & cond
+    table = dataset.to_table(columns=list(columns) if columns is not None else None, filter=expr)
+    df = table.to_pandas()
+    return compact_frame(df) if compact else df
+
+
+def load_comments(store: ParquetStore, student_name: str | None = None) -> pd.DataFrame:
+    """Load the free-text fields left out by ``load_records(include_comments=False)``."""
+    return load_records(store, student_name, columns=["student_name", *lazy_fields()])
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import numpy as np
+import pandas as pd
+
+from .analytics import (
+    apply_flags,
+    compute_overall_scores_batch,
+    compute_trend_deltas,
+    profile_from_summary,
+    trend_deltas_from_means,
+)
+from .data_loader import numeric_keys
+from .db import (
+    DataVersion,
+    concat_records,
+    count_records_since,
+    data_version,
+    load_records,
+    load_student_summary,
+    query_records,
+    record_columns,
+    semester_means,
+)
+from .flags import REASONS_COLUMN
+from .profiling import instrument
+from .ranking import COHORT_KEYS, cohort_ranks, update_cohort_ranks
+from .timeseries import StudentSeries, build_series
+from .views import sort_order
+
+
+def _estimate_bytes(value: Any) -> int:
+    """Return a rough in-memory size of a cached stage result."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(_estimate_bytes(v) for v in value)
+    if isinstance(value, StudentSeries):
+        return value.nbytes
+    return 0
+
+
+class LRUCache:
+    """Small least-recently-used cache bounded by entry count and size.
+
+    Parameters
+    ----------
+    max_entries:
+        Maximum number of cached stage results.
+    max_bytes:
+        Optional upper bound on the estimated memory held by the cache.  The
+        most recently inserted entry is always kept even if it alone exceeds
+        the limit.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int | None = None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key][0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if key in self._data:
+            self._bytes -= self._data.pop(key)[1]
+        size = _estimate_bytes(value)
+        self._data[key] = (value, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes and len(self._data) > 1
+        ):
+            _, (_, evicted) = self._data.popitem(last=False)
+            self._bytes -= evicted
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+
+def _weights_key(weights: dict[str, float]) -> tuple:
+    return tuple(sorted(weights.items()))
+
+
+class AnalyticsPipeline:
+    """Staged, cached version of load → score → trends → ranks → flags.
+
+    Every stage result is cached under a key made of the records table
+    watermark (see :func:`src.db.data_version`) and the parameters that stage
+    depends on, so moving a threshold slider only re-runs the flag stage and
+    changing a weight does not recompute trends.  When rows were only appended
+    since a cached version, the load, score and trend stages extend their
+    cached results with the new rows instead of starting over; an in-place
+    update bumps the watermark's revision and forces a full reload.
+
+    The connection is passed to :meth:`run` rather than stored, so one
+    pipeline can outlive the pooled connections lent to each Streamlit rerun.
+    ``compact`` and ``include_comments`` are forwarded to
+    :func:`src.db.load_records`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        max_bytes: int | None = None,
+        compact: bool = False,
+        include_comments: bool = True,
+    ) -> None:
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.compact = compact
+        self.include_comments = include_comments
+        self._latest: dict[Hashable, DataVersion] = {}
+        self._result_key: Hashable | None = None
+        self._records_key: Hashable | None = None
+        self.executed: list[str] = []
+
+    def _remember(self, stage: str, scope: Hashable, version: DataVersion, key: Hashable, value: Any) -> None:
+        self.cache.put(key, value)
+        self._latest[(stage, scope)] = version
+
+    def _previous(self, stage: str, scope: Hashable) -> DataVersion | None:
+        return self._latest.get((stage, scope))
+
+    # -- stages ---------------------------------------------------------------
+
+    def _load_records(self, conn: sqlite3.Connection, student_name: str | None, after_id: int | None = None):
+        return load_records(
+            conn, student_name, after_id, compact=self.compact, include_comments=self.include_comments
+        )
+
+    def _load(
+        self, conn: sqlite3.Connection, version: DataVersion, student_name: str | None
+    ) -> tuple[pd.DataFrame, DataVersion | None]:
+        """Return the records frame and the version it was extended from, if any."""
+        key = ("records", version, student_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, None
+
+        prev = self._previous("records", student_name)
+        base = self.cache.get(("records", prev, student_name)) if prev is not None else None
+        if (
+            base is not None
+            and version.revision == prev.revision
+            and version.max_id > prev.max_id
+            and version.row_count - prev.row_count == count_records_since(conn, prev.max_id)
+        ):
+            self.executed.append("records+")
+            tail = self._load_records(conn, student_name, after_id=prev.max_id)
+            records = concat_records([base, tail]) if not base.empty else tail
+            self._remember("records", student_name, version, key, records)
+            return records, prev
+
+        self.executed.append("records")
+        records = self._load_records(conn, student_name)
+        self._remember("records", student_name, version, key, records)
+        return records, None
+
+    def _scores(
+        self,
+        records: pd.DataFrame,
+        version: DataVersion,
+        extended_from: DataVersion | None,
+        student_name: str | None,
+        weights: dict[str, float],
+    ) -> np.ndarray:
+        wkey = _weights_key(weights)
+        key = ("scores", version, student_name, wkey)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        base = None
+        if extended_from is not None:
+            base = self.cache.get(("scores", extended_from, student_name, wkey))
+        if base is not None:
+            self.executed.append("scores+")
+            tail = compute_overall_scores_batch(records.iloc[len(base):], [weights])[:, 0]
+            scores = np.concatenate([base, tail])
+        else:
+            self.executed.append("scores")
+            scores = compute_overall_scores_batch(records, [weights])[:, 0]
+        self.cache.put(key, scores)
+        return scores
+
+    def _trends(
+        self,
+        conn: sqlite3.Connection,
+        records: pd.DataFrame,
+        version: DataVersion,
+        extended_from: DataVersion | None,
+        student_name: str | None,
+        weight_keys: tuple[str, ...],
+    ) -> tuple[pd.DataFrame, list[str]]:
+        key = ("trends", version, student_name, weight_keys)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        base = None
+        if extended_from is not None:
+            base = self.cache.get(("trends", extended_from, student_name, weight_keys))
+        if base is not None and "student_name" in records.columns:
+            self.executed.append("trends+")
+            base_deltas, _ = base
+            base_len = len(self.cache.get(("records", extended_from, student_name), ()))
+            touched = records["student_name"].iloc[base_len:].dropna().unique()
+            subset = records[records["student_name"].isin(touched)]
+            fresh, trend_fields = compute_trend_deltas(subset, list(weight_keys))
+            kept = base_deltas[~base_deltas["student_name"].isin(touched)]
+            deltas = pd.concat([kept, fresh], ignore_index=True)
+            result = (deltas, trend_fields)
+        else:
+            self.executed.append("trends")
+            # the per-student, per-semester means are aggregated by SQLite
+            trend_fields = [k for k in weight_keys if k in records.columns]
+            means = semester_means(conn, trend_fields, student_name=student_name or None)
+            result = (trend_deltas_from_means(means, trend_fields), trend_fields)
+        self.cache.put(key, result)
+        return result
+
+    def _ranks(
+        self,
+        scored: pd.DataFrame,
+        version: DataVersion,
+        extended_from: DataVersion | None,
+        weights: dict[str, float],
+    ) -> pd.DataFrame:
+        wkey = _weights_key(weights)
+        key = ("ranks", version, wkey)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        base = self.cache.get(("ranks", extended_from, wkey)) if extended_from is not None else None
+        if base is not None:
+            # only the cohorts that received appended rows are re-ranked
+            self.executed.append("ranks+")
+            ranks = update_cohort_ranks(base, scored)
+        else:
+            self.executed.append("ranks")
+            ranks = cohort_ranks(scored)
+        self.cache.put(key, ranks)
+        return ranks
+
+    def _student_ranks(
+        self,
+        conn: sqlite3.Connection,
+        out: pd.DataFrame,
+        version: DataVersion,
+        student_name: str,
+        weights: dict[str, float],
+    ) -> pd.DataFrame:
+        """Cohort ranks of one student's rows, ranked against their whole cohorts.
+
+        Only the classes and semesters the student appears in are loaded,
+        scored and ranked, so a student sees the same ranks (and cohort
+        flags) as a teacher does without loading the whole table.
+        """
+        key = ("ranks", version, _weights_key(weights), student_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        self.executed.append("ranks")
+        keys = [k for k in COHORT_KEYS if k in out.columns]
+        if "id" not in out.columns or not keys:
+            ranks = cohort_ranks(out)
+        else:
+            stored = set(record_columns(conn))
+            columns = ["id", *keys, *[k for k in numeric_keys if k in stored]]
+            filters = {k: sorted(out[k].dropna().astype(str).unique()) for k in keys}
+            cohorts = query_records(conn, columns=columns, compact=self.compact, **filters)
+            if weights:
+                cohorts["overall_score"] = compute_overall_scores_batch(cohorts, [weights])[:, 0]
+            ranked = cohort_ranks(cohorts).set_axis(cohorts["id"].to_numpy(dtype=np.int64), axis=0)
+            ranks = ranked.reindex(out["id"].to_numpy(dtype=np.int64)).set_axis(out.index, axis=0)
+        self.cache.put(key, ranks)
+        return ranks
+
+    # -- public API -----------------------------------------------------------
+
+    @instrument()
+    def run(
+        self,
+        conn: sqlite3.Connection,
+        weights: dict[str, float],
+        low_percentile_thr: int,
+        drop_thr: int,
+        student_name: str | None = None,
+        thresholds: dict[str, float] | None = None,
+    ) -> tuple[pd.DataFrame, list[str]]:
+        """Return the scored, trended and flagged records plus the trend fields.
+
+        The output matches running :func:`~src.analytics.compute_overall_score`,
+        :func:`~src.analytics.compute_trends`,
+        :func:`~src.analytics.compute_cohort_ranks` and
+        :func:`~src.analytics.apply_flags` on the freshly loaded table, but
+        only stages whose inputs changed are executed.  :attr:`executed` lists
+        the stages that ran; a ``+`` suffix marks an incremental extension of
+        a cached result.  With ``student_name`` the student's rows are still
+        ranked within their whole class and semester, so cohort flags agree
+        with the unfiltered run.
+        """
+        self.executed = []
+        self._result_key = None
+        version = data_version(conn)
+        records, extended_from = self._load(conn, version, student_name)
+        self._records_key = ("records", version, student_name)
+        if records.empty:
+            return records, []
+
+        weight_keys = tuple(weights.keys())
+        deltas, trend_fields = self._trends(conn, records, version, extended_from, student_name, weight_keys)
+
+        out = records.copy(deep=False)
+        if weights:
+            out["overall_score"] = self._scores(records, version, extended_from, student_name, weights)
+        if trend_fields and "semester" in out.columns and "student_name" in out.columns:
+            indexed = deltas.set_index("student_name").dropna(axis=1, how="all")
+            for col in indexed.columns:
+                out[col] = indexed[col].reindex(out["student_name"]).to_numpy()
+        if student_name:
+            ranks = self._student_ranks(conn, out, version, student_name, weights)
+        else:
+            ranks = self._ranks(out, version, extended_from, weights)
+        for col in ranks.columns:
+            out[col] = ranks[col].to_numpy()
+
+        fkey = (
+            "flags", version, student_name, _weights_key(weights), low_percentile_thr, drop_thr,
+            tuple(sorted((thresholds or {}).items())),
+        )
+        reasons = self.cache.get(fkey)
+        if reasons is None:
+            self.executed.append("flags")
+            reasons = apply_flags(out, low_percentile_thr, drop_thr, trend_fields, thresholds)[REASONS_COLUMN].to_numpy()
+            self.cache.put(fkey, reasons)
+        out[REASONS_COLUMN] = reasons
+        out["flagged"] = reasons != 0
+        self._result_key = fkey
+        return out, trend_fields
+
+    def sort_order(self, df: pd.DataFrame, by: tuple[str, ...] = ("-flagged", "-overall_score")) -> np.ndarray:
+        """Row order of ``df``, the frame from the last :meth:`run`, sorted by ``by``.
+
+        The order is cached next to the flags it depends on, so paging and
+        reruns with unchanged parameters only slice it; see
+        :func:`src.views.sort_order` for the ``by`` syntax.
+        """
+        key = ("order", self._result_key, tuple(by))
+        order = self.cache.get(key) if self._result_key is not None else None
+        if order is None or len(order) != len(df):
+            self.executed.append("order")
+            order = sort_order(df, by)
+            if self._result_key is not None:
+                self.cache.put(key, order)
+        return order
+
+    def profile(
+        self, conn: sqlite3.Connection, df: pd.DataFrame, weights: dict[str, float], student_name: str | None = None
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Per-semester and per-student views of ``df``, the frame from the last :meth:`run`.
+
+        Built from the ``student_summary`` table with
+        :func:`~src.analytics.profile_from_summary` and cached next to the
+        flags it reports, so reruns with unchanged data and parameters neither
+        query nor aggregate the summary again.
+        """
+        key = ("profile", self._result_key)
+        profile = self.cache.get(key) if self._result_key is not None else None
+        if profile is None:
+            self.executed.append("profile")
+            profile = profile_from_summary(load_student_summary(conn, student_name), weights, df)
+            if self._result_key is not None:
+                self.cache.put(key, profile)
+        return profile
+
+    def series(self, df: pd.DataFrame, metrics: tuple[str, ...] | None = None) -> StudentSeries:
+        """Per-student time series of ``df``, the frame from the last :meth:`run`.
+
+        Cached next to the records it was built from, so the graphs of every
+        student are served from one build until new data arrives; see
+        :class:`src.timeseries.StudentSeries`.
+        """
+        key = ("series", self._records_key, metrics)
+        series = self.cache.get(key) if self._records_key is not None else None
+        if series is None:
+            self.executed.append("series")
+            series = build_series(df, metrics)
+            if self._records_key is not None:
+                self.cache.put(key, series)
+        return series
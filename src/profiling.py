@@ -0,0 +1,215 @@
+"""Opt-in timing, row-count and memory instrumentation for the hot paths.
+
+Set ``STUDENT_ANALYTICS_PROFILE=1`` to collect statistics for every function
+decorated with :func:`instrument` and every :func:`timed` block.  When the
+variable is unset the wrappers only test one module-level flag before
+calling straight through.  Statistics are per process and can be read with
+:func:`snapshot` or exported with :func:`to_json` and :func:`to_prometheus`.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterator, TypeVar
+
+PROFILE_ENV = "STUDENT_ANALYTICS_PROFILE"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_enabled = os.environ.get(PROFILE_ENV, "").strip().lower() not in ("", "0", "false", "no", "off")
+_lock = threading.Lock()
+
+
+@dataclass
+class StageStats:
+    """Accumulated measurements of one instrumented function or block."""
+
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    memory_delta_bytes: int = 0
+    errors: int = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+_stats: dict[str, StageStats] = {}
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    """Turn collection on or off at runtime (the env var sets the default)."""
+    global _enabled
+    _enabled = bool(on)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process, or 0 where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def count_rows(value: Any) -> int:
+    """Best-effort row count of a stage result.
+
+    Frames, arrays and sequences count their length; a tuple counts its
+    first element (``(df, trend_fields)``); objects with ``rows`` or
+    ``inserted``/``updated``/``skipped`` attributes report those.
+    """
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if hasattr(value, "shape"):
+        return int(value.shape[0]) if value.shape else 0
+    if hasattr(value, "rows") and isinstance(value.rows, int):
+        return value.rows
+    if hasattr(value, "inserted"):
+        return int(value.inserted + value.updated + value.skipped)
+    if isinstance(value, (list, dict)):
+        return len(value)
+    return 0
+
+
+def record(name: str, seconds: float, rows: int = 0, memory_delta: int = 0, error: bool = False) -> None:
+    """Add one measurement to the statistics of ``name``."""
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = StageStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.rows += rows
+        stats.memory_delta_bytes += memory_delta
+        stats.errors += int(error)
+
+
+@contextmanager
+def timed(name: str, rows: int = 0) -> Iterator[None]:
+    """Measure a block (e.g. rendering) under ``name`` when profiling is on."""
+    if not _enabled:
+        yield
+        return
+    rss, start = _rss_bytes(), time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        record(name, time.perf_counter() - start, rows, _rss_bytes() - rss, failed)
+
+
+def _wrap_generator(fn: Callable, name: str) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            yield from fn(*args, **kwargs)
+            return
+        rss, elapsed, rows, failed = _rss_bytes(), 0.0, 0, True
+        gen = fn(*args, **kwargs)
+        try:
+            while True:
+                # only the time spent producing items counts, not the consumer's
+                start = time.perf_counter()
+                try:
+                    item = next(gen)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    failed = False
+                    return
+                elapsed += time.perf_counter() - start
+                rows += count_rows(item)
+                yield item
+        finally:
+            gen.close()
+            record(name, elapsed, rows, _rss_bytes() - rss, failed)
+
+    return wrapper
+
+
+def instrument(name: str | None = None) -> Callable[[F], F]:
+    """Decorator recording calls, wall time, result rows and RSS deltas.
+
+    ``name`` defaults to ``<module>.<qualname>`` (e.g. ``db.load_records``).
+    Generator functions are measured over the whole iteration, counting the
+    rows of every yielded item.
+    """
+
+    def decorate(fn: F) -> F:
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+        if inspect.isgeneratorfunction(fn):
+            return _wrap_generator(fn, label)  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            rss, start = _rss_bytes(), time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                record(label, time.perf_counter() - start, 0, _rss_bytes() - rss, True)
+                raise
+            record(label, time.perf_counter() - start, count_rows(result), _rss_bytes() - rss)
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """Copy of the statistics, keyed by stage name, with rows/sec added."""
+    with _lock:
+        return {
+            name: {**asdict(s), "rows_per_sec": round(s.rows_per_sec, 1)} for name, s in sorted(_stats.items())
+        }
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+_METRICS = (
+    ("calls", "counter", "Number of calls"),
+    ("seconds", "counter", "Total wall time in seconds"),
+    ("max_seconds", "gauge", "Slowest single call in seconds"),
+    ("rows", "counter", "Rows returned or yielded"),
+    # resident memory can shrink, so the running sum may go down
+    ("memory_delta_bytes", "gauge", "Sum of resident memory changes in bytes"),
+    ("errors", "counter", "Calls that raised"),
+)
+
+
+def to_prometheus(prefix: str = "student_analytics") -> str:
+    """Render the statistics in the Prometheus text exposition format."""
+    stats = snapshot()
+    lines = []
+    for field, kind, help_text in _METRICS:
+        metric = f"{prefix}_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {metric} {help_text} per instrumented stage.")
+        lines.append(f"# TYPE {metric} {kind}")
+        for stage, values in stats.items():
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{stage="{label}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
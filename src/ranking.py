@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import numeric_keys
+from .trends import _group_codes
+
+# Default cohort: students of the same class in the same semester
+COHORT_KEYS = ("class_name", "semester")
+
+
+def rank_metrics(df: pd.DataFrame, metrics: Sequence[str] | None = None) -> list[str]:
+    """``overall_score`` and the numeric fields (or ``metrics``) present in ``df``."""
+    metrics = ["overall_score", *numeric_keys] if metrics is None else metrics
+    return [m for m in dict.fromkeys(metrics) if m in df.columns]
+
+
+def _rank_matrix(values: np.ndarray, codes: np.ndarray, n_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    """Grouped ranks and percentiles of every column of ``values`` in one sort.
+
+    Each column is treated as its own set of groups, so stacking the columns
+    and sorting once by ``(column, group, value)`` ranks every metric in
+    every group together; ties need no stable order, as only their run
+    boundaries matter.  Returns ``(rank, pct)`` where ``rank`` is the
+    descending competition rank (1 = best, ties share the better rank) and
+    ``pct`` the ascending percentile ``100 * average rank / group size``, as
+    ``groupby(...).rank(pct=True)`` computes it.
+    """
+    n, m = values.shape
+    rank = np.full((n, m), np.nan, dtype=np.float32)
+    pct = np.full((n, m), np.nan, dtype=np.float32)
+    valid = ~np.isnan(values) & (codes >= 0)[:, None]
+    rows, cols = np.nonzero(valid)
+    if not len(rows):
+        return rank, pct
+    group = cols.astype(np.int64) * max(n_groups, 1) + codes[rows]
+    # hash-factorized value codes turn the two-key sort into one integer sort
+    value_codes, uniques = pd.factorize(values[rows, cols], sort=True)
+    key = group * len(uniques) + value_codes
+    order = np.argsort(key)
+    group, key = group[order], key[order]
+
+    group_start = np.r_[True, group[1:] != group[:-1]]
+    run_start = np.r_[True, key[1:] != key[:-1]]
+    starts = np.flatnonzero(group_start)
+    size = np.diff(np.r_[starts, len(key)])
+    first = np.repeat(starts, size)
+    last = np.repeat(starts + size, size)
+    run_starts = np.flatnonzero(run_start)
+    run_first = np.repeat(run_starts, np.diff(np.r_[run_starts, len(key)]))
+    run_last = np.repeat(np.r_[run_starts[1:], len(key)], np.diff(np.r_[run_starts, len(key)]))
+
+    avg_rank = ((run_first - first + 1) + (run_last - first)) / 2
+    target = (rows[order], cols[order])
+    rank[target] = last - run_last + 1
+    pct[target] = 100 * avg_rank / (last - first)
+    return rank, pct
+
+
+def cohort_ranks(
+    df: pd.DataFrame,
+    metrics: Sequence[str] | None = None,
+    by: Sequence[str] = COHORT_KEYS,
+) -> pd.DataFrame:
+    """Rank every row of ``df`` within its cohort for all ``metrics`` at once.
+
+    Returns a frame aligned with ``df`` (same index) holding, per metric,
+    ``rank_<metric>`` (1 = highest value in the cohort, ties share the
+    better rank) and ``pct_<metric>`` (percentile of the value within the
+    cohort, 0-100, ties averaged).  Cohorts are the distinct values of the
+    ``by`` columns present in ``df``; rows with a missing key or value get
+    ``NaN``.  ``metrics`` defaults to ``overall_score`` and the numeric
+    fields of ``schema.json``.
+    """
+    metrics = rank_metrics(df, metrics)
+    keys = [k for k in by if k in df.columns]
+    if keys:
+        codes, groups = _group_codes(df, keys)
+        n_groups = len(groups)
+    else:
+        codes, n_groups = np.zeros(len(df), dtype=np.int64), 1
+    values = np.column_stack(
+        [pd.to_numeric(df[m], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan) for m in metrics]
+    ) if metrics else np.empty((len(df), 0))
+    rank, pct = _rank_matrix(values, codes, n_groups)
+    out = {}
+    for j, m in enumerate(metrics):
+        out[f"rank_{m}"] = rank[:, j]
+        out[f"pct_{m}"] = pct[:, j]
+    return pd.DataFrame(out, index=df.index)
+
+
+def update_cohort_ranks(
+    previous: pd.DataFrame,
+    df: pd.DataFrame,
+    metrics: Sequence[str] | None = None,
+    by: Sequence[str] = COHORT_KEYS,
+) -> pd.DataFrame:
+    """Extend ``previous``, the ranks of ``df``'s first rows, to all of ``df``.
+
+    Only the cohorts that received new rows are re-ranked; rows of other
+    cohorts keep their previous values.  The result equals
+    ``cohort_ranks(df, metrics, by)`` provided the earlier rows did not
+    change.
+    """
+    start = len(previous)
+    keys = [k for k in by if k in df.columns]
+    if not keys or start == 0:
+        return cohort_ranks(df, metrics, by)
+    codes, _ = _group_codes(df, keys)
+    touched = np.unique(codes[start:])
+    touched = touched[touched >= 0]
+    affected = np.isin(codes, touched)
+    fresh = cohort_ranks(df.iloc[np.flatnonzero(affected)], metrics, by)
+    out = {}
+    for col in fresh.columns:
+        values = np.full(len(df), np.nan, dtype=np.float32)
+        if col in previous.columns:
+            values[:start] = previous[col].to_numpy(dtype=np.float32)
+        values[affected] = fresh[col].to_numpy()
+        out[col] = values
+    return pd.DataFrame(out, index=df.index)
@@ -0,0 +1,472 @@
+"""Per-student report files for a whole term, streamed into one zip archive.
+
+Usage::
+
+    python -m src.reports --db student_data.db --out reports.zip
+    python -m src.reports --profile profile.json --format html --format xlsx --workers 4
+
+Every student gets a report with their records, overall score, trend
+deltas, class ranks, flag reasons and the comments written about them, as
+``csv/<name>.csv`` (plus ``csv/<name>-comments.csv``), ``xlsx/<name>.xlsx``
+and/or ``html/<name>.html``.  The optional profile is the same JSON file
+:mod:`src.batch` reads (``weights`` and ``thresholds``).
+
+Cohort ranks and percentile flags need every student, so the analytics run
+once on the compact records without free-text fields, the same frame the
+dashboard holds.  Everything per student is streamed: records are read from
+SQLite in chunks ordered by student, grouped into batches of
+``batch_students``, rendered in a process pool and appended to the archive
+as soon as they are ready, with at most two batches per worker in flight.
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import io
+import os
+import re
+import sqlite3
+import sys
+import time
+import zipfile
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import db
+from .profiling import instrument
+
+REPORT_FORMATS = ("csv", "xlsx", "html")
+
+# Characters not allowed in file names on Windows, which most schools use
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+_CSV_SPECIAL = re.compile(r'[",\r\n]')
+
+
+@dataclass
+class ExportStats:
+    """Counts and throughput of one :func:`export_reports` run."""
+
+    students: int = 0
+    rows: int = 0
+    comments: int = 0
+    files: int = 0
+    batches: int = 0
+    bytes_rendered: int = 0
+    render_s: float = 0.0
+    seconds: float = 0.0
+
+    @property
+    def students_per_sec(self) -> float:
+        return self.students / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def file_stem(student: str, used: dict[str, int]) -> str:
+    """A file-system safe, unique name for ``student``'s report files.
+
+    ``used`` counts the stems handed out so far; names that only differ in
+    characters replaced here get ``-2``, ``-3``... suffixes.
+    """
+    stem = _UNSAFE_NAME.sub("_", str(student)).strip(" .")[:100] or "student"
+    n = used.get(stem.casefold(), 0)
+    used[stem.casefold()] = n + 1
+    return stem if n == 0 else f"{stem}-{n + 1}"
+
+
+def _student_starts(frame: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    names = frame["student_name"].astype(object).to_numpy()
+    starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]]) if len(names) else np.array([], dtype=np.int64)
+    return names, starts
+
+
+def iter_student_batches(
+    chunks: Iterable[pd.DataFrame], size: int
+) -> Iterator[tuple[list[str], pd.DataFrame, np.ndarray]]:
+    """Cut chunks of records ordered by ``student_name`` into batches of ``size`` students.
+
+    Yields ``(names, records, offsets)``: student ``names[i]`` owns rows
+    ``offsets[i]:offsets[i + 1]`` of ``records``.  A batch is one contiguous
+    slice of the stream; students not yet complete at the end of a chunk are
+    carried into the next, so only about one chunk plus one batch is held at
+    a time.  Rows without a student are skipped.
+    """
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    carry = None
+    for chunk in chunks:
+        chunk = chunk[chunk["student_name"].notna()]
+        if carry is not None:
+            chunk = db.concat_records([carry, chunk])
+        names, starts = _student_starts(chunk)
+        # the last student may continue in the next chunk
+        full = (len(starts) - 1) // size * size if len(starts) else 0
+        for k in range(0, full, size):
+            bounds = starts[k : k + size + 1]
+            yield names[bounds[:-1]].tolist(), chunk.iloc[bounds[0] : bounds[-1]], bounds - bounds[0]
+        carry = chunk.iloc[starts[full]:] if len(starts) else None
+    if carry is not None:
+        names, starts = _student_starts(carry)
+        bounds = np.r_[starts, len(carry)]
+        for k in range(0, len(starts), size):
+            part = bounds[k : k + size + 1]
+            yield names[part[:-1]].tolist(), carry.iloc[part[0] : part[-1]], part - part[0]
+
+
+def _derived_columns(analyzed: pd.DataFrame, record_columns: Sequence[str]) -> pd.DataFrame:
+    """Analytics columns of ``analyzed`` (not stored in records), indexed by record id."""
+    if "id" not in analyzed.columns:
+        raise ValueError("the analytics frame needs the records' 'id' column to join reports")
+    stored = set(record_columns)
+    derived = [c for c in analyzed.columns if c not in stored]
+    return analyzed[derived].set_axis(analyzed["id"].to_numpy(dtype=np.int64), axis=0)
+
+
+def _student_comments(conn: sqlite3.Connection, students: Sequence[str]) -> dict[str, pd.DataFrame]:
+    """Comments written in the app about ``students``, newest first.
+
+    Comments imported from record fields are left out; they are already in
+    the records part of the report.
+    """
+    query = (
+        "SELECT student_name, author, kind, body, created_at FROM comments "
+        f"WHERE student_name IN ({', '.join('?' * len(students))}) AND record_id IS NULL "
+        "ORDER BY student_name, created_at DESC, id DESC"
+    )
+    comments = pd.read_sql_query(query, conn, params=tuple(students))
+    return {name: group.drop(columns="student_name") for name, group in comments.groupby("student_name", sort=False)}
+
+
+def report_tasks(
+    conn: sqlite3.Connection,
+    analyzed: pd.DataFrame,
+    formats: Sequence[str] = REPORT_FORMATS,
+    batch_students: int = 200,
+    chunksize: int = 50_000,
+) -> Iterator[dict]:
+    """Yield render tasks of ``batch_students`` students each, in name order.
+
+    Records are streamed with :func:`src.db.iter_records` and joined by id
+    with the analytics columns of ``analyzed`` (scores, deltas, ranks,
+    flags); records added after ``analyzed`` was computed get empty values.
+    """
+    derived = _derived_columns(analyzed, db.record_columns(conn))
+    used: dict[str, int] = {}
+
+    def joined() -> Iterator[pd.DataFrame]:
+        for chunk in db.iter_records(conn, order_by=("student_name", "id"), chunksize=chunksize):
+            extra = derived.reindex(chunk["id"].to_numpy(dtype=np.int64))
+            yield pd.concat([chunk, extra.set_axis(chunk.index, axis=0)], axis=1)
+
+    for names, records, offsets in iter_student_batches(joined(), batch_students):
+        comments = _student_comments(conn, names)
+        yield {
+            "formats": list(formats),
+            "students": [(name, file_stem(name, used), comments.get(name)) for name in names],
+            "records": records,
+            "offsets": offsets,
+        }
+
+
+def _report_frame(records: pd.DataFrame) -> pd.DataFrame:
+    from .flags import REASONS_COLUMN, reason_labels
+
+    frame = records.drop(columns=["id", "student_name"], errors="ignore")
+    if REASONS_COLUMN in frame.columns:
+        reasons = frame[REASONS_COLUMN].fillna(0).astype(np.int64)
+        frame = frame.drop(columns=REASONS_COLUMN).assign(flag_reason_labels=reason_labels(reasons))
+    return frame
+
+
+def _csv_field(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"' if _CSV_SPECIAL.search(text) else text
+
+
+def _cells(values: pd.Series, escape: Callable[[str], str]) -> np.ndarray:
+    """Text of every value of a column, formatting each distinct value once."""
+    codes, uniques = pd.factorize(values)
+    if pd.api.types.is_float_dtype(uniques):
+        # numpy prints float32 scores as "83.4", not as their float64 expansion
+        labels = np.asarray(uniques).astype(str).tolist()
+    else:
+        labels = [escape(str(u)) for u in uniques]
+    # code -1 (missing) picks the trailing empty label
+    return np.asarray(labels + [""], dtype=object)[codes]
+
+
+def _lines(frame: pd.DataFrame, escape: Callable[[str], str], sep: str, start: str, end: str) -> list[str]:
+    """One text line per row of ``frame``.
+
+    Cells are formatted column by column and each line is joined once, so
+    slicing the lines per student is all that is left per report; pandas'
+    ``to_csv``/``to_html`` format cell by cell and cost more per student
+    than the rest of the export together.
+    """
+    columns = [_cells(frame[c], escape) for c in frame.columns]
+    return [start + sep.join(cells) + end for cells in zip(*columns)]
+
+
+def _csv_text(frame: pd.DataFrame) -> tuple[str, np.ndarray]:
+    header = ",".join(_csv_field(str(c)) for c in frame.columns) + "\n"
+    return header, _lines(frame, _csv_field, ",", "", "\n")
+
+
+def _html_text(frame: pd.DataFrame) -> tuple[str, np.ndarray]:
+    header = "<table><thead><tr>" + "".join(f"<th>{html.escape(str(c))}</th>" for c in frame.columns)
+    return header + "</tr></thead><tbody>", _lines(frame, html.escape, "</td><td>", "<tr><td>", "</td></tr>")
+
+
+def _html_page(student: str, table: str, comments: str | None, flags: Sequence[str]) -> str:
+    name = html.escape(str(student))
+    parts = [
+        f'<!DOCTYPE html><html lang="he" dir="rtl"><head><meta charset="utf-8"><title>{name}</title>',
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:2px 6px}</style></head><body>",
+        f"<h1>{name}</h1>",
+    ]
+    if flags:
+        parts.append(f"<p><strong>מסומן/ת:</strong> {html.escape(', '.join(flags))}</p>")
+    parts += ["<h2>רשומות</h2>", table]
+    if comments:
+        parts += ["<h2>הערות</h2>", comments]
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _xlsx(sheets: dict[str, tuple[list, np.ndarray]]) -> bytes:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    # write-only workbooks stream rows instead of building a cell object per value
+    workbook = Workbook(write_only=True)
+    for title, (columns, rows) in sheets.items():
+        sheet = workbook.create_sheet(title)
+
+        def text(value: str) -> WriteOnlyCell:
+            # openpyxl would store text starting with "=" (a comment such as
+            # "=== חשוב ===") as a formula
+            cell = WriteOnlyCell(sheet, value)
+            cell.data_type = "s"
+            return cell
+
+        sheet.append([text(str(c)) for c in columns])
+        for row in rows:
+            sheet.append([text(v) if isinstance(v, str) and v.startswith("=") else v for v in row])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _cell_values(frame: pd.DataFrame) -> np.ndarray:
+    """Row-major Python values of ``frame`` with missing values as ``None``."""
+    values = frame.astype(object).to_numpy()
+    values[pd.isna(values)] = None
+    return values
+
+
+@instrument("reports.render_batch")
+def render_batch(task: dict) -> tuple[list[tuple[str, bytes]], dict[str, int], float]:
+    """Worker entry point: render the report files of one batch of students.
+
+    Returns ``(files, counts, seconds)`` where ``files`` are archive names
+    with their content and ``counts`` the students, rows and comments seen.
+    Every column of the batch is formatted once and sliced per student.
+    """
+    started = time.perf_counter()
+    formats = task["formats"]
+    frame = _report_frame(task["records"])
+    offsets = task["offsets"]
+    csv_header, csv_lines = _csv_text(frame) if "csv" in formats else (None, None)
+    html_header, html_lines = _html_text(frame) if "html" in formats else (None, None)
+    cell_values = _cell_values(frame) if "xlsx" in formats else None
+    flagged = frame["flagged"].fillna(False).astype(bool).to_numpy() if "flagged" in frame.columns else None
+    labels = frame["flag_reason_labels"].to_numpy() if "flag_reason_labels" in frame.columns else None
+
+    files = []
+    counts = {"students": len(task["students"]), "rows": len(frame), "comments": 0}
+    for i, (student, stem, comments) in enumerate(task["students"]):
+        rows = slice(int(offsets[i]), int(offsets[i + 1]))
+        has_comments = comments is not None and not comments.empty
+        counts["comments"] += len(comments) if has_comments else 0
+        if csv_lines is not None:
+            # BOM so Excel opens the Hebrew headers correctly, like the app's export
+            text = csv_header + "".join(csv_lines[rows])
+            files.append((f"csv/{stem}.csv", text.encode("utf-8-sig")))
+            if has_comments:
+                header, lines = _csv_text(comments)
+                files.append((f"csv/{stem}-comments.csv", (header + "".join(lines)).encode("utf-8-sig")))
+        if cell_values is not None:
+            sheets = {"records": (list(frame.columns), cell_values[rows])}
+            if has_comments:
+                sheets["comments"] = (list(comments.columns), _cell_values(comments))
+            files.append((f"xlsx/{stem}.xlsx", _xlsx(sheets)))
+        if html_lines is not None:
+            flags = []
+            if flagged is not None and flagged[rows].any():
+                flags = sorted({f for value in labels[rows][flagged[rows]] for f in str(value).split(", ") if f})
+            table = html_header + "".join(html_lines[rows]) + "</tbody></table>"
+            notes = None
+            if has_comments:
+                header, lines = _html_text(comments)
+                notes = header + "".join(lines) + "</tbody></table>"
+            files.append((f"html/{stem}.html", _html_page(student, table, notes, flags).encode("utf-8")))
+    return files, counts, time.perf_counter() - started
+
+
+@instrument()
+def export_reports(
+    conn: sqlite3.Connection,
+    out: Path | str | IO[bytes],
+    analyzed: pd.DataFrame,
+    formats: Sequence[str] = REPORT_FORMATS,
+    workers: int | None = None,
+    batch_students: int = 200,
+    chunksize: int = 50_000,
+    compresslevel: int = 6,
+    progress: Callable[[ExportStats], None] | None = None,
+    mp_context: str = "spawn",
+) -> ExportStats:
+    """Write every student's report files into the zip archive ``out``.
+
+    ``analyzed`` is the output of :func:`src.analytics.run_analytics` (or the
+    app's pipeline) on the records, including their ``id`` column.  Batches
+    are rendered in a process pool of ``workers`` processes (default: CPU
+    count; with one worker everything runs in-process) and written in
+    student order; ``progress`` is called with the running totals after
+    every batch.  CSV and HTML files are deflated, workbooks are stored as
+    they already are zip files.
+
+    Raises
+    ------
+    ValueError
+        For unknown formats or fewer than one worker.
+    """
+    unknown = [f for f in formats if f not in REPORT_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"unknown report formats {unknown!r}; expected some of {REPORT_FORMATS}")
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    stats = ExportStats()
+    started = time.perf_counter()
+
+    pool = None
+    if workers > 1:
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(mp_context))
+    try:
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+
+            def write(result) -> None:
+                files, counts, seconds = result
+                for name, data in files:
+                    stored = name.endswith(".xlsx")
+                    archive.writestr(name, data, compress_type=zipfile.ZIP_STORED if stored else None)
+                    stats.bytes_rendered += len(data)
+                stats.files += len(files)
+                stats.students += counts["students"]
+                stats.rows += counts["rows"]
+                stats.comments += counts["comments"]
+                stats.batches += 1
+                stats.render_s += seconds
+                stats.seconds = time.perf_counter() - started
+                if progress is not None:
+                    progress(stats)
+
+            pending: deque = deque()
+            for task in report_tasks(conn, analyzed, formats, batch_students, chunksize):
+                if pool is None:
+                    write(render_batch(task))
+                    continue
+                pending.append(pool.submit(render_batch, task))
+                # bounded look-ahead keeps rendered batches from piling up in memory
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def format_summary(stats: ExportStats) -> str:
+    """Render the totals and throughput of an export as plain text."""
+    return (
+        f"{stats.students:,} students, {stats.rows:,} records, {stats.comments:,} comments -> "
+        f"{stats.files:,} files ({stats.bytes_rendered / 2**20:,.1f} MiB before compression) "
+        f"in {stats.seconds:.2f}s: {stats.students_per_sec:,.0f} students/s, "
+        f"{stats.rows_per_sec:,.0f} records/s, render {stats.render_s:.2f}s in {stats.batches:,} batches"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, default=db.DB_PATH, help="SQLite database with the records")
+    parser.add_argument("--out", type=Path, default=Path("reports.zip"), help="zip archive to write")
+    parser.add_argument(
+        "--format", dest="formats", action="append", choices=REPORT_FORMATS,
+        help="report format, repeatable (default: all)",
+    )
+    parser.add_argument("--profile", type=Path, default=None, help="JSON with weights and thresholds")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--batch-students", type=int, default=200, help="students rendered per task")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="records read per chunk")
+    parser.add_argument("--summary", type=Path, default=None, help="write the totals as JSON")
+    args = parser.parse_args(argv)
+
+    formats = args.formats or list(REPORT_FORMATS)
+    if "xlsx" in formats:
+        import importlib.util
+
+        if importlib.util.find_spec("openpyxl") is None:
+            parser.error("--format xlsx requires openpyxl (pip install openpyxl)")
+    if not args.db.exists():
+        parser.error(f"database {args.db} does not exist")
+    from .analytics import normalize_weights, run_analytics
+    from .batch import load_profile
+
+    try:
+        profile = load_profile(args.profile)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    conn = db.init_db(args.db)
+    try:
+        records = db.load_records(conn, compact=True, include_comments=False)
+        weights = normalize_weights(profile.weights) if profile.weights else {}
+        partition_by = profile.partition_by if profile.partition_by in records.columns else None
+        analyzed, _ = run_analytics(
+            records,
+            weights,
+            profile.low_percentile,
+            profile.significant_drop_points,
+            partition_by,
+            thresholds=profile.thresholds,
+        )
+        del records
+        stats = export_reports(conn, args.out, analyzed, formats, args.workers, args.batch_students, args.chunksize)
+    finally:
+        conn.close()
+    print(format_summary(stats))
+    if args.summary is not None:
+        import json
+
+        payload = {**asdict(stats), "students_per_sec": stats.students_per_sec, "rows_per_sec": stats.rows_per_sec}
+        args.summary.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,8 @@
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 import json
 
 SCHEMA_FILE = Path(__file__).resolve().parent.parent / "schema.json"
@@ -10,8 +13,58 @@ def load_schema(path: Path | str = SCHEMA_FILE):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def canonical_map(schema: dict | None = None) -> dict:
-    """Return mapping of canonical field key to definition."""
-    if schema is None:
-        schema = load_schema()
-    return {c["key"]: c for c in schema.get("canonical_fields", [])}
+@dataclass(frozen=True)
+class CompiledSchema:
+    """Everything derived from ``schema.json`` that callers look up repeatedly.
+
+    Built once per schema file by :func:`compile_schema`; the mappings are
+    read-only views so the shared instance cannot be modified by accident.
+    """
+
+    raw: dict
+    fields: Mapping[str, dict]
+    numeric_keys: tuple[str, ...]
+    numeric_set: frozenset
+    dtypes: Mapping[str, str]
+    lazy: tuple[str, ...]
+    records_ddl: str
+
+def _compile(schema: dict) -> CompiledSchema:
+    fields = {c["key"]: c for c in schema.get("canonical_fields", [])}
+    dtypes = {k: c.get("dtype", "string") for k, c in fields.items()}
+    # fields stored as floats are the numeric scores and rates
+    numeric = tuple(k for k, d in dtypes.items() if d.startswith("float"))
+    columns = ["id INTEGER PRIMARY KEY AUTOINCREMENT"] + [
+        f"{k} {'REAL' if k in numeric else 'TEXT'}" for k in fields
+    ]
+    return CompiledSchema(
+        raw=schema,
+        fields=MappingProxyType(fields),
+        numeric_keys=numeric,
+        numeric_set=frozenset(numeric),
+        dtypes=MappingProxyType(dtypes),
+        lazy=tuple(k for k, c in fields.items() if c.get("lazy")),
+        records_ddl=f"CREATE TABLE IF NOT EXISTS records ({', '.join(columns)});",
+    )
+
+@lru_cache()
+def compile_schema(path: Path | str = SCHEMA_FILE) -> CompiledSchema:
+    """Return the cached :class:`CompiledSchema` of a schema file."""
+    return _compile(load_schema(path))
+
+def _compiled(schema: dict | None) -> CompiledSchema:
+    if schema is None or schema is load_schema():
+        return compile_schema()
+    return _compile(schema)
+
+def canonical_map(schema: dict | None = None) -> Mapping[str, dict]:
+    """Return mapping of canonical field key to definition (read-only)."""
+    return _compiled(schema).fields
+
+def field_dtypes(schema: dict | None = None) -> Mapping[str, str]:
+    """Return mapping of canonical field key to its compact in-memory dtype."""
+    return _compiled(schema).dtypes
+
+def lazy_fields(schema: dict | None = None) -> list:
+    """Return keys of free-text fields that are loaded only on demand."""
+    return list(_compiled(schema).lazy)
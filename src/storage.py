@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import os
+from types import ModuleType
+
+BACKEND_ENV = "STUDENT_ANALYTICS_BACKEND"
+BACKENDS = ("sqlite", "parquet")
+
+
+def get_backend(name: str | None = None) -> ModuleType:
+    """Return the storage module selected by ``name`` or the environment.
+
+    Both backends expose ``init_db``, ``get_pool``, ``insert_dataframe``,
+    ``load_records``, ``is_ingested`` and ``mark_ingested`` with the same call
+    signatures, so callers can switch between SQLite and Parquet by
+    configuration alone.
+    """
+    name = (name or os.environ.get(BACKEND_ENV) or "sqlite").lower()
+    if name == "sqlite":
+        from . import db
+
+        return db
+    if name == "parquet":
+        from . import parquet_store
+
+        return parquet_store
+    raise ValueError(f"unknown storage backend {name!r}; expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import numeric_keys
+
+# Resampling frequencies accepted by StudentSeries.resample
+FREQUENCIES = ("D", "W", "M")
+
+
+def parse_dates(values: pd.Series) -> np.ndarray:
+    """Parse a date column to ``datetime64[D]`` (``NaT`` when missing or invalid).
+
+    Each distinct value is parsed once, which matters for record tables where
+    many rows share the same exam dates.  Times of day are dropped.
+    Ambiguous numeric dates are read day first (``05/03/2024`` is 5 March),
+    as Israeli exports write them; ISO ``YYYY-MM-DD`` values are unaffected.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    # formats may differ between uploads, so each value is parsed on its own;
+    # without dayfirst, 05/03 and 13/03 would be read in different orders
+    parsed = pd.to_datetime(pd.Index(uniques).astype(str), errors="coerce", format="mixed", dayfirst=True)
+    parsed = parsed.to_numpy(dtype="datetime64[D]")
+    out = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[D]")
+    valid = codes >= 0
+    out[valid] = parsed[codes[valid]]
+    return out
+
+
+def _bucket_start(dates: np.ndarray, freq: str) -> np.ndarray:
+    """First day of the day/week (Monday)/month period of every date."""
+    if freq == "D":
+        return dates
+    if freq == "W":
+        days = dates.astype(np.int64)
+        # 1970-01-01 was a Thursday, so shifting by 3 days aligns weeks on Monday
+        return ((days + 3) // 7 * 7 - 3).astype("datetime64[D]")
+    if freq == "M":
+        return dates.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"unknown frequency {freq!r}; expected one of {', '.join(FREQUENCIES)}")
+
+
+@dataclass(frozen=True)
+class StudentSeries:
+    """Per-student event histories in compressed sparse row layout.
+
+    The events of student ``students[i]`` are rows ``offsets[i]`` to
+    ``offsets[i + 1]`` of ``dates`` (sorted, ``datetime64[D]``) and
+    ``values`` (``float32``, one column per metric).  Looking up a student
+    is a dictionary hit and a slice, so queries never scan other students.
+    Build instances with :func:`build_series`.
+    """
+
+    students: np.ndarray
+    offsets: np.ndarray
+    dates: np.ndarray
+    values: np.ndarray
+    metrics: tuple[str, ...]
+    index: dict
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.dates.nbytes + self.values.nbytes)
+
+    def _slice(self, student: str, start=None, end=None) -> slice:
+        i = self.index.get(student)
+        if i is None:
+            return slice(0, 0)
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        dates = self.dates[lo:hi]
+        a = np.searchsorted(dates, np.datetime64(start, "D"), "left") if start is not None else 0
+        b = np.searchsorted(dates, np.datetime64(end, "D"), "right") if end is not None else hi - lo
+        return slice(lo + int(a), lo + int(b))
+
+    def _columns(self, metrics: Sequence[str] | None) -> list[int]:
+        if metrics is None:
+            return list(range(len(self.metrics)))
+        unknown = [m for m in metrics if m not in self.metrics]
+        if unknown:
+            raise ValueError(f"metrics not in the series: {', '.join(unknown)}")
+        return [self.metrics.index(m) for m in metrics]
+
+    def events(self, student: str, start=None, end=None, metrics: Sequence[str] | None = None) -> pd.DataFrame:
+        """A student's events between ``start`` and ``end`` (inclusive), by date."""
+        cols = self._columns(metrics)
+        rows = self._slice(student, start, end)
+        return pd.DataFrame(
+            self.values[rows][:, cols], columns=[self.metrics[j] for j in cols],
+            index=pd.DatetimeIndex(self.dates[rows].astype("datetime64[ns]"), name="date"),
+        )
+
+    def resample(
+        self,
+        student: str,
+        freq: str = "M",
+        start=None,
+        end=None,
+        metrics: Sequence[str] | None = None,
+    ) -> pd.DataFrame:
+        """Mean of every metric per day (``D``), week (``W``) or month (``M``).
+
+        Returns one row per period with events, indexed by the period's first
+        day and with one column per metric, ready for a multi-line chart.  All
+        metrics are reduced together with one ``reduceat`` over the student's
+        already sorted events; missing values are ignored.
+        """
+        cols = self._columns(metrics)
+        rows = self._slice(student, start, end)
+        buckets = _bucket_start(self.dates[rows], freq)
+        names = [self.metrics[j] for j in cols]
+        if not len(buckets):
+            return pd.DataFrame(columns=names, index=pd.DatetimeIndex([], name="date"), dtype=np.float64)
+        values = self.values[rows][:, cols].astype(np.float64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        return pd.DataFrame(
+            means, columns=names, index=pd.DatetimeIndex(buckets[starts].astype("datetime64[ns]"), name="date")
+        )
+
+    def date_range(self, student: str) -> tuple[np.datetime64, np.datetime64] | None:
+        """First and last event date of a student, or ``None`` without events."""
+        rows = self._slice(student)
+        if rows.start == rows.stop:
+            return None
+        return self.dates[rows.start], self.dates[rows.stop - 1]
+
+
+def build_series(df: pd.DataFrame, metrics: Sequence[str] | None = None) -> StudentSeries:
+    """Build :class:`StudentSeries` from records with ``student_name`` and ``date``.
+
+    ``metrics`` defaults to the numeric fields present in ``df``.  Rows
+    without a student or a parseable date are left out.  One ``lexsort`` by
+    student and date orders every history at once.
+    """
+    metrics = [m for m in (numeric_keys if metrics is None else metrics) if m in df.columns]
+    if "student_name" not in df.columns or "date" not in df.columns:
+        raise ValueError("records need 'student_name' and 'date' columns for a time series")
+    codes, students = pd.factorize(df["student_name"], sort=True, use_na_sentinel=True)
+    dates = parse_dates(df["date"])
+    keep = np.flatnonzero((codes >= 0) & ~np.isnat(dates))
+    order = keep[np.lexsort((dates[keep], codes[keep]))]
+    values = np.empty((len(order), len(metrics)), dtype=np.float32)
+    for j, m in enumerate(metrics):
+        column = pd.to_numeric(df[m], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+        values[:, j] = column[order]
+    counts = np.bincount(codes[order], minlength=len(students))
+    offsets = np.r_[0, np.cumsum(counts)].astype(np.int64)
+    students = np.asarray(students, dtype=object)
+    return StudentSeries(
+        students=students,
+        offsets=offsets,
+        dates=dates[order],
+        values=values,
+        metrics=tuple(metrics),
+        index={s: i for i, s in enumerate(students.tolist())},
+    )
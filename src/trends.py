@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _group_codes(df: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, pd.DataFrame]:
+    """Hash-factorize ``keys`` into dense group codes.
+
+    Returns ``(codes, groups)`` where ``codes[i]`` is the group of row ``i``
+    (``-1`` when any key is missing) and ``groups`` holds one row of key
+    values per code.
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    uniques: list[pd.Index] = []
+    for key in keys:
+        c, u = pd.factorize(df[key], use_na_sentinel=True)
+        missing |= c < 0
+        codes = codes * max(len(u), 1) + np.maximum(c, 0)
+        uniques.append(pd.Index(u))
+    codes[missing] = -1
+    combined, order = pd.factorize(codes[~missing])
+    out = np.full(len(df), -1, dtype=np.int64)
+    out[~missing] = combined
+    groups = {}
+    rest = np.asarray(order, dtype=np.int64)
+    for key, u in zip(reversed(keys), reversed(uniques)):
+        size = max(len(u), 1)
+        groups[key] = u.take(rest % size) if len(u) else pd.Index([], dtype=object)
+        rest = rest // size
+    return out, pd.DataFrame({k: np.asarray(groups[k]) for k in keys})
+
+
+def period_codes(
+    values: pd.Series, order_by: str, semester_order: Sequence[str] | None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Map semesters or dates to ordered integer periods (``-1`` when missing)."""
+    if order_by == "date":
+        parsed = pd.to_datetime(values, errors="coerce")
+        valid = parsed.notna().to_numpy()
+        stamps = parsed.to_numpy(dtype="datetime64[ns]")
+        labels, inverse = np.unique(stamps[valid], return_inverse=True)
+        codes = np.full(len(values), -1, dtype=np.int64)
+        codes[valid] = inverse
+        return codes, labels
+    present = pd.unique(values.dropna())
+    ordered = [s for s in (semester_order or []) if s in set(present)]
+    rest = [s for s in present if s not in set(ordered)]
+    try:
+        ordered += sorted(rest)
+    except TypeError:
+        ordered += sorted(rest, key=str)
+    codes = pd.Categorical(values, categories=ordered).codes.astype(np.int64)
+    return codes, np.asarray(ordered, dtype=object)
+
+
+def _segments(group: np.ndarray, period: np.ndarray, n_periods: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort rows by (group, period) and return the sort order and segment bounds."""
+    key = group * max(n_periods, 1) + period
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]]) if len(key) else np.array([], int)
+    seg_key = sorted_key[starts]
+    return order, starts, seg_key
+
+
+def student_keys(partition_by: str | Sequence[str] | None = None) -> list[str]:
+    """Return the columns identifying a student, optionally within partitions."""
+    if partition_by is None:
+        return ["student_name"]
+    if isinstance(partition_by, str):
+        return [partition_by, "student_name"]
+    return list(partition_by) + ["student_name"]
+
+
+def _reduce(df, fields, order_by, semester_order, keys):
+    """Segment-reduce ``fields`` to (group, period) means in one sorted pass."""
+    if df.empty or not fields or order_by not in df.columns or any(k not in df.columns for k in keys):
+        return None
+    group, groups = _group_codes(df, keys)
+    period, labels = period_codes(df[order_by], order_by, semester_order)
+    keep = (group >= 0) & (period >= 0)
+    if not keep.any():
+        return None
+    codes = group
+    values = np.column_stack(
+        [pd.to_numeric(df[k], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan) for k in fields]
+    )[keep]
+    group, period = group[keep], period[keep]
+    order, starts, seg_key = _segments(group, period, len(labels))
+    values = values[order]
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    n_periods = max(len(labels), 1)
+    return seg_key // n_periods, seg_key % n_periods, means, groups, labels, codes
+
+
+def _rolling_delta(seg_group: np.ndarray, mean: np.ndarray) -> np.ndarray:
+    """Difference to the previous non-missing period of the same group."""
+    n = len(mean)
+    valid = ~np.isnan(mean)
+    idx = np.where(valid, np.arange(n), -1)
+    # index of the last valid segment strictly before each position
+    prev = np.maximum.accumulate(np.r_[-1, idx[:-1]]) if n else idx
+    ok = valid & (prev >= 0)
+    ok[ok] &= seg_group[prev[ok]] == seg_group[ok]
+    delta = np.full(n, np.nan)
+    delta[ok] = mean[ok] - mean[prev[ok]]
+    return delta
+
+
+def trend_summary(
+    df: pd.DataFrame,
+    fields: list[str],
+    order_by: str = "semester",
+    semester_order: Sequence[str] | None = None,
+    partition_by: str | Sequence[str] | None = None,
+    return_codes: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, np.ndarray]:
+    """Summarize each student's trajectory across an ordered sequence of periods.
+
+    Returns one row per student (per partition when ``partition_by`` is set)
+    with, for every field:
+
+    - ``delta_<field>``: latest period mean minus the previous one,
+    - ``slope_<field>``: least-squares change per period step,
+    - ``max_drop_<field>``: the largest decrease between consecutive periods
+      (``0`` when the student never dropped, ``NaN`` with fewer than two
+      periods).
+
+    Everything is computed with one sort and NumPy segment reductions; no wide
+    pivot of students by periods is built.  With ``return_codes`` the per-row
+    index into the summary (``-1`` for rows without a student) is returned as
+    well, so results can be broadcast back to the records with a single
+    ``take``.
+
+    Parameters
+    ----------
+    order_by:
+        ``"semester"`` for semester labels or ``"date"`` to treat every
+        distinct date as a period.
+    semester_order:
+        Explicit order of semester labels; labels not listed follow in sorted
+        order.
+    partition_by:
+        Optional column(s), such as ``class_name``, that are part of the
+        student key so each partition is trended independently.
+    """
+    keys = student_keys(partition_by)
+    columns = keys + [f"{s}_{k}" for k in fields for s in ("delta", "slope", "max_drop")]
+    reduced = _reduce(df, fields, order_by, semester_order, keys)
+    if reduced is None:
+        empty = pd.DataFrame(columns=columns)
+        return (empty, np.full(len(df), -1, dtype=np.int64)) if return_codes else empty
+    seg_group, seg_period, means, groups, _, codes = reduced
+    n_groups = len(groups)
+    out = groups.copy()
+    x = seg_period.astype(np.float64)
+    for j, k in enumerate(fields):
+        mean = means[:, j]
+        valid = ~np.isnan(mean)
+        delta = _rolling_delta(seg_group, mean)
+        g = seg_group[valid]
+        y, xv = mean[valid], x[valid]
+
+        # the latest delta of a group sits at its last valid segment
+        last = np.r_[g[1:] != g[:-1], True] if len(g) else np.zeros(0, dtype=bool)
+        last_delta = np.full(n_groups, np.nan)
+        last_delta[g[last]] = delta[valid][last]
+        has_delta = ~np.isnan(delta)
+
+        n = np.bincount(g, minlength=n_groups).astype(np.float64)
+        sx = np.bincount(g, xv, n_groups)
+        sy = np.bincount(g, y, n_groups)
+        sxx = np.bincount(g, xv * xv, n_groups)
+        sxy = np.bincount(g, xv * y, n_groups)
+        denom = n * sxx - sx * sx
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = np.where((n >= 2) & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+
+        drop = np.full(n_groups, np.inf)
+        np.minimum.at(drop, seg_group[has_delta], delta[has_delta])
+        max_drop = np.where(np.isinf(drop), np.nan, np.maximum(-drop, 0.0))
+
+        out[f"delta_{k}"] = last_delta
+        out[f"slope_{k}"] = slope
+        out[f"max_drop_{k}"] = max_drop
+    return (out[columns], codes) if return_codes else out[columns]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import IO, Any, Callable, Iterator, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _sort_key(values: pd.Series, descending: bool) -> np.ndarray:
+    """Float key for one column with missing values last in either direction."""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        key = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        codes, _ = pd.factorize(values, sort=True, use_na_sentinel=True)
+        key = np.where(codes < 0, np.nan, codes).astype(np.float64)
+    return -key if descending else key
+
+
+def sort_order(df: pd.DataFrame, by: Sequence[str]) -> np.ndarray:
+    """Return the row positions of ``df`` sorted by ``by``.
+
+    Prefix a column with ``-`` for descending order; missing values sort
+    last and ties keep their original order, as with
+    ``DataFrame.sort_values(kind="stable")``.  Columns not in ``df`` are
+    ignored.  Computing the order once and slicing it per page avoids
+    sorting and copying the whole frame on every rerun.
+    """
+    keys = []
+    for spec in by:
+        col, descending = (spec[1:], True) if spec.startswith("-") else (spec, False)
+        if col in df.columns:
+            keys.append(_sort_key(df[col], descending))
+    if not keys:
+        return np.arange(len(df))
+    # lexsort treats its last key as the primary one
+    return np.lexsort(keys[::-1])
+
+
+def page(df: pd.DataFrame, order: np.ndarray, number: int, size: int) -> pd.DataFrame:
+    """Rows of page ``number`` (0-based) of ``df`` in ``order``."""
+    if size < 1:
+        raise ValueError("page size must be at least 1")
+    start = max(number, 0) * size
+    return df.iloc[order[start : start + size]]
+
+
+def page_count(n_rows: int, size: int) -> int:
+    """Number of pages needed for ``n_rows`` rows (at least one)."""
+    return max(1, -(-n_rows // size))
+
+
+def iter_csv(
+    df: pd.DataFrame,
+    rows: np.ndarray | None = None,
+    columns: Sequence[str] | None = None,
+    chunksize: int = 50_000,
+    encoding: str = "utf-8-sig",
+    derived: Mapping[str, Callable[[pd.DataFrame], Any]] | None = None,
+) -> Iterator[bytes]:
+    """Encode ``df`` (optionally a row subset, in that order) as CSV chunks.
+
+    Only ``chunksize`` rows are converted to text at a time, so memory stays
+    bounded by the chunk rather than by the whole export.  ``derived`` adds
+    columns computed per chunk, such as display labels.  The header and, for
+    ``utf-8-sig``, the BOM are emitted once.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+    frame = df if columns is None else df[[c for c in columns if c in df.columns]]
+
+    def rows_at(positions: np.ndarray) -> pd.DataFrame:
+        chunk = frame.iloc[positions]
+        if derived:
+            source = df.iloc[positions]
+            chunk = chunk.assign(**{name: fn(source) for name, fn in derived.items()})
+        return chunk
+
+    yield rows_at(rows[:0]).to_csv(index=False).encode(encoding)
+    body_encoding = "utf-8" if encoding == "utf-8-sig" else encoding
+    for start in range(0, len(rows), chunksize):
+        chunk = rows_at(rows[start : start + chunksize])
+        yield chunk.to_csv(index=False, header=False).encode(body_encoding)
+
+
+def write_csv(out: IO[bytes], *args, **kwargs) -> int:
+    """Write :func:`iter_csv` chunks to a binary file object; return bytes written."""
+    total = 0
+    for chunk in iter_csv(*args, **kwargs):
+        out.write(chunk)
+        total += len(chunk)
+    return total
@@ -1,29 +1,82 @@
+import io
+from pathlib import Path
+
 import pandas as pd
 import streamlit as st
 
-from src.schema import load_schema, canonical_map
-from src.data_loader import load_excel, normalize_dataframe
+from src.schema import compile_schema
+from src.data_loader import iter_batches
 from src.analytics import (
+    compute_cohort_ranks,
     compute_overall_score,
     compute_trends,
     apply_flags,
     normalize_weights,
 )
-from src.db import init_db, insert_dataframe, load_records
+from src.flags import REASONS_COLUMN, compile_rules, filter_by_reasons, reason_labels, rules_mask
+from src.pipeline import AnalyticsPipeline
+from src.storage import get_backend
+from src.views import page, page_count, sort_order, write_csv
+from src import db, profiling
 
 st.set_page_config(page_title="Student Analytics MVP", layout="wide")
 st.title("📊 Student Analytics — Excel → Insights (MVP)")
 
-# Load schema and canonical field map
-SCHEMA = load_schema()
-CANON = canonical_map(SCHEMA)
 
-# Initialize database connection
-conn = init_db()
+@st.cache_resource
+def app_resources():
+    """Schema, flag rules, storage backend and its pool, built once per server.
+
+    Reruns re-execute this script; everything here is looked up instead of
+    being parsed or connected again.  The storage backend is selected by
+    STUDENT_ANALYTICS_BACKEND and the pool initializes the schema only once.
+    """
+    backend = get_backend()
+    return compile_schema(), compile_rules(), backend, backend.get_pool()
+
+
+COMPILED_SCHEMA, FLAG_RULES, BACKEND, POOL = app_resources()
+SCHEMA = COMPILED_SCHEMA.raw
+CANON = COMPILED_SCHEMA.fields
+DASHBOARD_SORT = ("-flagged", "-overall_score")
+# Dashboard orderings; cohort percentiles come precomputed from the ranking stage
+SORT_OPTIONS = {
+    "מסומנים ואז ציון משוקלל": DASHBOARD_SORT,
+    "אחוזון כיתתי (נמוך תחילה)": ("pct_overall_score", "class_name", "semester"),
+    "דירוג בכיתה": ("class_name", "semester", "rank_overall_score"),
+}
+
+USE_PIPELINE = BACKEND is db
+# Comments always live in SQLite, which provides the full-text index
+COMMENTS_POOL = POOL if USE_PIPELINE else db.get_pool()
+COMMENTS_PAGE_SIZE = 20
+CHART_METRICS = ("quiz_avg", "quarter_exam", "midterm_mock", "half_semester_final")
+TIMELINE_FREQUENCIES = {"יומי": "D", "שבועי": "W", "חודשי": "M"}
+SAMPLE_FILE = Path("data/sample_class.xlsx")
+# Finished-upload messages kept on screen per session
+INGEST_MESSAGES = 5
+
+
+@st.cache_resource
+def ingest_queue():
+    """One background ingestion worker shared by every session of the server."""
+    from src.ingest import IngestQueue
+
+    return IngestQueue(backend=BACKEND)
+
 
-# In-memory store for teacher comments
-if "teacher_comments" not in st.session_state:
-    st.session_state["teacher_comments"] = {}
+@st.cache_data(max_entries=512)
+def student_comments(student: str, number: int, version: tuple) -> pd.DataFrame:
+    """One page of a student's comments; ``version`` invalidates it on writes."""
+    from src.comments import comments_page
+
+    with COMMENTS_POOL.reader() as conn:
+        return comments_page(conn, student, number, COMMENTS_PAGE_SIZE)
+
+
+# Cached analytics stages survive reruns for the whole session
+if "pipeline" not in st.session_state:
+    st.session_state["pipeline"] = AnalyticsPipeline(compact=True, include_comments=False)
 
 # Simple authentication data
 USERS = {
@@ -123,18 +176,35 @@ with st.sidebar.expander("קריטריונים (סינון)"):
     significant_drop_default = int(SCHEMA["thresholds_default"]["significant_drop_points"])
     low_percentile_thr = st.number_input("אחוזון ארצי נמוך מ־", 0, 100, low_pct_default, 1)
     drop_thr = st.number_input("ירידה משמעותית (נק') בין סמסטרים", 0, 100, significant_drop_default, 1)
+    # thresholds of the other enabled flag_rules in schema.json
+    used = {c.threshold.lstrip("-") for r in FLAG_RULES for c in r.conditions if c.threshold}
+    extra_thresholds = {
+        name: st.number_input(SCHEMA.get("threshold_labels_he", {}).get(name, name), 0, 100, int(value), 1)
+        for name, value in SCHEMA["thresholds_default"].items()
+        if name in used and name not in ("low_percentile", "significant_drop_points")
+    }
 
 if role != "תלמיד":
     st.markdown("### 1) העלאת קובץ Excel (או שימוש בדוגמה)")
-    uploaded = st.file_uploader("בחר קובץ Excel (xlsx/xls)", type=["xlsx", "xls"])
-    if uploaded is None:
+    uploaded = st.file_uploader("בחר קובץ Excel (xlsx/xls) או CSV", type=["xlsx", "xls", "csv"])
+    if uploaded is not None:
+        st.session_state.pop("use_sample", None)
+    else:
         st.info("לא הועלה קובץ. לנסות דוגמה?")
         if st.button("השתמש בדוגמה המצורפת"):
-            uploaded = open("data/sample_class.xlsx", "rb")
+            st.session_state["use_sample"] = True
+        # kept across reruns, so the load button below still sees the sample
+        if st.session_state.get("use_sample"):
+            uploaded = io.BytesIO(SAMPLE_FILE.read_bytes())
+            uploaded.name = SAMPLE_FILE.name
 
     if uploaded:
+        # the column mapping code is needed only once a file is uploaded
+        from src.mapping import NO_COLUMN, header_fingerprint, resolve_mappings
+
         try:
-            df_raw = load_excel(uploaded)
+            # only the first rows are needed for the preview and the column mapping
+            df_raw = next(iter_batches(uploaded, batch_size=5), pd.DataFrame())
         except Exception as e:
             st.error(f"שגיאה בקריאת הקובץ: {e}")
             st.stop()
@@ -146,8 +216,15 @@ if role != "תלמיד":
         st.markdown("### 2) מיפוי עמודות (חד פעמי לכל קובץ)")
         st.write("התאם בין שמות העמודות בקובץ לבין שדות סטנדרטיים במערכת.")
 
+        # a layout confirmed before is pre-filled as is; otherwise the schema hints guess
+        fingerprint = header_fingerprint(df_raw.columns)
+        with POOL.reader() as conn:
+            suggested, source = resolve_mappings(df_raw.columns, lambda fp: BACKEND.load_mapping(conn, fp))
+        if source == "saved":
+            st.caption("נמצא מיפוי שמור עבור מבנה קובץ זה.")
+
         mappings: dict[str, str] = {}
-        columns = ["(ללא)"] + list(df_raw.columns)
+        columns = [NO_COLUMN] + [str(c) for c in df_raw.columns]
         col1, col2, col3 = st.columns(3)
         with col1:
             st.markdown("**שדה סטנדרטי**")
@@ -166,38 +243,115 @@ if role != "תלמיד":
                 text = f"{label_he_str} (חובה)" if required else label_he_str
                 st.write(text)
             with d3:
-                default_index = 0
-                for i, col in enumerate(columns[1:], start=1):
-                    if any(hint in str(col) for hint in c.get("examples", [])):
-                        default_index = i
-                        break
-                mappings[key] = st.selectbox("", columns, index=default_index, key=f"map_{key}")
+                default = suggested.get(key, NO_COLUMN)
+                default_index = columns.index(default) if default in columns else 0
+                mappings[key] = st.selectbox(
+                    "", columns, index=default_index, key=f"map_{fingerprint[:12]}_{key}"
+                )
 
         missing_required = [
             c["label_he"]
             for c in SCHEMA["canonical_fields"]
-            if c["required"] and mappings[c["key"]] == "(ללא)"
+            if c["required"] and mappings[c["key"]] == NO_COLUMN
         ]
         if missing_required:
             st.error("חסרות עמודות חובה: " + ", ".join(missing_required))
             st.stop()
 
-        df_norm = normalize_dataframe(df_raw, mappings)
-        insert_dataframe(df_norm, conn)
-        st.success("הנתונים נשמרו בבסיס הנתונים.")
+        # ingestion runs on the shared background worker; reruns only poll it
+        if st.button("טען לבסיס הנתונים"):
+            job = ingest_queue().submit(uploaded, mappings, name=getattr(uploaded, "name", None))
+            with POOL.writer() as conn:
+                BACKEND.save_mapping(conn, fingerprint, list(df_raw.columns), mappings)
+            st.session_state.setdefault("ingest_jobs", [])
+            if job.id not in st.session_state["ingest_jobs"]:
+                st.session_state["ingest_jobs"].append(job.id)
         st.markdown("---")
 
+
+def ingest_message(job) -> tuple[str, str]:
+    """Streamlit element name and text reporting a finished ingestion job."""
+    from src.ingest import DONE
+
+    stats = job.progress
+    if job.status == DONE and stats.already_ingested:
+        return "info", f"{job.name}: קובץ זה כבר נטען בעבר — לא נוספו רשומות."
+    if job.status == DONE:
+        return "success", (
+            f"{job.name}: הנתונים נשמרו בבסיס הנתונים: {stats.inserted} חדשות, "
+            f"{stats.updated} עודכנו, {stats.skipped} ללא שינוי "
+            f"({stats.rows_per_sec:,.0f} רשומות/שנייה)."
+        )
+    return "error", f"{job.name}: הטעינה נכשלה: {job.error}"
+
+
+@st.fragment(run_every=1)
+def ingest_progress() -> None:
+    """Poll this session's pending ingestion jobs without rerunning the whole page.
+
+    Rendered only while the session has pending jobs.  A finished job is
+    turned into a message, released from the shared queue and followed by
+    one full rerun, which refreshes the dashboards and stops the polling.
+    """
+    queue = ingest_queue()
+    pending = st.session_state["ingest_jobs"]
+    finished = False
+    for job_id in list(pending):
+        job = queue.get(job_id)
+        if job is None:
+            pending.remove(job_id)
+            continue
+        if job.active:
+            stats = job.progress
+            st.progress(
+                min(1.0, stats.batches / (stats.batches + 1)),
+                text=f"{job.name}: {stats.rows:,} רשומות ({stats.rows_per_sec:,.0f} רשומות/שנייה)",
+            )
+            continue
+        messages = st.session_state.setdefault("ingest_messages", [])
+        messages.insert(0, ingest_message(job))
+        del messages[INGEST_MESSAGES:]
+        pending.remove(job_id)
+        queue.release(job_id)
+        finished = True
+    if finished:
+        st.rerun()
+
+
+if role != "תלמיד":
+    for kind, text in st.session_state.get("ingest_messages", []):
+        getattr(st, kind)(text)
+    if st.session_state.get("ingest_jobs"):
+        ingest_progress()
+
 # Load data for viewing
 student_filter = user.get("student_name") if role == "תלמיד" else None
-df_db = load_records(conn, student_filter)
-
-if df_db.empty:
+if USE_PIPELINE:
+    with POOL.reader() as conn:
+        df, trend_fields = st.session_state["pipeline"].run(
+            conn, weights, low_percentile_thr, drop_thr, student_filter, extra_thresholds
+        )
+else:
+    # cohort ranks need every classmate, so a student's rows are picked after the analytics;
+    # Parquet records have no ids to fetch comments by later, so they are loaded with them
+    with POOL.reader() as conn:
+        df = BACKEND.load_records(conn, compact=True)
+    df = compute_overall_score(df, weights)
+    df, trend_fields = compute_trends(df, list(weights.keys()))
+    df = compute_cohort_ranks(df)
+    df = apply_flags(df, low_percentile_thr, drop_thr, trend_fields, extra_thresholds)
+    if student_filter is not None:
+        df = df[df["student_name"] == student_filter].reset_index(drop=True)
+
+if df.empty:
     st.info("אין נתונים להצגה.")
     st.stop()
 
-df = compute_overall_score(df_db, weights)
-df, trend_fields = compute_trends(df, list(weights.keys()))
-df = apply_flags(df, low_percentile_thr, drop_thr, trend_fields)
+# Per-student/per-semester aggregates maintained on insert (SQLite only)
+semesters_df = students_df = None
+if USE_PIPELINE:
+    with POOL.reader() as conn:
+        semesters_df, students_df = st.session_state["pipeline"].profile(conn, df, weights, student_filter)
 
 student = None
 sdf = pd.DataFrame()
@@ -208,13 +362,19 @@ if "student_name" in df.columns:
         student = st.selectbox(
             "בחר תלמיד/ה", sorted(df["student_name"].dropna().unique().tolist())
         )
-    sdf = df[df["student_name"] == student].copy()
+    sdf = df[df["student_name"] == student]
 
-tab_scores, tab_comments, tab_graphs = st.tabs(["📊 ציונים", "📝 הערות", "📈 גרפים"])
 
-with tab_scores:
+@profiling.instrument("render.scores")
+def render_scores() -> None:
+    """Class dashboard, filters, export and the selected student's profile."""
     st.markdown("### דשבורד כיתתי")
-    view_df = df.copy()
+    # filtering by reason reads the stored bitmask; no rule is re-evaluated
+    rule_labels = {r.id: r.label_he for r in FLAG_RULES}
+    selected_reasons = st.multiselect(
+        "סינון לפי סיבת סימון", list(rule_labels), format_func=rule_labels.get
+    )
+    sort_by = SORT_OPTIONS[st.selectbox("מיון", list(SORT_OPTIONS))]
     show_cols = [
         c
         for c in [
@@ -222,6 +382,8 @@ with tab_scores:
             "class_name",
             "semester",
             "overall_score",
+            "rank_overall_score",
+            "pct_overall_score",
             "quiz_avg",
             "quarter_exam",
             "midterm_mock",
@@ -229,70 +391,202 @@ with tab_scores:
             "national_percentile",
             "flagged",
         ]
-        if c in view_df.columns
+        if c in df.columns
     ]
+    # sort once (cached with the flags), then filter and page by row positions
+    if USE_PIPELINE:
+        order = st.session_state["pipeline"].sort_order(df, sort_by)
+    else:
+        order = sort_order(df, sort_by)
+    reasons = df[REASONS_COLUMN].to_numpy()
+    if selected_reasons:
+        order = order[(reasons[order] & rules_mask(selected_reasons, FLAG_RULES)) != 0]
+
+    p1, p2, p3 = st.columns([1, 1, 2])
+    with p1:
+        page_size = st.selectbox("שורות בעמוד", [25, 50, 100, 250], index=1)
+    n_pages = page_count(len(order), page_size)
+    with p2:
+        page_no = st.number_input("עמוד", 1, n_pages, 1, 1)
+    with p3:
+        first = (page_no - 1) * page_size
+        st.caption(f"שורות {min(first + 1, len(order)):,}–{min(first + page_size, len(order)):,} מתוך {len(order):,}")
+    page_df = page(df, order, page_no - 1, page_size)
     st.dataframe(
-        view_df[show_cols].sort_values(
-            by=[c for c in ["flagged", "overall_score"] if c in show_cols],
-            ascending=[False, False],
-        )
-    )
-    filtered = view_df[view_df["flagged"]] if "flagged" in view_df.columns else view_df
-    csv = filtered.to_csv(index=False).encode("utf-8-sig")
-    st.download_button(
-        "⬇️ הורד CSV מסונן (קריטריונים)",
-        data=csv,
-        file_name="filtered_students.csv",
-        mime="text/csv",
+        page_df[show_cols].assign(flag_reason_labels=reason_labels(page_df[REASONS_COLUMN], FLAG_RULES)),
+        hide_index=True,
     )
+
+    # The export is built only on request and encoded chunk by chunk, which
+    # avoids a full to_csv copy of the frame; download_button still holds the
+    # whole file in memory, as Streamlit serves it from an in-memory buffer.
+    if st.button("הכן CSV מסונן (קריטריונים)"):
+        flagged_rows = order[reasons[order] != 0]
+        derived = {"flag_reason_labels": lambda chunk: reason_labels(chunk[REASONS_COLUMN], FLAG_RULES)}
+        if "id" in df.columns and len(flagged_rows):
+            # the dashboard frame leaves the comment fields out; fetch them for the exported rows
+            names = df["student_name"].iloc[flagged_rows].dropna().unique().tolist()
+            with POOL.reader() as conn:
+                comments = BACKEND.load_comments(conn, names).set_index("id")
+            for field in comments.columns.drop("student_name"):
+                derived[field] = lambda chunk, field=field: comments[field].reindex(chunk["id"].to_numpy()).to_numpy()
+        export = io.BytesIO()
+        write_csv(export, df, flagged_rows, derived=derived)
+        st.download_button(
+            "⬇️ הורד CSV מסונן (קריטריונים)",
+            data=export.getvalue(),
+            file_name="filtered_students.csv",
+            mime="text/csv",
+        )
+    if USE_PIPELINE and role != "תלמיד":
+        with st.expander("דוחות אישיים לכל התלמידים (ZIP)"):
+            from src.reports import REPORT_FORMATS, export_reports
+
+            formats = st.multiselect("פורמטים", REPORT_FORMATS, default=["html", "csv"])
+            if formats and st.button("הכן דוחות"):
+                # download_button serves bytes held in memory, so the archive is built there too
+                archive = io.BytesIO()
+                total = max(df["student_name"].nunique(), 1)
+                bar = st.progress(0.0)
+
+                def report_progress(stats) -> None:
+                    bar.progress(
+                        min(1.0, stats.students / total),
+                        text=f"{stats.students:,}/{total:,} תלמידים ({stats.students_per_sec:,.0f} לשנייה)",
+                    )
+
+                with POOL.reader() as conn:
+                    stats = export_reports(conn, archive, df, formats, progress=report_progress)
+                st.caption(
+                    f"{stats.files:,} קבצים ל-{stats.students:,} תלמידים ב-{stats.seconds:.1f} שניות "
+                    f"({stats.rows_per_sec:,.0f} רשומות/שנייה)"
+                )
+                st.download_button("⬇️ הורד דוחות", data=archive.getvalue(), file_name="student_reports.zip", mime="application/zip")
+    if students_df is not None and not students_df.empty:
+        with st.expander("סיכום לפי תלמיד"):
+            students_view = filter_by_reasons(students_df, selected_reasons) if selected_reasons else students_df
+            st.dataframe(
+                students_view.assign(flag_reason_labels=reason_labels(students_view[REASONS_COLUMN]))
+                .sort_values(["flagged", "latest_overall_score"], ascending=[False, False]),
+                hide_index=True,
+            )
     if not sdf.empty:
         st.markdown("---")
         st.subheader("פרופיל תלמיד")
+        if semesters_df is not None:
+            st.dataframe(semesters_df[semesters_df["student_name"] == student], hide_index=True)
         with st.expander("רשומות תלמיד (לפי סמסטר/אירוע)"):
             st.dataframe(sdf)
 
-with tab_comments:
+
+@profiling.instrument("render.comments")
+def render_comments() -> None:
+    """Comment search and the selected student's paginated comments."""
+    from src.comments import IMPORT_AUTHOR, Comment, add_comments, comments_version, search_comments
+
     st.subheader("הערות")
+    if role != "תלמיד":
+        search = st.text_input("חיפוש בכל ההערות", placeholder="מילה או חלק ממילה")
+        if search.strip():
+            with COMMENTS_POOL.reader() as conn:
+                hits = search_comments(conn, search, limit=100)
+            st.caption(f"{len(hits)} תוצאות")
+            st.dataframe(hits[["student_name", "author", "created_at", "snippet"]], hide_index=True)
     if sdf.empty:
         st.info("אין נתונים עבור תלמיד/ה זה.")
     else:
-        comments_store = st.session_state["teacher_comments"]
-        base_comments = []
-        if "teacher_comment" in sdf.columns:
-            base_comments = [str(x) for x in sdf["teacher_comment"].dropna().unique().tolist()]
-        comments_store.setdefault(student, [])
         key_new = f"new_comment_{student}"
-        if key_new not in st.session_state:
-            st.session_state[key_new] = ""
         if role == "מורה":
-            new_comment = st.text_area("הוסף הערה חדשה", key=key_new)
+            st.text_area("הוסף הערה חדשה", key=key_new)
             if st.button("שמור הערה", key=f"save_comment_{student}"):
                 comment = st.session_state.get(key_new, "").strip()
                 if comment:
-                    comments_store[student].append(comment)
+                    with COMMENTS_POOL.writer() as conn:
+                        add_comments(conn, [Comment(student, user["username"], comment)])
                     st.session_state.pop(key_new)
-                    st.experimental_rerun()
-        all_comments = base_comments + comments_store.get(student, [])
-        if all_comments:
-            for c in all_comments:
-                st.write(c)
+                    st.rerun()
+        with COMMENTS_POOL.reader() as conn:
+            version = comments_version(conn, student)
+        if version.count:
+            n_pages = page_count(version.count, COMMENTS_PAGE_SIZE)
+            page_no = st.number_input("עמוד", 1, n_pages, 1, 1, key=f"comments_page_{student}") if n_pages > 1 else 1
+            for c in student_comments(student, page_no - 1, version).itertuples():
+                author = "קובץ" if c.author == IMPORT_AUTHOR else c.author
+                st.markdown(f"**{author}** · {c.created_at}" + (" · הערכת הרכז" if c.kind == "coordinator" else ""))
+                st.write(c.body)
         else:
             st.write("אין הערות שמורות.")
-        if "coordinator_comment" in sdf.columns:
-            with st.expander("הערכת הרכז"):
-                st.write(" \n".join([str(x) for x in sdf["coordinator_comment"].dropna().unique().tolist()]))
-
-with tab_graphs:
+        if not USE_PIPELINE:
+            # the Parquet store keeps the comments of uploaded files on the records
+            with POOL.reader() as store:
+                file_comments = BACKEND.load_comments(store, student)
+            for field in ("teacher_comment", "coordinator_comment"):
+                if field in file_comments.columns:
+                    for text in file_comments[field].dropna().unique().tolist():
+                        st.write(str(text))
+
+
+def render_timeline() -> None:
+    """All chart metrics of the selected student by date, resampled, in one chart."""
+    if USE_PIPELINE:
+        series = st.session_state["pipeline"].series(df, CHART_METRICS)
+    else:
+        from src.timeseries import build_series
+
+        series = build_series(df, CHART_METRICS)
+    bounds = series.date_range(student)
+    if bounds is None:
+        st.info("אין תאריכים לרשומות של תלמיד/ה זה.")
+        return
+    first, last = (pd.Timestamp(d).date() for d in bounds)
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        freq = TIMELINE_FREQUENCIES[st.selectbox("תדירות", list(TIMELINE_FREQUENCIES), index=2)]
+    with c2:
+        start, end = (first, last) if first == last else st.slider("טווח תאריכים", first, last, (first, last))
+    chart = series.resample(student, freq, start, end)
+    st.line_chart(chart.rename(columns={m: CANON[m]["label_he"] for m in chart.columns}))
+
+
+@profiling.instrument("render.graphs")
+def render_graphs() -> None:
+    """Per-metric charts of the selected student across semesters or over time."""
     st.subheader("גרפים")
     if sdf.empty:
         st.info("אין נתונים עבור תלמיד/ה זה.")
+    elif "date" in df.columns and st.radio("ציר", ["לפי סמסטר", "ציר זמן"], horizontal=True) == "ציר זמן":
+        render_timeline()
+    elif semesters_df is not None:
+        student_semesters = semesters_df[semesters_df["student_name"] == student].set_index("semester")
+        for metric in ["quiz_avg", "quarter_exam", "midterm_mock", "half_semester_final"]:
+            if metric in student_semesters.columns:
+                with st.expander(f"מדד: {CANON[metric]['label_he']}"):
+                    st.line_chart(student_semesters[[metric]])
     elif "semester" in sdf.columns:
         for metric in ["quiz_avg", "quarter_exam", "midterm_mock", "half_semester_final"]:
             if metric in sdf.columns:
                 with st.expander(f"מדד: {CANON[metric]['label_he']}"):
                     try:
-                        pivot_m = sdf.pivot_table(index="semester", values=metric, aggfunc="mean").reset_index()
+                        pivot_m = sdf.pivot_table(
+                            index="semester", values=metric, aggfunc="mean", observed=True
+                        ).reset_index()
                         pivot_m = pivot_m.sort_values("semester")
                         st.line_chart(pivot_m.set_index("semester"))
                     except Exception as e:
                         st.info(f"לא ניתן להציג גרף ל-{metric}: {e}")
+
+
+# Only the selected view runs on a rerun; the others' queries and imports are skipped
+VIEWS = {"📊 ציונים": render_scores, "📝 הערות": render_comments, "📈 גרפים": render_graphs}
+VIEWS[st.radio("תצוגה", list(VIEWS), horizontal=True, label_visibility="collapsed")]()
+
+# Timings of this process, collected only when STUDENT_ANALYTICS_PROFILE is set
+if profiling.enabled():
+    with st.sidebar.expander("🛠️ Debug: profiling"):
+        stats = profiling.snapshot()
+        if stats:
+            st.dataframe(pd.DataFrame.from_dict(stats, orient="index"))
+        st.download_button("JSON", profiling.to_json(), file_name="profile.json", mime="application/json")
+        st.download_button("Prometheus", profiling.to_prometheus(), file_name="profile.prom", mime="text/plain")
+        if st.button("איפוס מדידות"):
+            profiling.reset()
@@ -0,0 +1,13 @@
+import pytest
+
+from src import flags
+from src.schema import load_schema
+
+
+@pytest.fixture
+def all_flag_rules(monkeypatch):
+    """Enable every rule of ``schema.json``, including those shipped disabled."""
+    schema = load_schema()
+    rules = flags.compile_rules({**schema, "flag_rules": [{**r, "enabled": True} for r in schema["flag_rules"]]})
+    monkeypatch.setattr(flags, "_default_rules", lambda: rules)
+    return rules
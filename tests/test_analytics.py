@@ -6,6 +6,7 @@ from src.analytics import (
     compute_trends,
     apply_flags,
     compute_overall_score,
+    compute_overall_scores_batch,
 )
 
 
@@ -70,3 +71,37 @@ def test_compute_overall_score_missing_and_empty():
     assert result["overall_score"].iloc[0] == pytest.approx(40.0)
     empty = compute_overall_score(pd.DataFrame(), weights)
     assert empty.empty
+
+
+def test_compute_overall_score_non_numeric_cells():
+    df = pd.DataFrame({"quiz_avg": ["80", "n/a", None], "quarter_exam": [90, 70, float("nan")]})
+    weights = normalize_weights({"quiz_avg": 0.5, "quarter_exam": 0.5})
+    result = compute_overall_score(df.copy(), weights)
+    assert result["overall_score"].tolist() == pytest.approx([85.0, 35.0, 0.0])
+
+
+def test_compute_overall_score_keeps_infinities():
+    df = pd.DataFrame({"quiz_avg": [float("inf"), float("-inf"), None], "quarter_exam": [1.0, 1.0, 1.0]})
+    out = compute_overall_score(df, {"quiz_avg": 0.5, "quarter_exam": 0.5})
+    assert out["overall_score"].tolist() == [float("inf"), float("-inf"), 0.5]
+
+    # each weight set only sees its own fields' infinities
+    sweep = compute_overall_scores_batch(
+        pd.DataFrame({"quiz_avg": [float("inf"), 80.0], "quarter_exam": [90.0, 70.0]}),
+        [{"quiz_avg": 1.0}, {"quarter_exam": 1.0}, {"quiz_avg": 0.5, "quarter_exam": 0.5}],
+    )
+    assert sweep.tolist() == [[float("inf"), 90.0, float("inf")], [80.0, 70.0, 75.0]]
+
+
+def test_compute_overall_scores_batch():
+    df = pd.DataFrame({"quiz_avg": [80, 60], "quarter_exam": [90, 100]})
+    weight_sets = [
+        {"quiz_avg": 1.0},
+        {"quiz_avg": 0.5, "quarter_exam": 0.5},
+        {"quarter_exam": 1.0, "midterm_mock": 3.0},
+    ]
+    scores = compute_overall_scores_batch(df, weight_sets)
+    assert scores.shape == (2, 3)
+    assert scores[:, 0].tolist() == pytest.approx([80.0, 60.0])
+    assert scores[:, 1].tolist() == pytest.approx([85.0, 80.0])
+    assert scores[:, 2].tolist() == pytest.approx([90.0, 100.0])
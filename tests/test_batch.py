@@ -0,0 +1,105 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.batch import find_inputs, format_summary, load_profile, main, run_batch
+from src.db import init_db, load_records
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    src = tmp_path / "in"
+    src.mkdir()
+    for cls in ("1", "2"):
+        pd.DataFrame(
+            {
+                "שם": ["A", "A", "B", "B"],
+                "כיתה": [cls] * 4,
+                "מחצית": ["א", "ב", "א", "ב"],
+                "בחנים": [90, 60, 50, 55],
+                "אחוזון": [80, 80, 5, 10],
+            }
+        ).to_csv(src / f"class{cls}.csv", index=False)
+    (src / "notes.txt").write_text("ignored")
+    profile = tmp_path / "profile.json"
+    profile.write_text(
+        json.dumps(
+            {
+                "mappings": {
+                    "student_name": "שם",
+                    "class_name": "כיתה",
+                    "semester": "מחצית",
+                    "quiz_avg": "בחנים",
+                    "national_percentile": "אחוזון",
+                },
+                "weights": {"quiz_avg": 1},
+                "thresholds": {"significant_drop_points": 20},
+            },
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    return src, profile
+
+
+def test_load_profile_fills_schema_defaults(workbooks):
+    _, path = workbooks
+    profile = load_profile(path)
+    assert profile.weights == {"quiz_avg": 1.0}
+    assert profile.significant_drop_points == 20
+    assert profile.low_percentile == 25  # from schema.json
+
+    assert load_profile().mappings == {}
+    bad = path.with_name("bad.json")
+    bad.write_text('{"mappings": ["שם"]}')
+    with pytest.raises(ValueError):
+        load_profile(bad)
+
+
+def test_run_batch_writes_scored_outputs_and_db(workbooks, tmp_path):
+    src, profile_path = workbooks
+    inputs = find_inputs([str(src)])
+    assert [p.name for p in inputs] == ["class1.csv", "class2.csv"]
+
+    results = run_batch(inputs, load_profile(profile_path), tmp_path / "out", workers=1, db_path=tmp_path / "x.db")
+    assert all(r.error is None for r in results)
+    out = pd.read_csv(tmp_path / "out" / "class1.csv")
+    assert {"overall_score", "delta_quiz_avg", "flagged"} <= set(out.columns)
+    # A dropped 30 points, B is below the percentile threshold
+    assert out["flagged"].all()
+    assert sum(r.flagged for r in results) == 8
+    assert "2/2 files, 8 rows" in format_summary(results)
+
+    conn = init_db(tmp_path / "x.db")
+    assert len(load_records(conn)) == 8
+    conn.close()
+
+
+def test_run_batch_maps_headers_without_profile(workbooks, tmp_path):
+    src, _ = workbooks
+    results = run_batch(find_inputs([str(src)]), load_profile(), tmp_path / "out", workers=1)
+    assert [r.mapping for r in results] == ["auto", "auto"]
+    out = pd.read_csv(tmp_path / "out" / "class2.csv")
+    assert {"student_name", "semester", "quiz_avg", "national_percentile"} <= set(out.columns)
+
+
+def test_main_reports_failures(workbooks, tmp_path, capsys):
+    src, profile_path = workbooks
+    (src / "broken.csv").write_text("other\n1\n")
+    summary = tmp_path / "summary.json"
+    code = main([str(src / "*.csv"), "--profile", str(profile_path), "--out", str(tmp_path / "out"), "--workers", "1", "--summary", str(summary)])
+    assert code == 1
+    assert "FAILED" in capsys.readouterr().out
+    assert len(json.loads(summary.read_text(encoding="utf-8"))) == 3
+
+
+def test_import_does_not_load_streamlit_or_pandas():
+    code = "import sys, src.batch; print('streamlit' in sys.modules, 'pandas' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["False", "False"]
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from benchmarks.run import compare, run_benchmarks
+from benchmarks.startup import cold_import, format_table
+from benchmarks.synthetic import generate_records, raw_export
+from src.data_loader import normalize_dataframe, numeric_keys
+from src.schema import canonical_map
+
+
+def test_generate_records_is_schema_conformant():
+    df = generate_records(500, n_students=50, n_semesters=3, missing_ratio=0.1, seed=1)
+    assert list(df.columns) == list(canonical_map())
+    assert df["student_name"].nunique() == 50
+    assert set(df["semester"]) == {"א", "ב", "ג"}
+    assert not df.duplicated(["student_name", "date"]).any()
+    missing = df[numeric_keys].isna().to_numpy().mean()
+    assert 0.05 < missing < 0.15
+    pd.testing.assert_frame_equal(generate_records(500, n_students=50, n_semesters=3, seed=1).iloc[:, :4], df.iloc[:, :4])
+
+
+def test_raw_export_roundtrips_through_normalize():
+    df = generate_records(20)
+    raw, mappings = raw_export(df)
+    pd.testing.assert_frame_equal(normalize_dataframe(raw, mappings), df)
+
+
+def test_run_benchmarks_and_compare():
+    results = run_benchmarks(200, trace_memory=False)
+    assert set(results) == {"normalize", "insert", "load", "score", "trends", "flags"}
+    assert all(r["rows_per_sec"] > 0 for r in results.values())
+    slower = {"score": {**results["score"], "rows_per_sec": results["score"]["rows_per_sec"] / 2}}
+    assert compare({"200": slower}, {"200": results}, tolerance=0.25)
+    assert not compare({"200": results}, {"200": results}, tolerance=0.25)
+
+
+def test_cold_import_and_table():
+    result = cold_import(("src.schema",), repeats=1)
+    assert result["median_s"] >= result["min_s"] > 0
+    table = format_table({"cold_import": result, "app_rerun": None})
+    assert "cold_import" in table and "skipped" in table
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from src.comments import (
+    IMPORT_AUTHOR,
+    Comment,
+    add_comments,
+    comments_page,
+    comments_version,
+    fts_available,
+    fts_query,
+    search_comments,
+)
+from src.db import init_db, insert_dataframe
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "test.db")
+    yield conn
+    conn.close()
+
+
+def test_add_and_page_newest_first(conn):
+    written = add_comments(
+        conn,
+        [Comment("A", "teacher", f"הערה {i}", created_at=f"2025-01-{i + 1:02d}") for i in range(5)]
+        + [Comment("B", "teacher", "אחר"), Comment("A", "teacher", "   ")],
+    )
+    assert written == 6
+    assert comments_version(conn, "A") == (5, 5)
+    first = comments_page(conn, "A", 0, 2)
+    assert first["body"].tolist() == ["הערה 4", "הערה 3"]
+    assert comments_page(conn, "A", 2, 2)["body"].tolist() == ["הערה 0"]
+    with pytest.raises(ValueError):
+        add_comments(conn, [Comment("A", "", "x")])
+
+
+def test_record_comments_are_imported_once_and_updated(conn):
+    df = pd.DataFrame(
+        {
+            "student_name": ["A", "B"],
+            "semester": ["א", "א"],
+            "date": ["2025-01-01", "2025-01-02"],
+            "teacher_comment": ["עבודה טובה", None],
+            "coordinator_comment": [None, "לזמן להורים"],
+        }
+    )
+    insert_dataframe(df, conn)
+    insert_dataframe(df, conn)
+    rows = conn.execute("SELECT student_name, kind, author, body FROM comments ORDER BY id").fetchall()
+    assert rows == [("A", "teacher", IMPORT_AUTHOR, "עבודה טובה"), ("B", "coordinator", IMPORT_AUTHOR, "לזמן להורים")]
+
+    insert_dataframe(df.assign(teacher_comment=["עבודה מצוינת", None]), conn)
+    assert comments_page(conn, "A", kind="teacher")["body"].tolist() == ["עבודה מצוינת"]
+    assert search_comments(conn, "טובה").empty
+
+
+def test_existing_records_are_backfilled(tmp_path):
+    conn = init_db(tmp_path / "legacy.db")
+    insert_dataframe(pd.DataFrame({"student_name": ["A"], "teacher_comment": ["ישן"]}), conn)
+    conn.execute("DROP TABLE comments")
+    conn.execute("DROP TABLE comments_fts")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    conn = init_db(tmp_path / "legacy.db")
+    assert comments_page(conn, "A")["body"].tolist() == ["ישן"]
+    conn.close()
+
+
+def test_full_text_search(conn):
+    assert fts_available(conn)
+    add_comments(
+        conn,
+        [
+            Comment("A", "dana", "שיפור ניכר במתמטיקה"),
+            Comment("B", "dana", "צריך חיזוק במתמטיקה ובאנגלית"),
+            Comment("B", "avi", "homework_missing twice"),
+        ],
+    )
+    hits = search_comments(conn, "מתמטי")
+    assert sorted(hits["student_name"]) == ["A", "B"]
+    assert "**" in hits["snippet"].iloc[0]
+    assert search_comments(conn, "מתמטיקה", student_name="A")["student_name"].tolist() == ["A"]
+    assert search_comments(conn, 'homework_missing OR "')["author"].tolist() == ["avi"]
+    assert search_comments(conn, "  ").empty
+    assert fts_query('abc OR b"') == '"abc"'
@@ -1,7 +1,12 @@
 import pandas as pd
 import pytest
 
-from src.data_loader import load_excel, map_columns, normalize_dataframe
+from src.data_loader import (
+    iter_batches,
+    load_excel,
+    map_columns,
+    normalize_dataframe,
+)
 
 
 def test_load_excel_sample():
@@ -25,3 +30,21 @@ def test_map_columns_and_normalize():
     mappings2 = {"quiz_avg": "Quiz"}
     norm2 = normalize_dataframe(df_raw2, mappings2)
     assert pd.isna(norm2["quiz_avg"].iloc[0])
+
+
+def test_iter_batches_excel_matches_full_read():
+    full = load_excel("data/sample_class.xlsx")
+    batches = list(iter_batches("data/sample_class.xlsx", batch_size=4))
+    assert [len(b) for b in batches] == [4, len(full) - 4]
+    streamed = pd.concat(batches, ignore_index=True)
+    assert list(streamed.columns) == list(full.columns)
+    pd.testing.assert_frame_equal(streamed, full, check_dtype=False)
+
+
+def test_iter_batches_csv(tmp_path):
+    path = tmp_path / "grades.csv"
+    pd.DataFrame({"Name": list("ABCDE"), "Quiz": range(5)}).to_csv(path, index=False)
+    batches = list(iter_batches(path, batch_size=2))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    with pytest.raises(ValueError):
+        list(iter_batches(path, batch_size=0))
@@ -0,0 +1,169 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from src.analytics import compute_trend_deltas, trend_deltas_from_means
+from src.db import data_version, get_pool, init_db, insert_dataframe, query_records, semester_means
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "test.db")
+    insert_dataframe(
+        pd.DataFrame(
+            {
+                "student_name": ["A", "A", "A", "B", "B", "C"],
+                "class_name": ["1", "1", "1", "1", "1", "2"],
+                "semester": ["א", "א", "ב", "א", "ב", "א"],
+                "date": ["2024-10-01", "2024-12-01", "2025-03-01", "2024-10-01", "2025-03-01", "2024-10-01"],
+                "quiz_avg": [70, 90, 60, 50, 65, 100],
+            }
+        ),
+        conn,
+    )
+    yield conn
+    conn.close()
+
+
+def test_init_db_creates_indexes(conn):
+    names = {row[1] for row in conn.execute("PRAGMA index_list(records)")}
+    for col in ["student_name", "class_name", "semester", "date"]:
+        assert f"idx_records_{col}" in names
+
+
+def test_query_records_projection_filters_and_pages(conn):
+    df = query_records(conn, columns=["student_name", "quiz_avg"], class_name="1", semester="א")
+    assert list(df.columns) == ["student_name", "quiz_avg"]
+    assert df["student_name"].tolist() == ["A", "A", "B"]
+
+    page = query_records(conn, columns=["quiz_avg"], order_by=["-quiz_avg"], limit=2, offset=1)
+    assert page["quiz_avg"].tolist() == [90, 70]
+
+    assert query_records(conn, student_name=["B", "C"])["student_name"].tolist() == ["B", "B", "C"]
+    with pytest.raises(ValueError):
+        query_records(conn, columns=["id; DROP TABLE records"])
+
+
+def test_semester_means_pushdown_matches_pandas(conn):
+    means = semester_means(conn, ["quiz_avg"], class_name="1")
+    assert means[["student_name", "semester"]].values.tolist() == [["A", "א"], ["A", "ב"], ["B", "א"], ["B", "ב"]]
+    assert means["quiz_avg"].tolist() == [80, 60, 50, 65]
+
+    pushed = trend_deltas_from_means(semester_means(conn, ["quiz_avg"]), ["quiz_avg"])
+    local, _ = compute_trend_deltas(query_records(conn), ["quiz_avg"])
+    pd.testing.assert_frame_equal(pushed, local)
+
+
+def test_insert_dataframe_upserts_on_natural_key(conn):
+    version = data_version(conn)
+    batch = pd.DataFrame(
+        {
+            "student_name": ["A", "B", "D"],
+            "class_name": ["1", "1", "2"],
+            "semester": ["א", "ב", "א"],
+            "date": ["2024-10-01", "2025-03-01", None],
+            "quiz_avg": [75, 65, 88],
+        }
+    )
+    result = insert_dataframe(batch, conn)
+    assert (result.inserted, result.updated, result.skipped) == (1, 1, 1)
+    assert len(query_records(conn)) == 7
+    assert query_records(conn, student_name="A", order_by=["date"])["quiz_avg"].iloc[0] == 75
+    assert data_version(conn).revision == version.revision + 1
+
+    again = insert_dataframe(batch, conn)
+    assert (again.inserted, again.updated, again.skipped) == (0, 0, 3)
+
+
+def test_insert_dataframe_skips_ingested_hash(conn):
+    batch = pd.DataFrame({"student_name": ["E"], "quiz_avg": [50]})
+    assert insert_dataframe(batch, conn, content_hash="abc").inserted == 1
+    repeat = insert_dataframe(batch.assign(quiz_avg=[60]), conn, content_hash="abc")
+    assert repeat.already_ingested and repeat.skipped == 1
+    assert query_records(conn, student_name="E")["quiz_avg"].tolist() == [50]
+
+
+def test_init_db_sets_legacy_duplicates_aside(tmp_path, caplog):
+    path = tmp_path / "legacy.db"
+    legacy = init_db(path)
+    legacy.execute("DROP INDEX ux_records_natural_key")
+    legacy.execute("PRAGMA user_version = 0")
+    legacy.executemany("INSERT INTO records (student_name, quiz_avg) VALUES (?, ?)", [("A", 1), ("A", 2), ("B", 3)])
+    legacy.commit()
+    legacy.close()
+    with caplog.at_level("WARNING", logger="src.db"):
+        conn = init_db(path)
+    assert query_records(conn, columns=["student_name", "quiz_avg"]).values.tolist() == [["A", 2.0], ["B", 3.0]]
+    moved = conn.execute("SELECT student_name, quiz_avg, moved_at FROM records_duplicates").fetchall()
+    assert [row[:2] for row in moved] == [("A", 1.0)] and moved[0][2]
+    assert "moved 1 duplicate record" in caplog.text
+    conn.close()
+
+
+def test_load_records_compact_without_comments(conn):
+    from src.db import load_comments, load_records
+
+    insert_dataframe(pd.DataFrame({"student_name": ["A"], "date": ["2025-06-01"], "teacher_comment": ["טוב"]}), conn)
+    full = load_records(conn)
+    compact = load_records(conn, compact=True, include_comments=False)
+    assert "teacher_comment" not in compact.columns
+    assert isinstance(compact["student_name"].dtype, pd.CategoricalDtype)
+    assert compact["quiz_avg"].dtype == "float32"
+    assert compact["student_name"].astype(object).tolist() == full["student_name"].tolist()
+    assert compact.memory_usage(deep=True).sum() < full.memory_usage(deep=True).sum()
+    comments = load_comments(conn, "A")
+    assert comments["teacher_comment"].dropna().tolist() == ["טוב"]
+    # joined back by record id, as the flagged-rows CSV export does
+    joined = load_comments(conn, ["A", "B"]).set_index("id")["teacher_comment"].reindex(compact["id"].to_numpy())
+    assert joined.fillna("").tolist() == full["teacher_comment"].where(full["student_name"].isin(["A", "B"]), "").fillna("").tolist()
+
+
+def test_iter_records_streams_by_student(conn):
+    from src.db import iter_records, load_records
+
+    chunks = list(iter_records(conn, order_by=("student_name", "id"), chunksize=4))
+    assert [len(c) for c in chunks] == [4, 2]
+    assert chunks[0]["quiz_avg"].dtype == "float32"
+    streamed = pd.concat(chunks, ignore_index=True)
+    assert streamed["student_name"].astype(object).tolist() == ["A", "A", "A", "B", "B", "C"]
+    assert sorted(streamed["id"]) == sorted(load_records(conn)["id"])
+
+
+def test_init_db_runs_ddl_once(tmp_path):
+    path = tmp_path / "once.db"
+    conn = init_db(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] != 0
+    conn.execute("DROP INDEX idx_records_date")
+    conn.close()
+    # an up-to-date database is opened without re-running the DDL
+    conn = init_db(path)
+    names = {row[1] for row in conn.execute("PRAGMA index_list(records)")}
+    assert "idx_records_date" not in names
+    conn.close()
+
+
+def test_pool_readers_and_writer(tmp_path):
+    path = tmp_path / "pool.db"
+    pool = get_pool(path)
+    assert get_pool(str(path)) is pool
+    with pool.writer() as conn:
+        insert_dataframe(pd.DataFrame({"student_name": ["A", "B"], "quiz_avg": [1, 2]}), conn)
+
+    with pool.reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM records")
+        before = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        with pool.writer() as writer:
+            insert_dataframe(pd.DataFrame({"student_name": ["C"], "quiz_avg": [3]}), writer)
+        # one snapshot per reader block
+        assert conn.execute("SELECT COUNT(*) FROM records").fetchone()[0] == before == 2
+
+    def count(_):
+        with pool.reader() as conn:
+            return conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        assert set(executor.map(count, range(64))) == {3}
+    pool.close()
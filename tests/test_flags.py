@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import apply_flags
+from src.flags import (
+    REASONS_COLUMN,
+    compile_rules,
+    evaluate_rules,
+    filter_by_reasons,
+    reason_labels,
+    rules_mask,
+    student_reasons,
+)
+
+RULES = compile_rules(
+    {
+        "flag_rules": [
+            {"id": "low", "label_he": "נמוך", "any": [{"field": "national_percentile", "op": "<", "threshold": "low"}]},
+            {"id": "drop", "label_he": "ירידה", "any": [{"field": "delta_*", "op": "<=", "threshold": "-drop"}]},
+            {
+                "id": "combo",
+                "label_he": "משולב",
+                "all": [
+                    {"field": "overall_score", "op": "<", "value": 60},
+                    {"field": "homework_rate", "op": "<", "threshold": "hw"},
+                ],
+            },
+        ]
+    }
+)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "student_name": ["A", "A", "B", "C"],
+            "national_percentile": [10, 50, np.nan, 80],
+            "delta_quiz_avg": [-20, -20, 5, np.nan],
+            "delta_quarter_exam": [np.nan, np.nan, -12, 0],
+            "overall_score": [50, 70, 55, 40],
+            "homework_rate": [90, 40, 40, np.nan],
+        },
+        index=[10, 11, 12, 13],
+    )
+
+
+def test_evaluate_rules_bitmask(df):
+    reasons = evaluate_rules(df, {"low": 25, "drop": 10, "hw": 60}, rules=RULES)
+    assert reasons.tolist() == [0b011, 0b010, 0b110, 0]
+    # delta_* limited to the trend fields
+    only_quiz = evaluate_rules(df, {"low": 25, "drop": 10, "hw": 60}, trend_fields=["quiz_avg"], rules=RULES)
+    assert only_quiz.tolist() == [0b011, 0b010, 0b100, 0]
+    with pytest.raises(ValueError):
+        evaluate_rules(df, {"low": 25}, rules=RULES)
+
+
+def test_reason_helpers(df):
+    df[REASONS_COLUMN] = evaluate_rules(df, {"low": 25, "drop": 10, "hw": 60}, rules=RULES)
+    assert rules_mask(["low", "combo"], RULES) == 0b101
+    assert filter_by_reasons(df, ["combo"], RULES).index.tolist() == [12]
+    assert reason_labels(df[REASONS_COLUMN], RULES).tolist() == ["נמוך, ירידה", "ירידה", "ירידה, משולב", ""]
+    per_student = student_reasons(df).set_index("student_name")[REASONS_COLUMN]
+    assert per_student.to_dict() == {"A": 0b011, "B": 0b110, "C": 0}
+
+
+def test_compile_rules_skips_disabled_rules_but_keeps_their_bit():
+    schema = {"flag_rules": [{"id": r.id, "any": [{"field": "x", "op": "<", "value": 1}]} for r in RULES]}
+    schema["flag_rules"][1]["enabled"] = False
+    assert [(r.id, r.bit) for r in compile_rules(schema)] == [("low", 0), ("combo", 2)]
+
+
+def test_compile_rules_validation():
+    with pytest.raises(ValueError):
+        compile_rules({"flag_rules": [{"id": "x", "any": [{"field": "a", "op": "~", "value": 1}]}]})
+    with pytest.raises(ValueError):
+        compile_rules({"flag_rules": [{"id": "x", "any": [{"field": "a", "op": "<"}]}]})
+    with pytest.raises(ValueError):
+        compile_rules({"flag_rules": [{"id": "x", "any": [], "all": []}]})
+
+
+def test_apply_flags_keeps_index_and_uses_schema_rules(df):
+    out = apply_flags(df.drop(columns="overall_score"), low_percentile_thr=25, drop_thr=10, trend_fields=["quiz_avg"])
+    assert out.index.tolist() == [10, 11, 12, 13]
+    # the homework and class-percentile rules ship disabled
+    assert [r.id for r in compile_rules()] == ["low_percentile", "significant_drop"]
+    assert out["flagged"].tolist() == [True, True, False, False]
+
+
+def test_apply_flags_with_every_schema_rule_enabled(df, all_flag_rules):
+    out = apply_flags(df.drop(columns="overall_score"), low_percentile_thr=25, drop_thr=10, trend_fields=["quiz_avg"])
+    assert out["flagged"].tolist() == [True, True, True, False]
+    # B is flagged only for homework below the schema's low_homework_rate
+    assert reason_labels(out[REASONS_COLUMN])[2] == "הגשת שיעורי בית נמוכה"
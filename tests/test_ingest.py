@@ -0,0 +1,108 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src.db import get_pool, init_db, load_mapping, load_records, save_mapping
+from src.ingest import DONE, FAILED, IngestQueue, ingest_file
+
+
+def test_ingest_file_streams_batches(tmp_path):
+    path = tmp_path / "grades.csv"
+    pd.DataFrame(
+        {"Name": [f"S{i}" for i in range(7)], "Quiz": ["90", "x", 70, 60, 50, 40, 30]}
+    ).to_csv(path, index=False)
+    conn = init_db(tmp_path / "test.db")
+    seen = []
+    stats = ingest_file(path, {"student_name": "Name", "quiz_avg": "Quiz"}, conn, batch_size=3, progress=seen.append)
+    assert stats.rows == 7 and stats.batches == 3
+    assert len(seen) == 3 and stats.rows_per_sec > 0
+    records = load_records(conn)
+    assert len(records) == 7
+    assert records["quiz_avg"].iloc[0] == 90
+    assert pd.isna(records["quiz_avg"].iloc[1])
+
+    again = ingest_file(path, {"student_name": "Name", "quiz_avg": "Quiz"}, conn)
+    assert again.already_ingested and again.rows == 0
+    assert len(load_records(conn)) == 7
+    conn.close()
+
+
+def test_ingest_file_requires_a_student_column(tmp_path):
+    path = tmp_path / "scores.csv"
+    pd.DataFrame({"Q1": [70, 80]}).to_csv(path, index=False)
+    conn = init_db(tmp_path / "test.db")
+    with pytest.raises(ValueError, match="student_name"):
+        ingest_file(path, None, conn)
+    assert load_records(conn).empty
+    # the file was not marked as ingested, so it can be retried with a mapping
+    assert not ingest_file(path, {"student_name": "Q1"}, conn).already_ingested
+    conn.close()
+
+
+def test_ingest_queue_runs_jobs_in_background_and_dedupes(tmp_path):
+    path = tmp_path / "grades.csv"
+    pd.DataFrame({"Name": [f"S{i}" for i in range(50)], "Quiz": range(50)}).to_csv(path, index=False)
+    mappings = {"student_name": "Name", "quiz_avg": "Quiz"}
+    jobs = IngestQueue(db_path=tmp_path / "q.db", batch_size=10)
+    try:
+        with open(path, "rb") as fh:
+            first = jobs.submit(fh, mappings, name="grades.csv")
+            second = jobs.submit(fh, mappings, name="grades.csv")
+        done = jobs.wait(first.id, timeout=30)
+        assert done.status == DONE and done.progress.rows == 50 and done.progress.batches == 5
+        # resubmitted while still queued/running, or skipped by the content hash
+        assert second is first or jobs.wait(second.id, timeout=30).progress.already_ingested
+
+        bad = tmp_path / "bad.xlsx"
+        bad.write_bytes(b"not a workbook")
+        broken = jobs.wait(jobs.submit(bad, mappings).id, timeout=30)
+        assert broken.status == FAILED and broken.error
+        assert [j.id for j in jobs.jobs()][0] == broken.id
+
+        # finished jobs are dropped once every submitter has released them
+        if second is first:
+            assert not jobs.release(first.id)  # the first submission still waits for it
+        else:
+            assert jobs.release(second.id)
+        assert jobs.release(first.id) and jobs.get(first.id) is None
+        assert jobs.release(broken.id) and broken.id not in [j.id for j in jobs.jobs()]
+    finally:
+        jobs.close()
+    conn = init_db(tmp_path / "q.db")
+    assert len(load_records(conn)) == 50
+    conn.close()
+
+
+def test_other_writers_get_the_lock_between_batches(tmp_path):
+    path = tmp_path / "grades.csv"
+    pd.DataFrame({"Name": [f"S{i}" for i in range(50)], "Quiz": range(50)}).to_csv(path, index=False)
+    pool = get_pool(tmp_path / "w.db")
+    first_batch, saved = threading.Event(), threading.Event()
+    results = []
+
+    def progress(stats):
+        if stats.batches == 1:
+            first_batch.set()
+            saved.wait(5)
+
+    def save():
+        with pool.writer() as conn:
+            save_mapping(conn, "fp", ["Name"], {"student_name": "Name"})
+        saved.set()
+
+    worker = threading.Thread(
+        target=lambda: results.append(ingest_file(path, {"student_name": "Name", "quiz_avg": "Quiz"}, pool, 10, progress))
+    )
+    worker.start()
+    assert first_batch.wait(5)
+    saver = threading.Thread(target=save)
+    saver.start()
+    # the mapping is saved while the job still has four batches to go
+    assert saved.wait(5) and not results
+    worker.join(30)
+    saver.join(5)
+    assert results[0].batches == 5
+    with pool.reader() as conn:
+        assert len(load_records(conn)) == 50 and load_mapping(conn, "fp") == {"student_name": "Name"}
+    pool.close()
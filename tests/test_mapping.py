@@ -0,0 +1,46 @@
+import pandas as pd
+
+from src.db import init_db, load_mapping, load_records, save_mapping, saved_mappings
+from src.ingest import ingest_file
+from src.mapping import auto_map, header_fingerprint, normalize_header, resolve_mappings
+
+
+def test_normalize_header():
+    assert normalize_header(" ממוצע_בחנים ") == normalize_header("ממוצע-בחנים") == normalize_header("ממוצע בחנים")
+    assert normalize_header("Quiz Avg") == normalize_header("quiz_avg")
+    # niqqud and final letters
+    assert normalize_header("שֵׁם") == "שמ"
+
+
+def test_auto_map_hebrew_and_english_headers():
+    columns = ["מס'", "שם התלמיד", "כיתה", "מחצית", "ממוצע בחנים סמסטר", "ציון חציון", "אחוזון", "Date", "x"]
+    mapped = auto_map(columns)
+    assert mapped == {
+        "student_name": "שם התלמיד",
+        "class_name": "כיתה",
+        "semester": "מחצית",
+        "date": "Date",
+        "quiz_avg": "ממוצע בחנים סמסטר",
+        "half_semester_final": "ציון חציון",
+        "national_percentile": "אחוזון",
+    }
+    assert auto_map(["Student_Name", "QUIZ AVG"]) == {"student_name": "Student_Name", "quiz_avg": "QUIZ AVG"}
+
+
+def test_saved_mapping_wins_over_hints(tmp_path):
+    conn = init_db(tmp_path / "m.db")
+    columns = ["Name", "Q1"]
+    fp = header_fingerprint(columns)
+    assert fp == header_fingerprint(["Name ", "Q1"]) != header_fingerprint(["Q1", "Name"])
+    assert resolve_mappings(columns, lambda f: load_mapping(conn, f)) == ({}, "auto")
+
+    save_mapping(conn, fp, columns, {"student_name": "Name", "quiz_avg": "Q1"})
+    assert saved_mappings(conn) == {fp: {"student_name": "Name", "quiz_avg": "Q1"}}
+    mappings, source = resolve_mappings(columns, lambda f: load_mapping(conn, f))
+    assert source == "saved" and mappings["quiz_avg"] == "Q1"
+
+    path = tmp_path / "grades.csv"
+    pd.DataFrame({"Name": ["A", "B"], "Q1": [70, 80]}).to_csv(path, index=False)
+    assert ingest_file(path, None, conn).rows == 2
+    assert load_records(conn)["quiz_avg"].tolist() == [70, 80]
+    conn.close()
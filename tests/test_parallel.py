@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_records
+from src.analytics import run_analytics
+from src.parallel import _chunks, run_analytics_parallel
+
+
+def test_chunks_align_with_partitions():
+    bounds = np.array([0, 2, 3, 7, 8, 10])
+    assert _chunks(bounds, 10, 3) == [(0, 7), (7, 10)]
+    assert _chunks(bounds, 10, 100) == [(0, 2), (2, 3), (3, 7), (7, 8), (8, 10)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_matches_serial(workers):
+    df = generate_records(3000, n_students=400, n_semesters=3, n_classes=7, missing_ratio=0.1, seed=3)
+    df.loc[::97, "class_name"] = None
+    df.loc[::89, "student_name"] = None
+    df.index = df.index * 2
+    weights = {"quiz_avg": 0.2, "quarter_exam": 0.3, "midterm_mock": 0.2, "half_semester_final": 0.3}
+
+    expected, expected_fields = run_analytics(df.copy(), weights, 25, 10, partition_by="class_name")
+    out, trend_fields = run_analytics_parallel(df.copy(), weights, 25, 10, workers=workers)
+    assert trend_fields == expected_fields
+    pd.testing.assert_frame_equal(out, expected)
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src import parquet_store
+from src.ingest import ingest_file
+from src.storage import get_backend
+
+
+def test_get_backend(monkeypatch):
+    assert get_backend("parquet") is parquet_store
+    monkeypatch.setenv("STUDENT_ANALYTICS_BACKEND", "parquet")
+    assert get_backend() is parquet_store
+    with pytest.raises(ValueError):
+        get_backend("csv")
+
+
+def test_parquet_roundtrip_with_partition_pruning(tmp_path):
+    store = parquet_store.init_db(tmp_path / "records")
+    assert parquet_store.load_records(store).empty
+    df = pd.DataFrame(
+        {
+            "student_name": ["A", "A", "B", "C"],
+            "class_name": ["ט/1", "ט/1", "ט/1", None],
+            "semester": ["א", "ב", "א", "א"],
+            "quiz_avg": [80, 90, 70, "x"],
+        }
+    )
+    assert parquet_store.insert_dataframe(df, store).inserted == 4
+
+    everything = parquet_store.load_records(store)
+    assert len(everything) == 4
+    assert set(everything.columns) >= {"student_name", "class_name", "semester", "quiz_avg", "date"}
+
+    pruned = parquet_store.load_records(store, columns=["student_name", "quiz_avg"], class_name="ט/1", semester="א")
+    assert list(pruned.columns) == ["student_name", "quiz_avg"]
+    assert sorted(pruned["student_name"]) == ["A", "B"]
+
+    student = parquet_store.load_records(store, "C")
+    assert student["class_name"].isna().all() and student["quiz_avg"].isna().all()
+
+
+def test_ingest_file_into_parquet_backend(tmp_path):
+    path = tmp_path / "grades.csv"
+    pd.DataFrame({"Name": ["A", "B"], "Class": ["1", "2"], "Quiz": [90, 80]}).to_csv(path, index=False)
+    store = parquet_store.init_db(tmp_path / "records")
+    mappings = {"student_name": "Name", "class_name": "Class", "quiz_avg": "Quiz"}
+    assert ingest_file(path, mappings, store, backend=parquet_store).inserted == 2
+    assert ingest_file(path, mappings, store, backend=parquet_store).already_ingested
+    assert len(parquet_store.load_records(store)) == 2
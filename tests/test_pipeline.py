@@ -0,0 +1,168 @@
+import pandas as pd
+import pytest
+
+from src.analytics import apply_flags, compute_cohort_ranks, compute_overall_score, compute_trends
+from src.db import init_db, insert_dataframe, load_records
+from src.pipeline import AnalyticsPipeline, LRUCache
+
+
+def _rows(*rows):
+    return pd.DataFrame(
+        [
+            {"student_name": n, "semester": s, "quiz_avg": q, "quarter_exam": e, "national_percentile": p}
+            for n, s, q, e, p in rows
+        ]
+    )
+
+
+def _serial(conn, weights, low, drop):
+    df = compute_overall_score(load_records(conn), weights)
+    df, trend_fields = compute_trends(df, list(weights.keys()))
+    df = compute_cohort_ranks(df)
+    return apply_flags(df, low, drop, trend_fields), trend_fields
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "test.db")
+    insert_dataframe(
+        _rows(("A", "א", 80, 90, 50), ("A", "ב", 60, 70, 50), ("B", "א", 70, 70, 10)),
+        conn,
+    )
+    yield conn
+    conn.close()
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_pipeline_matches_serial_and_reuses_stages(conn):
+    weights = {"quiz_avg": 0.5, "quarter_exam": 0.5}
+    pipe = AnalyticsPipeline()
+    out, trend_fields = pipe.run(conn, weights, 25, 10)
+    expected, expected_fields = _serial(conn, weights, 25, 10)
+    assert trend_fields == expected_fields
+    pd.testing.assert_frame_equal(out, expected, check_like=True)
+    assert pipe.executed == ["records", "trends", "scores", "ranks", "flags"]
+
+    pipe.run(conn, weights, 5, 10)
+    assert pipe.executed == ["flags"]
+
+    pipe.run(conn, {"quiz_avg": 0.2, "quarter_exam": 0.8}, 5, 10)
+    assert pipe.executed == ["scores", "ranks", "flags"]
+
+
+def test_pipeline_extends_cache_on_insert(conn):
+    weights = {"quiz_avg": 0.5, "quarter_exam": 0.5}
+    pipe = AnalyticsPipeline()
+    pipe.run(conn, weights, 25, 10)
+    insert_dataframe(_rows(("B", "ב", 40, 40, 10), ("C", "א", 90, 90, 90)), conn)
+    out, _ = pipe.run(conn, weights, 25, 10)
+    assert pipe.executed == ["records+", "trends+", "scores+", "ranks+", "flags"]
+    expected, _ = _serial(conn, weights, 25, 10)
+    pd.testing.assert_frame_equal(out, expected, check_like=True)
+
+
+def test_pipeline_reloads_after_update(conn):
+    weights = {"quiz_avg": 0.5, "quarter_exam": 0.5}
+    pipe = AnalyticsPipeline()
+    pipe.run(conn, weights, 25, 10)
+    insert_dataframe(_rows(("A", "ב", 20, 20, 50)), conn)
+    out, _ = pipe.run(conn, weights, 25, 10)
+    assert pipe.executed == ["records", "trends", "scores", "ranks", "flags"]
+    expected, _ = _serial(conn, weights, 25, 10)
+    pd.testing.assert_frame_equal(out, expected, check_like=True)
+
+
+def test_pipeline_compact_records(conn):
+    weights = {"quiz_avg": 0.5, "quarter_exam": 0.5}
+    pipe = AnalyticsPipeline(compact=True, include_comments=False)
+    pipe.run(conn, weights, 25, 10)
+    insert_dataframe(_rows(("C", "א", 90, 90, 90)), conn)
+    out, _ = pipe.run(conn, weights, 25, 10)
+    assert pipe.executed == ["records+", "trends+", "scores+", "ranks+", "flags"]
+    assert isinstance(out["student_name"].dtype, pd.CategoricalDtype)
+    expected, _ = _serial(conn, weights, 25, 10)
+    assert out["flagged"].tolist() == expected["flagged"].tolist()
+    pd.testing.assert_series_equal(out["delta_quiz_avg"], expected["delta_quiz_avg"], check_dtype=False)
+    pd.testing.assert_series_equal(out["overall_score"], expected["overall_score"])
+
+
+def test_sort_order_cached_with_flags(tmp_path):
+    conn = init_db(tmp_path / "order.db")
+    insert_dataframe(
+        pd.DataFrame(
+            {"student_name": ["A", "B", "C"], "semester": ["א"] * 3, "quiz_avg": [50, 90, 70], "national_percentile": [10, 50, 60]}
+        ),
+        conn,
+    )
+    pipe = AnalyticsPipeline()
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 25, 10)
+    assert out["student_name"].iloc[pipe.sort_order(out)].tolist() == ["A", "B", "C"]
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 25, 10)
+    pipe.sort_order(out)
+    assert "order" not in pipe.executed
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 5, 10)
+    assert out["student_name"].iloc[pipe.sort_order(out)].tolist() == ["B", "C", "A"]
+    assert pipe.executed[-1] == "order"
+    conn.close()
+
+
+def test_series_cached_with_records(conn):
+    insert_dataframe(_rows(("C", "א", 90, 90, 90)).assign(date="2024-10-01"), conn)
+    pipe = AnalyticsPipeline()
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 25, 10)
+    series = pipe.series(out, ("quiz_avg",))
+    assert pipe.executed[-1] == "series"
+    pipe.run(conn, {"quiz_avg": 0.5, "quarter_exam": 0.5}, 25, 10)
+    assert pipe.series(out, ("quiz_avg",)) is series
+    assert "series" not in pipe.executed
+    assert series.events("C")["quiz_avg"].tolist() == [90.0]
+
+
+def test_profile_cached_with_flags(conn):
+    pipe = AnalyticsPipeline()
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 25, 10)
+    semesters, students = pipe.profile(conn, out, {"quiz_avg": 1.0})
+    assert pipe.executed[-1] == "profile"
+    assert students.set_index("student_name")["flagged"].to_dict() == out.groupby("student_name")["flagged"].any().to_dict()
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 25, 10)
+    assert pipe.profile(conn, out, {"quiz_avg": 1.0})[1] is students
+    assert "profile" not in pipe.executed
+    out, _ = pipe.run(conn, {"quiz_avg": 1.0}, 90, 10)
+    pipe.profile(conn, out, {"quiz_avg": 1.0})
+    assert pipe.executed[-1] == "profile"
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_student_run_ranks_against_the_whole_cohort(conn, compact, all_flag_rules):
+    insert_dataframe(
+        pd.DataFrame(
+            {
+                "student_name": [f"S{i}" for i in range(10)] + ["C"],
+                "class_name": ["1"] * 10 + ["2"],
+                "semester": ["א"] * 11,
+                "quiz_avg": [60, 65, 70, 75, 80, 85, 90, 95, 100, 55, 10],
+            }
+        ),
+        conn,
+    )
+    weights = {"quiz_avg": 1.0}
+    thresholds = {"low_class_percentile": 15}
+    full, _ = AnalyticsPipeline(compact=compact).run(conn, weights, 0, 100, thresholds=thresholds)
+    columns = ["rank_overall_score", "pct_overall_score", "rank_quiz_avg", "flag_reasons", "flagged"]
+    pipe = AnalyticsPipeline(compact=compact)
+    for name in ["S9", "A", "C"]:
+        own, _ = pipe.run(conn, weights, 0, 100, name, thresholds)
+        expected = full[full["student_name"] == name][columns].reset_index(drop=True)
+        pd.testing.assert_frame_equal(own[columns].reset_index(drop=True), expected, check_dtype=False)
+    # the lowest quiz average of class 1 is flagged in the student's own view too
+    own, _ = pipe.run(conn, weights, 0, 100, "S9", thresholds)
+    assert own["flagged"].all()
+    assert pipe.executed == []
@@ -0,0 +1,58 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src import profiling
+from src.analytics import compute_overall_score
+from src.data_loader import iter_batches
+
+
+@pytest.fixture
+def profiled():
+    profiling.reset()
+    profiling.enable(True)
+    yield
+    profiling.enable(False)
+    profiling.reset()
+
+
+def test_disabled_records_nothing():
+    profiling.enable(False)
+    profiling.reset()
+    compute_overall_score(pd.DataFrame({"quiz_avg": [80.0]}), {"quiz_avg": 1.0})
+    with profiling.timed("render"):
+        pass
+    assert profiling.snapshot() == {}
+
+
+def test_functions_and_blocks_are_measured(profiled):
+    df = pd.DataFrame({"quiz_avg": [80.0, 90.0, 70.0]})
+    compute_overall_score(df, {"quiz_avg": 1.0})
+    compute_overall_score(df, {"quiz_avg": 1.0})
+    with pytest.raises(RuntimeError), profiling.timed("render.scores"):
+        raise RuntimeError("boom")
+
+    stats = profiling.snapshot()
+    score = stats["analytics.compute_overall_score"]
+    assert score["calls"] == 2 and score["rows"] == 6 and score["errors"] == 0
+    assert score["seconds"] >= score["max_seconds"] > 0
+    assert stats["render.scores"]["errors"] == 1
+
+
+def test_generator_counts_yielded_rows(profiled, tmp_path):
+    path = tmp_path / "grades.csv"
+    pd.DataFrame({"student_name": [f"s{i}" for i in range(7)]}).to_csv(path, index=False)
+    assert sum(len(b) for b in iter_batches(str(path), batch_size=3)) == 7
+    stats = profiling.snapshot()["data_loader.iter_batches"]
+    assert stats["calls"] == 1 and stats["rows"] == 7
+
+
+def test_exports(profiled):
+    profiling.record('stage "a"', 0.5, rows=10, memory_delta=2048)
+    assert json.loads(profiling.to_json())['stage "a"']["rows_per_sec"] == 20.0
+    text = profiling.to_prometheus()
+    assert "# TYPE student_analytics_calls_total counter" in text
+    assert 'student_analytics_rows_total{stage="stage \\"a\\""} 10' in text
+    assert "# TYPE student_analytics_memory_delta_bytes gauge" in text
+    assert 'student_analytics_memory_delta_bytes{stage="stage \\"a\\""} 2048' in text
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import run_analytics
+from src.ranking import cohort_ranks, update_cohort_ranks
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(1)
+    n = 3000
+    return pd.DataFrame(
+        {
+            "class_name": rng.choice(["י1", "י2", "י3", None], n),
+            "semester": rng.choice(["א", "ב"], n),
+            "overall_score": np.where(rng.random(n) < 0.1, np.nan, rng.integers(40, 100, n)),
+            "quiz_avg": rng.integers(0, 10, n).astype(float),
+        },
+        index=rng.permutation(n),
+    )
+
+
+def test_matches_pandas_grouped_rank(df):
+    ranks = cohort_ranks(df, ["overall_score", "quiz_avg", "missing"])
+    assert list(ranks.columns) == ["rank_overall_score", "pct_overall_score", "rank_quiz_avg", "pct_quiz_avg"]
+    assert ranks.index.equals(df.index)
+    for m in ["overall_score", "quiz_avg"]:
+        grouped = df.groupby(["class_name", "semester"])[m]
+        np.testing.assert_allclose(ranks[f"pct_{m}"], grouped.rank(pct=True) * 100, rtol=1e-5)
+        np.testing.assert_array_equal(ranks[f"rank_{m}"], grouped.rank(method="min", ascending=False))
+    assert ranks.loc[df["class_name"].isna()].isna().all().all()
+
+
+def test_without_cohort_columns_ranks_the_whole_frame():
+    ranks = cohort_ranks(pd.DataFrame({"overall_score": [50.0, 90.0, 50.0, 70.0]}))
+    assert ranks["rank_overall_score"].tolist() == [3, 1, 3, 2]
+    assert ranks["pct_overall_score"].tolist() == [37.5, 100.0, 37.5, 75.0]
+
+
+def test_update_matches_full_recompute(df):
+    base = cohort_ranks(df.iloc[:2000])
+    tail = df.iloc[2000:]
+    # appended rows touching only one cohort leave the others untouched
+    only_one = tail[(tail["class_name"] == "י1") & (tail["semester"] == "א")]
+    grown = pd.concat([df.iloc[:2000], only_one])
+    pd.testing.assert_frame_equal(update_cohort_ranks(base, grown), cohort_ranks(grown))
+    pd.testing.assert_frame_equal(update_cohort_ranks(base, df), cohort_ranks(df))
+
+
+def test_low_class_percentile_flag(all_flag_rules):
+    df = pd.DataFrame(
+        {
+            "student_name": [f"s{i}" for i in range(20)],
+            "class_name": ["1"] * 10 + ["2"] * 10,
+            "semester": ["א"] * 20,
+            "quiz_avg": list(range(50, 100, 5)) * 2,
+        }
+    )
+    out, _ = run_analytics(df, {"quiz_avg": 1.0}, 0, 100, thresholds={"low_class_percentile": 15})
+    assert out.loc[out["flagged"], "student_name"].tolist() == ["s0", "s10"]
+    assert out.loc[0, "rank_overall_score"] == 10
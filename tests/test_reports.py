@@ -0,0 +1,95 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.analytics import run_analytics
+from src.comments import Comment, add_comments
+from src.db import init_db, insert_dataframe, load_records
+from src.reports import export_reports, file_stem, iter_student_batches, main
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "test.db")
+    insert_dataframe(
+        pd.DataFrame(
+            {
+                "student_name": ["B", "A", "C/D", "A", "B", "A"],
+                "class_name": ["1"] * 6,
+                "semester": ["א", "א", "א", "ב", "ב", "ב"],
+                "date": ["2024-10-01"] * 3 + ["2025-03-01", "2025-03-01", "2025-05-01"],
+                "quiz_avg": [50, 90, 70, 40, 55, 80],
+                "teacher_comment": ["שיפור", "=1+1", None, None, None, 'מצוין, "כל הכבוד"\n<b>'],
+            }
+        ),
+        conn,
+    )
+    add_comments(conn, [Comment("A", "teacher1", "=== חשוב === שיחה עם ההורים", created_at="2025-03-02")])
+    yield conn
+    conn.close()
+
+
+def _analyzed(conn):
+    out, _ = run_analytics(load_records(conn, compact=True, include_comments=False), {"quiz_avg": 1.0}, 25, 10)
+    return out
+
+
+def test_student_batches_carry_students_across_chunks():
+    chunks = [
+        pd.DataFrame({"student_name": [None, "A", "A", "B"], "x": [0, 1, 2, 3]}),
+        pd.DataFrame({"student_name": ["B", "B", "C"], "x": [4, 5, 6]}),
+        pd.DataFrame({"student_name": ["D"], "x": [7]}),
+    ]
+    batches = [(names, g["x"].tolist(), offsets.tolist()) for names, g, offsets in iter_student_batches(chunks, 2)]
+    assert batches == [(["A", "B"], [1, 2, 3, 4, 5], [0, 2, 5]), (["C", "D"], [6, 7], [0, 1, 2])]
+    assert [n for b in iter_student_batches(chunks, 1) for n in b[0]] == ["A", "B", "C", "D"]
+
+
+def test_file_stem_is_safe_and_unique():
+    used = {}
+    assert [file_stem(n, used) for n in ["C/D", "C:D", " .", "דנה"]] == ["C_D", "C_D-2", "student", "דנה"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_export_writes_every_student(conn, workers):
+    buffer = io.BytesIO()
+    seen = []
+    stats = export_reports(
+        conn, buffer, _analyzed(conn), workers=workers, batch_students=2, chunksize=2, progress=lambda s: seen.append(s.students)
+    )
+    assert (stats.students, stats.rows, stats.comments, stats.batches) == (3, 6, 1, 2)
+    assert seen == [2, 3]
+    with zipfile.ZipFile(buffer) as archive:
+        names = sorted(archive.namelist())
+        assert names == sorted(
+            [f"{d}/{s}.{d}" for d in ("csv", "xlsx", "html") for s in ("A", "B", "C_D")] + ["csv/A-comments.csv"]
+        )
+        a = pd.read_csv(archive.open("csv/A.csv"), encoding="utf-8-sig")
+        page = archive.read("html/A.html").decode("utf-8")
+        workbook = load_workbook(io.BytesIO(archive.read("xlsx/A.xlsx")), read_only=True)
+    assert a["quiz_avg"].tolist() == [90, 40, 80]
+    assert {"overall_score", "rank_overall_score", "flag_reason_labels"} <= set(a.columns)
+    assert a["teacher_comment"].dropna().tolist() == ["=1+1", 'מצוין, "כל הכבוד"\n<b>']
+    assert "&lt;b&gt;" in page and "<b>" not in page
+    assert "שיחה עם ההורים" in page and 'dir="rtl"' in page
+    assert workbook.sheetnames == ["records", "comments"]
+    # text starting with "=" stays text instead of becoming a formula
+    cells = [c for sheet in workbook for row in sheet.iter_rows() for c in row if isinstance(c.value, str)]
+    assert "f" not in {c.data_type for c in cells}
+    assert {"=1+1", "=== חשוב === שיחה עם ההורים"} <= {c.value for c in cells}
+
+
+def test_export_rejects_unknown_format(conn):
+    with pytest.raises(ValueError):
+        export_reports(conn, io.BytesIO(), _analyzed(conn), formats=["pdf"], workers=1)
+
+
+def test_cli(conn, tmp_path, capsys):
+    out = tmp_path / "reports.zip"
+    assert main(["--db", str(tmp_path / "test.db"), "--out", str(out), "--format", "html", "--workers", "1"]) == 0
+    assert "3 students" in capsys.readouterr().out
+    with zipfile.ZipFile(out) as archive:
+        assert sorted(archive.namelist()) == ["html/A.html", "html/B.html", "html/C_D.html"]
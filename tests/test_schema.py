@@ -0,0 +1,28 @@
+import sqlite3
+
+import pytest
+
+from src.data_loader import numeric_keys
+from src.schema import canonical_map, compile_schema, field_dtypes, lazy_fields, load_schema
+
+
+def test_compiled_schema_is_shared_and_read_only():
+    compiled = compile_schema()
+    assert compile_schema() is compiled
+    assert canonical_map() is compiled.fields
+    assert canonical_map(load_schema()) is compiled.fields
+    with pytest.raises(TypeError):
+        compiled.fields["new"] = {}
+    assert list(compiled.numeric_keys) == numeric_keys
+    assert compiled.numeric_set == set(numeric_keys)
+    assert lazy_fields() == ["teacher_comment", "coordinator_comment"]
+    assert field_dtypes()["quiz_avg"] == "float32"
+
+
+def test_explicit_schema_and_ddl():
+    schema = {"canonical_fields": [{"key": "name", "dtype": "category"}, {"key": "score", "dtype": "float32"}]}
+    assert list(canonical_map(schema)) == ["name", "score"]
+    conn = sqlite3.connect(":memory:")
+    conn.execute(compile_schema().records_ddl)
+    types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(records)")}
+    assert types["id"] == "INTEGER" and types["quiz_avg"] == "REAL" and types["student_name"] == "TEXT"
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_records
+from src.analytics import profile_from_summary, run_analytics
+from src.db import _TOUCHED_SQL, init_db, insert_dataframe, load_records, load_student_summary
+from src.flags import REASONS_COLUMN
+
+WEIGHTS = {"quiz_avg": 0.2, "quarter_exam": 0.3, "midterm_mock": 0.2, "half_semester_final": 0.3}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "test.db")
+    yield conn
+    conn.close()
+
+
+def _expected_summary(records):
+    grouped = records.groupby(["student_name", "class_name", "semester"])
+    return pd.DataFrame({"n_records": grouped.size(), "sum_quiz_avg": grouped["quiz_avg"].sum(min_count=1)})
+
+
+def test_summary_maintained_across_inserts_and_updates(conn):
+    df = generate_records(600, n_students=40, n_semesters=3, missing_ratio=0.2, seed=5)
+    insert_dataframe(df.iloc[:300], conn)
+    insert_dataframe(df.iloc[300:], conn)
+    changed = df.iloc[:10].assign(quiz_avg=1.0)
+    insert_dataframe(changed, conn)
+
+    summary = load_student_summary(conn).set_index(["student_name", "class_name", "semester"]).sort_index()
+    expected = _expected_summary(load_records(conn)).sort_index()
+    assert summary["n_records"].tolist() == expected["n_records"].tolist()
+    np.testing.assert_allclose(summary["sum_quiz_avg"], expected["sum_quiz_avg"])
+
+    assert len(load_student_summary(conn, student_name=df["student_name"].iloc[0])) == 3
+
+
+def test_summary_refresh_looks_up_touched_students_by_index(conn):
+    insert_dataframe(pd.DataFrame({"student_name": [None, "A"], "class_name": ["1", "1"], "quiz_avg": [50, 60]}), conn)
+    insert_dataframe(pd.DataFrame({"student_name": [""], "class_name": ["1"], "date": ["2024-10-01"], "quiz_avg": [70]}), conn)
+    # records without a student, stored as NULL or '', share one summary row
+    summary = load_student_summary(conn).sort_values("n_records")
+    assert summary["n_records"].tolist() == [1, 2] and summary["sum_quiz_avg"].tolist() == [60, 120]
+
+    plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN SELECT id FROM records WHERE {_TOUCHED_SQL}"))
+    assert "idx_records_student_name" in plan and "SCAN records" not in plan
+
+
+def test_summary_rebuilt_for_existing_database(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = init_db(path)
+    insert_dataframe(generate_records(50, n_students=5), conn)
+    conn.execute("DROP TABLE student_summary")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    conn = init_db(path)
+    assert load_student_summary(conn)["n_records"].sum() == 50
+    conn.close()
+
+
+def test_profile_from_summary_matches_row_level_analytics(conn, all_flag_rules):
+    df = generate_records(900, n_students=60, n_semesters=2, missing_ratio=0.1, seed=2)
+    df["national_percentile"] = np.where(np.arange(900) % 13 == 0, 5, 60)
+    insert_dataframe(df, conn)
+    rows, _ = run_analytics(load_records(conn), WEIGHTS, 25, 10)
+    semesters, students = profile_from_summary(load_student_summary(conn), WEIGHTS, rows)
+
+    by_semester = rows.groupby(["student_name", "semester"], observed=True)["overall_score"].mean()
+    got = semesters.set_index(["student_name", "semester"])["overall_score"]
+    np.testing.assert_allclose(got.sort_index(), by_semester.sort_index())
+
+    per_student = rows.groupby("student_name", observed=True).agg(
+        flagged=("flagged", "any"), reasons=(REASONS_COLUMN, np.bitwise_or.reduce), delta=("delta_quiz_avg", "first")
+    )
+    students = students.set_index("student_name").loc[per_student.index]
+    assert students["flagged"].tolist() == per_student["flagged"].tolist()
+    assert students[REASONS_COLUMN].tolist() == per_student["reasons"].tolist()
+    # rules on class ranks and partial homework fire in both views
+    assert per_student["reasons"].map(lambda r: bin(r).count("1")).max() > 1
+    np.testing.assert_allclose(students["delta_quiz_avg"], per_student["delta"])
+    assert (students["latest_semester"] == "ב").all()
+
+    _, unflagged = profile_from_summary(load_student_summary(conn), WEIGHTS)
+    assert REASONS_COLUMN not in unflagged.columns
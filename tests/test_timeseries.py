@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.timeseries import build_series, parse_dates
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "student_name": ["B", "A", "A", "A", "A", None, "A"],
+            "date": ["2024-01-10", "2024-02-15", "2024-01-01", "2024-01-03", "2024-01-09", "2024-01-01", "bad"],
+            "quiz_avg": [50, 80, 60, np.nan, 90, 10, 70],
+            "quarter_exam": [1, 2, 3, 4, 5, 6, 7],
+        }
+    )
+
+
+def test_parse_dates_handles_missing_and_invalid():
+    parsed = parse_dates(pd.Series(["2024-01-01", None, "nope", "2024-01-01 08:00:00"]))
+    assert parsed.dtype == np.dtype("datetime64[D]")
+    assert parsed[0] == parsed[3] == np.datetime64("2024-01-01")
+    assert np.isnat(parsed[1]) and np.isnat(parsed[2])
+
+
+def test_parse_dates_reads_day_first():
+    parsed = parse_dates(pd.Series(["05/03/2024", "13/03/2024", "2024-03-20", "01.04.2024"]))
+    assert parsed.astype(str).tolist() == ["2024-03-05", "2024-03-13", "2024-03-20", "2024-04-01"]
+
+
+def test_build_series_sorts_each_history(df):
+    series = build_series(df, ["quiz_avg", "quarter_exam", "missing"])
+    assert series.metrics == ("quiz_avg", "quarter_exam")
+    assert series.students.tolist() == ["A", "B"]
+    assert series.offsets.tolist() == [0, 4, 5]
+    events = series.events("A")
+    assert events.index.strftime("%Y-%m-%d").tolist() == ["2024-01-01", "2024-01-03", "2024-01-09", "2024-02-15"]
+    assert events["quarter_exam"].tolist() == [3, 4, 5, 2]
+    assert series.events("A", "2024-01-02", "2024-01-09")["quarter_exam"].tolist() == [4, 5]
+    assert series.events("nobody").empty
+    assert series.date_range("B") == (np.datetime64("2024-01-10"), np.datetime64("2024-01-10"))
+    with pytest.raises(ValueError):
+        build_series(df.drop(columns="date"))
+
+
+def test_resample_matches_pandas(df):
+    series = build_series(df, ["quiz_avg", "quarter_exam"])
+    weekly = series.resample("A", "W")
+    a = df[df["student_name"] == "A"].assign(date=lambda d: pd.to_datetime(d["date"], errors="coerce")).dropna(subset=["date"])
+    expected = a.set_index("date")[["quiz_avg", "quarter_exam"]].resample("W-MON", label="left", closed="left").mean()
+    expected = expected.dropna(how="all")
+    np.testing.assert_allclose(weekly.to_numpy(), expected.to_numpy())
+    assert weekly.index.tolist() == expected.index.tolist()
+
+    monthly = series.resample("A", "M", metrics=["quiz_avg"])
+    assert monthly["quiz_avg"].tolist() == [75.0, 80.0]
+    assert series.resample("A", "M", start="2025-01-01").empty
+    with pytest.raises(ValueError):
+        series.resample("A", "Q")
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import compute_trends
+from src.trends import trend_summary
+
+
+@pytest.fixture
+def records():
+    return pd.DataFrame(
+        [
+            {"student_name": "A", "class_name": "1", "semester": "א", "date": "2024-10-01", "quiz_avg": 80},
+            {"student_name": "A", "class_name": "1", "semester": "א", "date": "2024-11-01", "quiz_avg": 90},
+            {"student_name": "A", "class_name": "1", "semester": "ב", "date": "2025-03-01", "quiz_avg": 60},
+            {"student_name": "A", "class_name": "1", "semester": "ג", "date": "2025-06-01", "quiz_avg": 70},
+            {"student_name": "B", "class_name": "2", "semester": "ב", "date": "2025-03-01", "quiz_avg": 50},
+            {"student_name": "B", "class_name": "2", "semester": "א", "date": "2024-10-01", "quiz_avg": None},
+            {"student_name": None, "class_name": "2", "semester": "א", "date": "2024-10-01", "quiz_avg": 10},
+        ]
+    )
+
+
+def test_trend_summary_slopes_and_drops(records):
+    out = trend_summary(records, ["quiz_avg"]).set_index("student_name")
+    assert out.loc["A", "delta_quiz_avg"] == 10
+    assert out.loc["A", "max_drop_quiz_avg"] == 25
+    assert out.loc["A", "slope_quiz_avg"] == pytest.approx(np.polyfit([0, 1, 2], [85, 60, 70], 1)[0])
+    assert np.isnan(out.loc["B", "delta_quiz_avg"])
+    assert np.isnan(out.loc["B", "slope_quiz_avg"])
+
+
+def test_trend_summary_semester_order_and_dates(records):
+    reordered = trend_summary(records, ["quiz_avg"], semester_order=["ג", "ב", "א"]).set_index("student_name")
+    assert reordered.loc["A", "delta_quiz_avg"] == 25
+
+    dated = trend_summary(records, ["quiz_avg"], order_by="date").set_index("student_name")
+    assert dated.loc["A", ["delta_quiz_avg", "max_drop_quiz_avg"]].tolist() == [10, 30]
+
+
+def test_trend_summary_partitioned(records):
+    moved = pd.concat([records, pd.DataFrame([{"student_name": "A", "class_name": "2", "semester": "ב", "quiz_avg": 0}])])
+    out = trend_summary(moved, ["quiz_avg"], partition_by="class_name")
+    assert list(out.columns[:2]) == ["class_name", "student_name"]
+    assert len(out) == 3
+    a1 = out[(out["class_name"] == "1") & (out["student_name"] == "A")]
+    assert a1["delta_quiz_avg"].iloc[0] == 10
+
+
+def test_compute_trends_matches_pivot_for_two_semesters():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame(
+        {
+            "student_name": rng.integers(0, 300, n).astype(str),
+            "semester": rng.choice(["א", "ב"], n),
+            "quiz_avg": np.where(rng.random(n) < 0.1, np.nan, rng.normal(70, 10, n)),
+        }
+    )
+    out, _ = compute_trends(df.copy(), ["quiz_avg"])
+    pivot = df.pivot_table(index="student_name", columns="semester", values="quiz_avg", aggfunc="mean")
+    expected = (pivot["ב"] - pivot["א"]).reindex(df["student_name"]).to_numpy()
+    np.testing.assert_allclose(out["delta_quiz_avg"].to_numpy(), expected)
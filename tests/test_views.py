@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.views import iter_csv, page, page_count, sort_order, write_csv
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 500
+    return pd.DataFrame(
+        {
+            "student_name": rng.choice(["דנה", "אבי", "רון", None], n),
+            "flagged": rng.random(n) < 0.3,
+            "overall_score": np.where(rng.random(n) < 0.1, np.nan, rng.integers(40, 100, n)),
+        },
+        index=rng.permutation(n) + 1000,
+    )
+
+
+def test_sort_order_matches_sort_values(df):
+    order = sort_order(df, ["-flagged", "-overall_score", "student_name"])
+    expected = df.sort_values(
+        ["flagged", "overall_score", "student_name"], ascending=[False, False, True], kind="stable"
+    )
+    assert df.index[order].tolist() == expected.index.tolist()
+    assert sort_order(df, ["missing"]).tolist() == list(range(len(df)))
+
+
+def test_pages(df):
+    full = sort_order(df, ["-flagged", "-overall_score"])
+    assert page_count(len(df), 50) == 10 and page_count(0, 50) == 1
+    assert page(df, full, 2, 50).index.tolist() == df.index[full[100:150]].tolist()
+    with pytest.raises(ValueError):
+        page(df, full, 0, 0)
+
+
+def test_iter_csv_streams_chunks(df):
+    rows = sort_order(df, ["-overall_score"])[:123]
+    chunks = list(iter_csv(df, rows, columns=["student_name", "overall_score"], chunksize=50))
+    assert len(chunks) == 1 + 3
+    expected = df.iloc[rows][["student_name", "overall_score"]].to_csv(index=False).encode("utf-8-sig")
+    assert b"".join(chunks) == expected
+
+    out = io.BytesIO()
+    write_csv(out, df, rows[:5], derived={"double": lambda chunk: chunk["overall_score"] * 2})
+    back = pd.read_csv(io.BytesIO(out.getvalue()), encoding="utf-8-sig")
+    np.testing.assert_allclose(back["double"], df.iloc[rows[:5]]["overall_score"] * 2)